@@ -0,0 +1,50 @@
+from bfc.Build import brainfuck_build
+from bfc.Codegen import Codegen
+from bfc.Options import *
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+
+TEST_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "test")
+PROGRAMS = ("hello.b", "abc.b", "hi123.b", "multiplication.b", "si.b")
+FILES = 1000
+
+
+def create_corpus(directory: str, files: int) -> [str]:
+    sources = list()
+    for index in range(files):
+        name = PROGRAMS[index % len(PROGRAMS)]
+        source = os.path.join(directory, f"{index:04}_{name}")
+        shutil.copyfile(os.path.join(TEST_DIR, name), source)
+        sources.append(source)
+    return sources
+
+
+def main(args):
+    files = int(args[1]) if len(args) > 1 else FILES
+    options = BrainfuckOptions("bench")
+    codegen = Codegen["x64-linux-elf"]
+    jobs = 1
+    print(f"{'jobs':>4} {'files':>6} {'seconds':>10} {'files/s':>10} {'speedup':>8}")
+    baseline = None
+    while jobs <= os.cpu_count():
+        with tempfile.TemporaryDirectory() as directory:
+            sources = create_corpus(directory, files)
+            start = time.perf_counter()
+            results = brainfuck_build(sources, codegen, options, jobs)
+            seconds = time.perf_counter() - start
+        if any(result.get_error() is not None for result in results):
+            raise RuntimeError("Build failed")
+        baseline = baseline or seconds
+        print(
+            f"{jobs:>4} {files:>6} {seconds:>10.2f} {files / seconds:>10.1f}"
+            f" {baseline / seconds:>8.2f}"
+        )
+        jobs *= 2
+
+
+if __name__ == "__main__":
+    main(sys.argv)
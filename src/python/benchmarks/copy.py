@@ -0,0 +1,73 @@
+from bfc.Token import brainfuck_load_tokens
+from bfc.Parser import brainfuck_parse_compact
+from bfc.PassManager import brainfuck_pass_manager
+from bfc.IR import *
+from bfc.Options import *
+from bfc.x64_linux.AsmGenerator import AsmGenerator
+from bfc.x64_linux.Codegen import BrainfuckLinuxX64
+import io
+import os
+import sys
+
+
+TEST_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "test")
+PROGRAMS = ("mandel.b", "hanoi.b", "bottles.b", "squares.b", "long.b")
+
+
+def instructions(asm: str) -> [str]:
+    return [line.strip() for line in asm.splitlines() if line.startswith("\t")]
+
+
+def copy_instructions(compiler: BrainfuckLinuxX64, module) -> (int, [str]):
+    copies = 0
+    lines = list()
+    blocks = [module]
+    while blocks:
+        for instr in blocks.pop().get_body():
+            for instr in brainfuck_ir_schedule(instr):
+                if instr.get_opcode() == IROpcode.Loop:
+                    blocks.append(instr.get_arguments()[0])
+                elif instr.get_opcode() == IROpcode.Copy:
+                    output = io.StringIO()
+                    compiler._opcode_copy(AsmGenerator(output), instr)
+                    path = instructions(output.getvalue())
+                    fast = [line for line in path if line.startswith("jmp")]
+                    if fast:
+                        path = path[: path.index(fast[0])]
+                    copies += 1
+                    lines.extend(path)
+    return copies, lines
+
+
+def measure(file_name: str, memory_overflow: MemoryOverflow):
+    options = BrainfuckOptions("bench", memory_overflow)
+    ir = brainfuck_parse_compact(brainfuck_load_tokens(file_name))
+    ir = brainfuck_pass_manager(options).run(ir)
+    output = io.StringIO()
+    compiler = BrainfuckLinuxX64(options, "runtime.asm")
+    compiler.compile(output, ir)
+    program = instructions(output.getvalue().split("_bf_entry:")[1])
+    copies, copy_path = copy_instructions(compiler, ir)
+    stack = [line for line in copy_path if "rsp" in line or line.startswith("p")]
+    calls = [line for line in copy_path if line.startswith("call")]
+    return len(program), copies, len(copy_path), len(stack), len(calls)
+
+
+def main(args):
+    programs = args[1:] or [os.path.join(TEST_DIR, name) for name in PROGRAMS]
+    print(
+        f"{'program':<16} {'memory':<10} {'instrs':>7} {'copies':>7}"
+        f" {'copy path':>10} {'stack':>6} {'calls':>6}"
+    )
+    for file_name in programs:
+        for memory_overflow in MemoryOverflow:
+            program, copies, path, stack, calls = measure(file_name, memory_overflow)
+            name = os.path.basename(file_name)
+            print(
+                f"{name:<16} {memory_overflow.value:<10} {program:>7} {copies:>7}"
+                f" {path:>10} {stack:>6} {calls:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv)
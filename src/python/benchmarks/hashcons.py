@@ -0,0 +1,62 @@
+from bfc.Parser import brainfuck_parse_compact
+from bfc.PassManager import brainfuck_pass_manager
+from bfc.HashCons import IRBoundedCache, IRHashConsTable
+from bfc.Options import *
+import bfc.ConstantOutput
+import bfc.FlowAnalysis
+import bfc.HashCons
+import bfc.IROptimizer
+import bfc.PassManager
+import sys
+import time
+
+
+REPEATS = (1, 10, 100, 1000)
+DISTINCT = 4
+DEPTH = 16
+
+
+def body(variant: int, depth: int = DEPTH) -> bytes:
+    return b"[>" + b"+" * (variant + 1) + b"[>+<-]" * depth + b"<-]"
+
+
+def program(repeats: int, distinct: int = DISTINCT) -> bytes:
+    bodies = [body(variant) for variant in range(distinct)]
+    return b"+>" + b">+<".join(bodies) * repeats
+
+
+def reset_caches(max_size: int = None):
+    sizes = () if max_size is None else (max_size,)
+    bfc.HashCons.HASH_CONS_TABLE = IRHashConsTable(*sizes)
+    bfc.IROptimizer.OPTIMIZED_LOOPS = IRBoundedCache(*sizes)
+    bfc.FlowAnalysis.FOLDED_LOOPS = IRBoundedCache(*sizes)
+    bfc.FlowAnalysis.UNFOLDED_LOOPS = IRBoundedCache(*sizes)
+    bfc.PassManager.BLOCK_SIZES = IRBoundedCache(*sizes)
+    bfc.ConstantOutput.COALESCED_LOOPS = IRBoundedCache(*sizes)
+    bfc.ConstantOutput.WRITTEN_CELLS = IRBoundedCache(*sizes)
+
+
+def measure(tokens: bytes, max_size: int = None) -> float:
+    reset_caches(max_size)
+    options = BrainfuckOptions("bench", evaluation_steps=0)
+    start = time.perf_counter()
+    brainfuck_pass_manager(options).run(brainfuck_parse_compact(tokens))
+    return time.perf_counter() - start
+
+
+def main(args):
+    repeats = tuple(int(arg) for arg in args[1:]) or REPEATS
+    print(f"{'repeats':>8} {'tokens':>9} {'shared':>9} {'unshared':>9} {'speedup':>8}")
+    for count in repeats:
+        tokens = program(count)
+        shared = measure(tokens)
+        unshared = measure(tokens, 0)
+        print(
+            f"{count:>8} {len(tokens):>9} {shared:>9.3f} {unshared:>9.3f}"
+            f" {unshared / shared:>8.1f}"
+        )
+    reset_caches()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,37 @@
+from bfc.Token import brainfuck_load_tokens
+from bfc.Parser import brainfuck_parse_compact
+from bfc.PassManager import brainfuck_pass_manager
+from bfc.Interpreter import BrainfuckInterpreter
+from bfc.Options import *
+import os
+import sys
+import time
+
+
+TEST_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "test")
+PROGRAMS = ("hanoi.b", "mandel.b")
+
+
+def measure(file_name: str, level: int):
+    options = BrainfuckOptions("bench", MemoryOverflow.Wrap, optimization_level=level)
+    ir = brainfuck_parse_compact(brainfuck_load_tokens(file_name))
+    ir = brainfuck_pass_manager(options).run(ir)
+    interpreter = BrainfuckInterpreter(options)
+    code = interpreter.lower(ir)
+    start = time.perf_counter()
+    output = interpreter.execute(code)
+    return time.perf_counter() - start, len(code), len(output)
+
+
+def main(args):
+    programs = args[1:] or [os.path.join(TEST_DIR, name) for name in PROGRAMS]
+    print(f"{'program':<16} {'level':>5} {'ops':>7} {'output':>7} {'seconds':>9}")
+    for file_name in programs:
+        for level in (1, 2):
+            elapsed, ops, output = measure(file_name, level)
+            name = os.path.basename(file_name)
+            print(f"{name:<16} {level:>5} {ops:>7} {output:>7} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
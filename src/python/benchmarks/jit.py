@@ -0,0 +1,64 @@
+from bfc.Token import brainfuck_load_tokens
+from bfc.Parser import brainfuck_parse_compact
+from bfc.PassManager import brainfuck_pass_manager
+from bfc.Interpreter import BrainfuckInterpreter
+from bfc.Jit import BrainfuckPythonJit
+from bfc.Options import *
+from benchmarks.interp import TEST_DIR
+import io
+import os
+import sys
+import time
+
+
+PROGRAMS = ("hanoi.b", "mandel.b", "bottles.b", "squares.b")
+MODES = {"undefined": MemoryOverflow.Undefined, "wrap": MemoryOverflow.Wrap}
+
+
+def measure_interpreter(tokens: bytes, options: BrainfuckOptions) -> float:
+    ir = brainfuck_pass_manager(options).run(brainfuck_parse_compact(tokens))
+    interpreter = BrainfuckInterpreter(options)
+    code = interpreter.lower(ir)
+    start = time.perf_counter()
+    interpreter.execute(code)
+    return time.perf_counter() - start
+
+
+def measure_jit(tokens: bytes, options: BrainfuckOptions) -> (float, float):
+    ir = brainfuck_pass_manager(options).run(brainfuck_parse_compact(tokens))
+    jit = BrainfuckPythonJit(options)
+    start = time.perf_counter()
+    program = jit.compile(ir)
+    compiled = time.perf_counter()
+    program(jit.create_tape(), 0, bytearray(), io.BytesIO(), io.BytesIO())
+    return compiled - start, time.perf_counter() - compiled
+
+
+def main(args):
+    programs = args[1:] or [os.path.join(TEST_DIR, name) for name in PROGRAMS]
+    print(
+        f"{'program':<16} {'memory':<9} {'naive s':>9} {'interp s':>9}"
+        f" {'compile s':>9} {'jit s':>9} {'speedup':>8}"
+    )
+    for file_name in programs:
+        tokens = brainfuck_load_tokens(file_name)
+        for mode, memory_overflow in MODES.items():
+            naive = BrainfuckOptions(
+                "bench", memory_overflow=memory_overflow, optimization_level=0
+            )
+            optimized = BrainfuckOptions(
+                "bench", memory_overflow=memory_overflow, evaluation_steps=0
+            )
+            naive_seconds = measure_interpreter(tokens, naive)
+            interpreter_seconds = measure_interpreter(tokens, optimized)
+            compile_seconds, jit_seconds = measure_jit(tokens, optimized)
+            name = os.path.basename(file_name)
+            print(
+                f"{name:<16} {mode:<9} {naive_seconds:>9.2f}"
+                f" {interpreter_seconds:>9.2f} {compile_seconds:>9.2f}"
+                f" {jit_seconds:>9.2f} {naive_seconds / jit_seconds:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv)
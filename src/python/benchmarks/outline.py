@@ -0,0 +1,73 @@
+from bfc.Parser import brainfuck_parse_compact
+from bfc.PassManager import brainfuck_pass_manager
+from bfc.Options import *
+from bfc.x64_linux.Codegen import BrainfuckLinuxX64
+from bfc.x64_linux.Elf import ElfExecutableGenerator
+from bfc.x64_linux.MachineCode import MachineCodeGenerator
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+TEST_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "test")
+PROGRAMS = ("hanoi.b", "mandel.b", "bottles.b", "squares.b", "long.b")
+MODES = {"wrap": MemoryOverflow.Wrap, "abort": MemoryOverflow.Abort}
+
+
+class TextSizeGenerator(MachineCodeGenerator):
+    def finish(self):
+        self._output.append(self.layout()[".text"])
+
+
+def compile_program(tokens: bytes, options: BrainfuckOptions, generator) -> list:
+    module = brainfuck_pass_manager(options).run(brainfuck_parse_compact(tokens))
+    output = list() if generator is TextSizeGenerator else io.BytesIO()
+    BrainfuckLinuxX64(options, "runtime.asm", generator).compile(output, module)
+    return output
+
+
+def run_program(tokens: bytes, options: BrainfuckOptions) -> float:
+    binary = compile_program(tokens, options, ElfExecutableGenerator).getvalue()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "program")
+        with open(path, "wb") as file:
+            file.write(binary)
+        os.chmod(path, 0o755)
+        start = time.perf_counter()
+        subprocess.run([path], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+        return time.perf_counter() - start
+
+
+def main(args):
+    names = args[1:] or PROGRAMS
+    print(
+        f"{'program':<18} {'memory':<6} {'inlined':>9} {'outlined':>9}"
+        f" {'ratio':>6} {'inlined s':>10} {'outlined s':>10}"
+    )
+    for name in names:
+        with open(os.path.join(TEST_DIR, name), "rb") as file:
+            tokens = file.read()
+        for mode, memory_overflow in MODES.items():
+            sizes = list()
+            seconds = list()
+            for outline_loops in (False, True):
+                options = BrainfuckOptions(
+                    "bench",
+                    memory_overflow=memory_overflow,
+                    evaluation_steps=0,
+                    outline_loops=outline_loops,
+                )
+                sizes.extend(compile_program(tokens, options, TextSizeGenerator))
+                seconds.append(run_program(tokens, options))
+            print(
+                f"{name:<18} {mode:<6} {sizes[0]:>9} {sizes[1]:>9}"
+                f" {sizes[1] / sizes[0]:>6.2f} {seconds[0]:>10.3f}"
+                f" {seconds[1]:>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,40 @@
+from bfc.Parser import brainfuck_parse_compact
+from bfc.IROptimizer import brainfuck_ir_optimize
+import sys
+import time
+
+
+SIZES = (10**4, 10**5, 10**6)
+NESTING = 64
+
+
+def straight_line(size: int) -> bytes:
+    pattern = b"+++>>--<.-<"
+    return pattern * (size // len(pattern))
+
+
+def nested(size: int, depth: int = NESTING) -> bytes:
+    pattern = b"[>+" * depth + b"<-]" * depth
+    return pattern * max(1, size // len(pattern))
+
+
+def measure(tokens: bytes) -> float:
+    ir = brainfuck_parse_compact(tokens)
+    start = time.perf_counter()
+    brainfuck_ir_optimize(ir)
+    return time.perf_counter() - start
+
+
+def main(args):
+    sizes = tuple(int(arg) for arg in args[1:]) or SIZES
+    print(f"{'workload':<12} {'tokens':>9} {'seconds':>9} {'ns/token':>9}")
+    for name, workload in (("straight", straight_line), ("nested", nested)):
+        for size in sizes:
+            tokens = workload(size)
+            elapsed = measure(tokens)
+            per_token = elapsed * 1e9 / len(tokens)
+            print(f"{name:<12} {len(tokens):>9} {elapsed:>9.3f} {per_token:>9.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,84 @@
+from bfc.Parser import brainfuck_parse_compact
+from bfc.PassManager import brainfuck_pass_manager
+from bfc.Options import *
+from bfc.Profile import BrainfuckProfile
+from bfc.Token import brainfuck_load_source
+from bfc.x64_linux.Codegen import BrainfuckLinuxX64
+from bfc.x64_linux.Elf import ElfExecutableGenerator
+from benchmarks.outline import TEST_DIR, TextSizeGenerator
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+PROGRAMS = ("hanoi.b", "mandel.b", "bottles.b", "squares.b", "long.b")
+MODES = {"wrap": MemoryOverflow.Wrap, "abort": MemoryOverflow.Abort}
+
+
+def compile_program(file_name: str, options: BrainfuckOptions, generator):
+    tokens, positions = brainfuck_load_source(
+        file_name, options.get_source_positions()
+    )
+    module = brainfuck_pass_manager(options).run(
+        brainfuck_parse_compact(tokens, positions)
+    )
+    output = list() if generator is TextSizeGenerator else io.BytesIO()
+    BrainfuckLinuxX64(options, "runtime.asm", generator).compile(output, module)
+    return output
+
+
+def run_program(file_name: str, options: BrainfuckOptions, directory: str) -> float:
+    binary = compile_program(file_name, options, ElfExecutableGenerator).getvalue()
+    path = os.path.join(directory, "program")
+    with open(path, "wb") as file:
+        file.write(binary)
+    os.chmod(path, 0o755)
+    start = time.perf_counter()
+    subprocess.run([path], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main(args):
+    names = args[1:] or PROGRAMS
+    print(
+        f"{'program':<18} {'memory':<6} {'sites':>6} {'plain':>9} {'pgo':>9}"
+        f" {'plain s':>8} {'instr s':>8} {'pgo s':>8}"
+    )
+    for name in names:
+        file_name = os.path.join(TEST_DIR, name)
+        for mode, memory_overflow in MODES.items():
+            with tempfile.TemporaryDirectory() as directory:
+                profile_file = os.path.join(directory, "profile")
+                plain = BrainfuckOptions(
+                    "bench", memory_overflow=memory_overflow, evaluation_steps=0
+                )
+                instrumented = BrainfuckOptions(
+                    "bench",
+                    memory_overflow=memory_overflow,
+                    evaluation_steps=0,
+                    profile_generate=profile_file,
+                )
+                plain_seconds = run_program(file_name, plain, directory)
+                instrumented_seconds = run_program(file_name, instrumented, directory)
+                profile = BrainfuckProfile.load(profile_file)
+                guided = BrainfuckOptions(
+                    "bench",
+                    memory_overflow=memory_overflow,
+                    evaluation_steps=0,
+                    profile=profile,
+                )
+                guided_seconds = run_program(file_name, guided, directory)
+            sizes = compile_program(file_name, plain, TextSizeGenerator)
+            sizes.extend(compile_program(file_name, guided, TextSizeGenerator))
+            print(
+                f"{name:<18} {mode:<6} {len(profile):>6} {sizes[0]:>9}"
+                f" {sizes[1]:>9} {plain_seconds:>8.3f}"
+                f" {instrumented_seconds:>8.3f} {guided_seconds:>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,79 @@
+from bfc.Parser import brainfuck_parse_compact
+from bfc.PassManager import brainfuck_pass_manager
+from bfc.Options import *
+from bfc.x64_linux.Codegen import brainfuck_compile_x64_linux
+from benchmarks.hashcons import reset_caches
+import io
+import sys
+import time
+import tracemalloc
+
+
+SIZES = (10**4, 10**5, 10**6)
+DEPTHS = (10**2, 10**3, 10**4)
+
+
+def flat(size: int) -> bytes:
+    pattern = b",[->+>++<<]>"
+    return pattern * (size // len(pattern))
+
+
+def nested(depth: int) -> bytes:
+    return b"," + b"[>+" * depth + b"<-]" * depth
+
+
+def chain(size: int) -> bytes:
+    return b",[" + b">+<+" * (size // 4) + b"-]"
+
+
+PROGRAMS = {
+    "flat": (flat, SIZES),
+    "nested": (nested, DEPTHS),
+    "chain": (chain, SIZES),
+}
+
+
+def compile_program(tokens: bytes, memory_overflow: MemoryOverflow):
+    options = BrainfuckOptions(
+        "bench", memory_overflow=memory_overflow, evaluation_steps=0
+    )
+    module = brainfuck_pass_manager(options).run(brainfuck_parse_compact(tokens))
+    brainfuck_compile_x64_linux(io.StringIO(), module, options)
+
+
+def measure(tokens: bytes, memory_overflow: MemoryOverflow) -> (float, int):
+    reset_caches()
+    start = time.perf_counter()
+    compile_program(tokens, memory_overflow)
+    seconds = time.perf_counter() - start
+    reset_caches()
+    tracemalloc.start()
+    try:
+        compile_program(tokens, memory_overflow)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def main(args):
+    names = args[1:] or PROGRAMS
+    print(
+        f"{'program':<8} {'memory':<9} {'size':>8} {'seconds':>9}"
+        f" {'us/size':>8} {'peak MiB':>9} {'B/size':>8}"
+    )
+    for name in names:
+        generate, sizes = PROGRAMS[name]
+        for memory_overflow in (MemoryOverflow.Undefined, MemoryOverflow.Abort):
+            for size in sizes:
+                seconds, peak = measure(generate(size), memory_overflow)
+                print(
+                    f"{name:<8} {memory_overflow.value:<9} {size:>8}"
+                    f" {seconds:>9.3f} {seconds / size * 1e6:>8.2f}"
+                    f" {peak / (1 << 20):>9.1f} {peak / size:>8.0f}"
+                )
+    reset_caches()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
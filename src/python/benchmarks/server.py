@@ -0,0 +1,59 @@
+from bfc.Server import BrainfuckCompileServer
+from benchmarks.outline import TEST_DIR
+import main as compiler
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+PROGRAMS = ("hello.b", "abc.b", "hi123.b", "bottles.b", "squares.b")
+TARGETS = ("x64-linux", "x64-linux-elf")
+REPEATS = 5
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def measure(*command: str) -> float:
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *command], cwd=ROOT, stdout=subprocess.DEVNULL, check=True
+        )
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main(args):
+    names = args[1:] or PROGRAMS
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bfc.sock")
+        with BrainfuckCompileServer(path, compiler.parse_request) as server:
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                print(
+                    f"{'program':<12} {'target':<14} {'main s':>8} {'client s':>8}"
+                    f" {'speedup':>8}"
+                )
+                for name in names:
+                    file_name = os.path.abspath(os.path.join(TEST_DIR, name))
+                    for target in TARGETS:
+                        direct = measure("main.py", file_name, target)
+                        served = measure(
+                            "client.py", f"socket={path}", file_name, target
+                        )
+                        print(
+                            f"{name:<12} {target:<14} {direct:>8.3f} {served:>8.3f}"
+                            f" {direct / served:>7.1f}x"
+                        )
+            finally:
+                server.shutdown()
+                thread.join()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
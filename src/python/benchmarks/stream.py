@@ -0,0 +1,72 @@
+from bfc.Parser import brainfuck_parse_compact
+from bfc.PassManager import brainfuck_pass_manager
+from bfc.Stream import brainfuck_stream_segments
+from bfc.Options import *
+from bfc.x64_linux.Codegen import (
+    brainfuck_compile_x64_linux,
+    brainfuck_stream_x64_linux,
+)
+from benchmarks.hashcons import reset_caches
+from benchmarks.scaling import flat, chain
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+
+SIZES = (10**4, 10**5, 10**6)
+
+PROGRAMS = {
+    "flat": flat,
+    "chain": chain,
+}
+
+
+def compile_whole(source: bytes, options: BrainfuckOptions, output):
+    module = brainfuck_pass_manager(options).run(brainfuck_parse_compact(source))
+    brainfuck_compile_x64_linux(output, module, options)
+
+
+def compile_stream(source: bytes, options: BrainfuckOptions, output):
+    segments = brainfuck_stream_segments(io.BytesIO(source), options)
+    brainfuck_stream_x64_linux(output, segments, options)
+
+
+def measure(compile_program, source: bytes, options: BrainfuckOptions):
+    with open(os.devnull, "w") as output:
+        reset_caches()
+        start = time.perf_counter()
+        compile_program(source, options, output)
+        seconds = time.perf_counter() - start
+        reset_caches()
+        tracemalloc.start()
+        try:
+            compile_program(source, options, output)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return seconds, peak
+
+
+def main(args):
+    names = args[1:] or PROGRAMS
+    options = BrainfuckOptions("bench", memory_overflow=MemoryOverflow.Abort)
+    print(
+        f"{'program':<8} {'size':>8} {'whole s':>8} {'stream s':>8}"
+        f" {'whole MiB':>9} {'stream MiB':>10}"
+    )
+    for name in names:
+        for size in SIZES:
+            source = PROGRAMS[name](size)
+            whole_seconds, whole_peak = measure(compile_whole, source, options)
+            stream_seconds, stream_peak = measure(compile_stream, source, options)
+            print(
+                f"{name:<8} {size:>8} {whole_seconds:>8.3f} {stream_seconds:>8.3f}"
+                f" {whole_peak / (1 << 20):>9.1f} {stream_peak / (1 << 20):>10.1f}"
+            )
+    reset_caches()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
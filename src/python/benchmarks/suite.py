@@ -0,0 +1,170 @@
+from bfc.Build import brainfuck_assemble, brainfuck_link
+from bfc.Options import *
+from bfc.Statistics import brainfuck_compile_statistics
+from bfc.x64_linux.Codegen import brainfuck_compile_x64_linux
+from benchmarks.hashcons import reset_caches
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+TEST_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "test")
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+PROGRAMS = ("mandel.b", "hanoi.b", "long.b", "bench.b", "bottles.b")
+CELL_SIZES = {
+    "byte": MemoryCellSize.Byte,
+    "word": MemoryCellSize.Word,
+    "dword": MemoryCellSize.DWord,
+}
+MEMORY_MODELS = {
+    "wrap": MemoryOverflow.Wrap,
+    "abort": MemoryOverflow.Abort,
+    "undefined": MemoryOverflow.Undefined,
+}
+REPEATS = 3
+TIME_TOLERANCE = 0.5
+TIME_SLACK = 0.01
+COUNT_TOLERANCE = 0.0
+
+LOOP_LABEL = re.compile(r"^_bf_loop\d+_start:$", re.MULTILINE)
+COPY_LABEL = re.compile(r"^_bf_copy\d+_end:$", re.MULTILINE)
+INSTRUCTION = re.compile(r"^\t(?!db )\w", re.MULTILINE)
+
+
+def count_code(asm: str) -> dict:
+    code = asm[asm.index("_bf_entry:") :]
+    return {
+        "instructions": len(INSTRUCTION.findall(code)),
+        "loops": len(LOOP_LABEL.findall(code)),
+        "copies": len(COPY_LABEL.findall(code)),
+        "normalize_calls": code.count("call _bf_normalize_pointer\n"),
+        "write_calls": code.count("call _bf_write\n"),
+    }
+
+
+def compile_program(source: bytes, options: BrainfuckOptions) -> (dict, str):
+    phases = None
+    for _ in range(REPEATS):
+        reset_caches()
+        output = io.StringIO()
+        statistics = brainfuck_compile_statistics(
+            source, brainfuck_compile_x64_linux, output, options, False
+        )
+        times = dict()
+        for phase in statistics.get_phases():
+            name = phase.get_name()
+            times[name] = times.get(name, 0.0) + phase.get_wall_time()
+        if phases is None:
+            phases = times
+        else:
+            phases = {name: min(phases[name], times[name]) for name in phases}
+    return phases, output.getvalue()
+
+
+def run_program(asm: str) -> float:
+    if shutil.which("nasm") is None or shutil.which("ld") is None:
+        return None
+    with tempfile.TemporaryDirectory() as directory:
+        base = os.path.join(directory, "program")
+        with open(base + ".asm", "w") as file:
+            file.write(asm)
+        brainfuck_assemble(base)
+        brainfuck_link(base)
+        start = time.perf_counter()
+        subprocess.run([base], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+        return time.perf_counter() - start
+
+
+def measure(name: str, cell: str, memory: str) -> dict:
+    with open(os.path.join(TEST_DIR, name), "rb") as file:
+        source = file.read()
+    options = BrainfuckOptions(
+        "bench", memory_overflow=MEMORY_MODELS[memory], cell_size=CELL_SIZES[cell]
+    )
+    phases, asm = compile_program(source, options)
+    return {
+        "phases": phases,
+        "counts": count_code(asm),
+        "run": run_program(asm),
+    }
+
+
+def slower(seconds: float, expected: float, tolerance: float) -> bool:
+    return seconds > expected * (1 + tolerance) + TIME_SLACK
+
+
+def regressions(key: str, result: dict, baseline: dict, tolerance: float) -> [str]:
+    found = list()
+    for phase, seconds in result["phases"].items():
+        expected = baseline["phases"].get(phase)
+        if expected is not None and slower(seconds, expected, tolerance):
+            found.append(f"{key} {phase}: {seconds:.4f}s, baseline {expected:.4f}s")
+    for metric, count in result["counts"].items():
+        expected = baseline["counts"].get(metric)
+        if expected is not None and count > expected * (1 + COUNT_TOLERANCE):
+            found.append(f"{key} {metric}: {count}, baseline {expected}")
+    expected = baseline.get("run")
+    if expected is not None and result["run"] is not None:
+        if slower(result["run"], expected, tolerance):
+            found.append(f"{key} run: {result['run']:.4f}s, baseline {expected:.4f}s")
+    return found
+
+
+def main(args):
+    names = [arg for arg in args[1:] if "=" not in arg and not arg.startswith("--")]
+    params = dict(arg.split("=", 1) for arg in args[1:] if "=" in arg)
+    path = params.get("baseline", BASELINE)
+    tolerance = float(params.get("tolerance", TIME_TOLERANCE))
+    save = "--save" in args
+    baselines = dict()
+    if os.path.exists(path):
+        with open(path) as file:
+            baselines = json.load(file)
+    print(
+        f"{'program':<12} {'cell':<5} {'memory':<9} {'compile s':>9}"
+        f" {'parse s':>8} {'passes s':>8} {'codegen s':>9} {'instrs':>8}"
+        f" {'loops':>6} {'copies':>6} {'normalize':>9} {'writes':>6} {'run s':>7}"
+    )
+    results = dict()
+    found = list()
+    for name in names or PROGRAMS:
+        for cell in CELL_SIZES:
+            for memory in MEMORY_MODELS:
+                key = f"{name}:{cell}:{memory}"
+                result = measure(name, cell, memory)
+                results[key] = result
+                if not save and key in baselines:
+                    found.extend(regressions(key, result, baselines[key], tolerance))
+                phases = result["phases"]
+                counts = result["counts"]
+                passes = sum(phases.values()) - phases["tokenize"]
+                passes -= phases["parse"] + phases["codegen"]
+                run = "-" if result["run"] is None else f"{result['run']:.3f}"
+                print(
+                    f"{name:<12} {cell:<5} {memory:<9}"
+                    f" {sum(phases.values()):>9.3f} {phases['parse']:>8.3f}"
+                    f" {passes:>8.3f} {phases['codegen']:>9.3f}"
+                    f" {counts['instructions']:>8} {counts['loops']:>6}"
+                    f" {counts['copies']:>6} {counts['normalize_calls']:>9}"
+                    f" {counts['write_calls']:>6} {run:>7}"
+                )
+    if save:
+        baselines.update(results)
+        with open(path, "w") as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} baselines to {path}")
+        return
+    for regression in found:
+        print(f"Regression: {regression}")
+    if found:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
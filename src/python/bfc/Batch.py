@@ -0,0 +1,133 @@
+from bfc.Interpreter import *
+from bfc.Options import *
+from bfc.Error import BrainfuckError
+import numpy
+
+
+TAPE_DTYPES = {
+    MemoryCellSize.Byte: numpy.uint8,
+    MemoryCellSize.Word: numpy.uint16,
+    MemoryCellSize.DWord: numpy.uint32,
+}
+
+
+class BrainfuckBatchInterpreter(BrainfuckInterpreter):
+    def create_tapes(self, count: int):
+        dtype = TAPE_DTYPES[self._options.get_cell_size()]
+        return numpy.zeros((count, self.get_memory_size()), dtype=dtype)
+
+    def execute_batch(self, code: list, inputs: [bytes]) -> [bytes]:
+        count = len(inputs)
+        tapes = self.create_tapes(count)
+        cell = tapes.dtype.type
+        size = tapes.shape[1]
+        wrap = self._options.get_memory_overflow() == MemoryOverflow.Wrap
+        abort = self._options.get_memory_overflow() == MemoryOverflow.Abort
+        pointers = numpy.zeros(count, dtype=numpy.int64)
+        input_lengths = numpy.array([len(data) for data in inputs], dtype=numpy.int64)
+        input_buffer = numpy.zeros(
+            (count, int(input_lengths.max(initial=0)) + 1), dtype=numpy.uint8
+        )
+        for index, data in enumerate(inputs):
+            input_buffer[index, : len(data)] = numpy.frombuffer(data, numpy.uint8)
+        input_positions = numpy.zeros(count, dtype=numpy.int64)
+        written = list()
+        active = numpy.arange(count)
+        suspended = list()
+        pc = 0
+        end = len(code)
+        while pc < end:
+            op, a, b = code[pc]
+            pc += 1
+            if op == ADD:
+                tapes[active, pointers[active] + a] += cell(b)
+            elif op == SET:
+                tapes[active, pointers[active] + a] = cell(b)
+            elif op == SHIFT:
+                pointers[active] += a
+            elif op == SHIFT_WRAP:
+                pointers[active] = (pointers[active] + a) % size
+            elif op == SHIFT_CHECK:
+                moved = pointers[active] + a
+                if ((moved < 0) | (moved >= size)).any():
+                    raise BrainfuckError("Memory overflow")
+                pointers[active] = moved
+            elif op == LOOP:
+                entering = active[tapes[active, pointers[active]] != 0]
+                suspended.append(active)
+                active = entering
+                if len(active) == 0:
+                    active = suspended.pop()
+                    pc = a
+            elif op == END:
+                repeating = active[tapes[active, pointers[active]] != 0]
+                if len(repeating) > 0:
+                    active = repeating
+                    pc = a
+                else:
+                    active = suspended.pop()
+            elif op == COPY:
+                current = pointers[active]
+                values = tapes[active, current]
+                moving = values != 0
+                tapes[active, current] = 0
+                for offset, factor in a:
+                    targets = current + offset
+                    if wrap:
+                        targets %= size
+                    elif abort:
+                        outside = (targets < 0) | (targets >= size)
+                        if (outside & moving).any():
+                            raise BrainfuckError("Memory overflow")
+                        targets = numpy.where(outside, current, targets)
+                    tapes[active, targets] += values * cell(factor)
+            elif op == SCAN:
+                scanning = active
+                while len(scanning) > 0:
+                    scanning = scanning[tapes[scanning, pointers[scanning]] != 0]
+                    moved = pointers[scanning] + a
+                    if wrap:
+                        moved %= size
+                    elif abort and ((moved < 0) | (moved >= size)).any():
+                        raise BrainfuckError("Memory overflow")
+                    pointers[scanning] = moved
+            elif op == WRITE:
+                values = tapes[active, pointers[active] + a] & 0xFF
+                written.append((active, values.astype(numpy.uint8)))
+            elif op == PRINT:
+                values = numpy.frombuffer(a, dtype=numpy.uint8)
+                written.append(
+                    (numpy.repeat(active, len(values)), numpy.tile(values, len(active)))
+                )
+            elif op == LOAD:
+                cells = pointers[active, None] + numpy.arange(len(a))
+                tapes[active[:, None], cells] = numpy.frombuffer(a, dtype=tapes.dtype)
+            elif op == READ:
+                positions = input_positions[active]
+                available = positions < input_lengths[active]
+                readers = active[available]
+                tapes[readers, pointers[readers] + a] = input_buffer[
+                    readers, positions[available]
+                ]
+                input_positions[readers] += 1
+        return self._collect_output(count, written)
+
+    def _collect_output(self, count: int, written: list) -> [bytes]:
+        if not written:
+            return [b""] * count
+        instances = numpy.concatenate([active for active, _ in written])
+        values = numpy.concatenate([values for _, values in written])
+        order = numpy.argsort(instances, kind="stable")
+        boundaries = numpy.cumsum(numpy.bincount(instances, minlength=count))[:-1]
+        return [
+            chunk.tobytes() for chunk in numpy.split(values[order], boundaries)
+        ]
+
+    def run_batch(self, module, inputs: [bytes]) -> [bytes]:
+        return self.execute_batch(self.lower(module), list(inputs))
+
+
+def brainfuck_run_batch(
+    module, options: BrainfuckOptions, inputs: [bytes]
+) -> [bytes]:
+    return BrainfuckBatchInterpreter(options).run_batch(module, inputs)
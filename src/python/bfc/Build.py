@@ -0,0 +1,183 @@
+from bfc.Token import brainfuck_load_source
+from bfc.Parser import brainfuck_parse_compact
+from bfc.PassManager import brainfuck_pass_manager
+from bfc.Cache import BrainfuckCache, brainfuck_cache_key
+from bfc.Codegen import Codegen, BinaryCodegen
+from bfc.Error import BrainfuckError
+from bfc.Options import *
+from bfc.x64_linux.Codegen import (
+    brainfuck_compile_x64_linux,
+    brainfuck_compile_x64_linux_lib,
+    brainfuck_compile_x64_linux_elf,
+    brainfuck_compile_x64_linux_lib_elf,
+)
+import concurrent.futures
+import functools
+import io
+import os
+import subprocess
+import time
+
+
+SOURCE_SUFFIX = ".b"
+EXECUTABLE_MODE = 0o755
+BUILD_STEPS = ("compile", "assemble", "link")
+
+
+def brainfuck_run_tool(*command: str):
+    try:
+        subprocess.run(command, check=True, capture_output=True, text=True)
+    except FileNotFoundError:
+        raise BrainfuckError(f"{command[0]} not found")
+    except subprocess.CalledProcessError as error:
+        raise BrainfuckError(f"{command[0]} failed: {error.stderr.strip()}")
+
+
+def brainfuck_assemble(base: str):
+    brainfuck_run_tool("nasm", "-f", "elf64", "-o", base + ".o", base + ".asm")
+
+
+def brainfuck_link(base: str):
+    brainfuck_run_tool("ld", "-o", base, base + ".o")
+
+
+BUILD_TARGETS = {
+    brainfuck_compile_x64_linux: (".asm", (brainfuck_assemble, brainfuck_link)),
+    brainfuck_compile_x64_linux_lib: (".asm", (brainfuck_assemble,)),
+    brainfuck_compile_x64_linux_elf: ("", ()),
+    brainfuck_compile_x64_linux_lib_elf: (".o", ()),
+}
+
+
+def brainfuck_compile_source(
+    file_name: str, codegen, options: BrainfuckOptions, cache: BrainfuckCache = None
+):
+    tokens, positions = brainfuck_load_source(
+        file_name, options.get_source_positions()
+    )
+    return brainfuck_compile_tokens(tokens, positions, codegen, options, cache)
+
+
+def brainfuck_compile_tokens(
+    tokens: bytes,
+    positions: list,
+    codegen,
+    options: BrainfuckOptions,
+    cache: BrainfuckCache = None,
+):
+    if cache is not None:
+        key = brainfuck_cache_key(tokens, options, codegen.__name__, positions)
+        entry = cache.load(key)
+        if entry is not None:
+            return entry[1]
+    module = brainfuck_parse_compact(tokens, positions)
+    ir = brainfuck_pass_manager(options).run(module)
+    output = io.BytesIO() if codegen in BinaryCodegen else io.StringIO()
+    codegen(output, ir, options)
+    output = output.getvalue()
+    if cache is not None:
+        cache.store(key, ir, output)
+    return output
+
+
+def brainfuck_build_sources(paths: [str]) -> [str]:
+    sources = list()
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(os.listdir(path))
+            sources.extend(
+                os.path.join(path, name)
+                for name in names
+                if name.endswith(SOURCE_SUFFIX)
+            )
+        else:
+            sources.append(path)
+    return sources
+
+
+class BrainfuckBuildResult:
+    def __init__(self, source: str):
+        self._source = source
+        self._times = dict()
+        self._error = None
+
+    def get_source(self) -> str:
+        return self._source
+
+    def get_time(self, step: str) -> float:
+        return self._times.get(step)
+
+    def get_total_time(self) -> float:
+        return sum(self._times.values())
+
+    def get_error(self) -> str:
+        return self._error
+
+    def measure(self, step: str, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        self._times[step] = time.perf_counter() - start
+        return result
+
+    def fail(self, error: str):
+        self._error = error
+
+    @staticmethod
+    def header() -> str:
+        steps = "".join(f" {step:>10}" for step in BUILD_STEPS)
+        return f"{'source':<32}{steps} {'total':>10}"
+
+    def __str__(self):
+        steps = ""
+        for step in BUILD_STEPS:
+            seconds = self.get_time(step)
+            steps += f" {'-':>10}" if seconds is None else f" {seconds:>10.4f}"
+        line = f"{self._source:<32}{steps} {self.get_total_time():>10.4f}"
+        if self._error is not None:
+            line += f" error: {self._error}"
+        return line
+
+
+def brainfuck_write_output(path: str, output):
+    with open(path, "wb" if isinstance(output, bytes) else "w") as target:
+        target.write(output if isinstance(output, bytes) else output + "\n")
+
+
+def brainfuck_build_file(
+    source: str, codegen, options: BrainfuckOptions, cache: BrainfuckCache = None
+) -> BrainfuckBuildResult:
+    result = BrainfuckBuildResult(source)
+    base = os.path.splitext(source)[0]
+    options = options.with_module_name(os.path.basename(source).split(".")[0])
+    suffix, steps = BUILD_TARGETS[codegen]
+    try:
+        output = result.measure(
+            "compile", brainfuck_compile_source, source, codegen, options, cache
+        )
+        brainfuck_write_output(base + suffix, output)
+        if not suffix:
+            os.chmod(base, EXECUTABLE_MODE)
+        for step, function in zip(BUILD_STEPS[1:], steps):
+            result.measure(step, function, base)
+    except (BrainfuckError, OSError, RecursionError) as error:
+        result.fail(str(error))
+    return result
+
+
+def brainfuck_build(
+    sources: [str],
+    codegen,
+    options: BrainfuckOptions,
+    jobs: int = None,
+    cache: BrainfuckCache = None,
+) -> [BrainfuckBuildResult]:
+    if codegen not in BUILD_TARGETS:
+        name = next(name for name, value in Codegen.items() if value is codegen)
+        raise BrainfuckError(f"Code generator {name} can not build files")
+    build = functools.partial(
+        brainfuck_build_file, codegen=codegen, options=options, cache=cache
+    )
+    if jobs == 1:
+        return list(map(build, sources))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(build, sources))
@@ -0,0 +1,121 @@
+from bfc.Options import *
+import functools
+import hashlib
+import os
+import pickle
+import tempfile
+
+
+CACHE_SIZE = 256 << 20
+CACHE_SUFFIX = ".entry"
+CACHE_MODE = 0o644
+COMPILER_SOURCES = (".py", ".asm")
+
+
+@functools.lru_cache(maxsize=None)
+def brainfuck_compiler_version() -> str:
+    digest = hashlib.sha256()
+    root = os.path.dirname(os.path.abspath(__file__))
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = sorted(name for name in subdirectories if name[0] != "_")
+        for name in sorted(files):
+            if name.endswith(COMPILER_SOURCES):
+                path = os.path.join(directory, name)
+                digest.update(os.path.relpath(path, root).encode())
+                with open(path, "rb") as source:
+                    digest.update(source.read())
+    return digest.hexdigest()
+
+
+def brainfuck_cache_key(
+    tokens: bytes, options: BrainfuckOptions, codegen: str, positions: list = None
+):
+    digest = hashlib.sha256()
+    parts = (
+        tokens,
+        repr(sorted(vars(options).items())).encode(),
+        codegen.encode(),
+        brainfuck_compiler_version().encode(),
+        repr(positions).encode(),
+    )
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class BrainfuckCache:
+    def __init__(self, directory: str, max_size: int = CACHE_SIZE):
+        self._directory = directory
+        self._max_size = max_size
+        self._hits = 0
+        self._misses = 0
+
+    def get_directory(self) -> str:
+        return self._directory
+
+    def get_max_size(self) -> int:
+        return self._max_size
+
+    def get_hits(self) -> int:
+        return self._hits
+
+    def get_misses(self) -> int:
+        return self._misses
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self._directory, key[:2], key + CACHE_SUFFIX)
+
+    def load(self, key: str):
+        path = self.get_path(key)
+        try:
+            with open(path, "rb") as entry:
+                ir, output = pickle.load(entry)
+            os.utime(path)
+        except Exception:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return ir, output
+
+    def store(self, key: str, ir, output):
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(
+            suffix=".tmp", dir=os.path.dirname(path)
+        )
+        try:
+            with os.fdopen(descriptor, "wb") as entry:
+                pickle.dump((ir, output), entry, pickle.HIGHEST_PROTOCOL)
+            os.chmod(temporary, CACHE_MODE)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self.evict()
+
+    def get_entries(self) -> list:
+        entries = list()
+        for directory, _, files in os.walk(self._directory):
+            for name in files:
+                if not name.endswith(CACHE_SUFFIX):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    status = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((status.st_mtime, status.st_size, path))
+        return entries
+
+    def evict(self):
+        entries = self.get_entries()
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self._max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
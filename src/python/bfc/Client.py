@@ -0,0 +1,56 @@
+import json
+import os
+import socket
+import struct
+import tempfile
+
+
+SERVER_SOCKET = os.path.join(tempfile.gettempdir(), f"bfc-{os.getuid()}.sock")
+MESSAGE_HEADER = struct.Struct("<IQ")
+RECEIVE_SIZE = 1 << 20
+PATH_PARAMS = ("profile", "profile-generate", "cache")
+
+
+def brainfuck_send_message(connection, header: dict, payload: bytes = b""):
+    data = json.dumps(header).encode()
+    connection.sendall(MESSAGE_HEADER.pack(len(data), len(payload)) + data)
+    connection.sendall(payload)
+
+
+def brainfuck_receive_exactly(connection, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = connection.recv(min(size - len(data), RECEIVE_SIZE))
+        if not chunk:
+            raise ConnectionError("Compile server closed the connection")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def brainfuck_receive_message(connection) -> (dict, bytes):
+    header_size, payload_size = MESSAGE_HEADER.unpack(
+        brainfuck_receive_exactly(connection, MESSAGE_HEADER.size)
+    )
+    header = json.loads(brainfuck_receive_exactly(connection, header_size))
+    return header, brainfuck_receive_exactly(connection, payload_size)
+
+
+def brainfuck_request_args(args: [str]) -> [str]:
+    request = list()
+    for arg in args:
+        key, _, value = arg.partition("=")
+        if key in PATH_PARAMS and value:
+            arg = f"{key}={os.path.abspath(value)}"
+        request.append(arg)
+    return request
+
+
+def brainfuck_request_compile(
+    args: [str], source: bytes, path: str = SERVER_SOCKET
+) -> (dict, bytes):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        brainfuck_send_message(
+            connection, {"args": brainfuck_request_args(args)}, source
+        )
+        return brainfuck_receive_message(connection)
@@ -1,10 +1,37 @@
+from bfc.Interpreter import brainfuck_run_interpreter
+from bfc.Jit import brainfuck_run_jit
 from bfc.x64_linux.Codegen import (
     brainfuck_compile_x64_linux,
     brainfuck_compile_x64_linux_lib,
+    brainfuck_compile_x64_linux_elf,
+    brainfuck_compile_x64_linux_lib_elf,
+    brainfuck_stream_x64_linux,
+    brainfuck_stream_x64_linux_lib,
 )
 
 
 Codegen = {
     "x64-linux": brainfuck_compile_x64_linux,
     "x64-linux-lib": brainfuck_compile_x64_linux_lib,
+    "x64-linux-elf": brainfuck_compile_x64_linux_elf,
+    "x64-linux-lib-elf": brainfuck_compile_x64_linux_lib_elf,
+    "interp": brainfuck_run_interpreter,
+    "jit": brainfuck_run_jit,
+}
+
+BinaryCodegen = {
+    brainfuck_run_interpreter,
+    brainfuck_run_jit,
+    brainfuck_compile_x64_linux_elf,
+    brainfuck_compile_x64_linux_lib_elf,
+}
+
+RunningCodegen = {
+    brainfuck_run_interpreter,
+    brainfuck_run_jit,
+}
+
+StreamCodegen = {
+    brainfuck_compile_x64_linux: brainfuck_stream_x64_linux,
+    brainfuck_compile_x64_linux_lib: brainfuck_stream_x64_linux_lib,
 }
@@ -0,0 +1,299 @@
+from bfc.IR import *
+import array
+import enum
+
+
+class IRArgumentLayout(enum.Enum):
+    Empty = "Empty"
+    Inline = "Inline"
+    Range = "Range"
+    Table = "Table"
+
+
+OPCODES = tuple(IROpcode)
+OPCODE_CODES = {opcode: code for code, opcode in enumerate(OPCODES)}
+ARGUMENT_LAYOUT = {
+    IROpcode.Add: IRArgumentLayout.Inline,
+    IROpcode.Set: IRArgumentLayout.Inline,
+    IROpcode.Shift: IRArgumentLayout.Inline,
+    IROpcode.Write: IRArgumentLayout.Empty,
+    IROpcode.Read: IRArgumentLayout.Empty,
+    IROpcode.Nop: IRArgumentLayout.Empty,
+    IROpcode.Loop: IRArgumentLayout.Range,
+    IROpcode.Copy: IRArgumentLayout.Table,
+    IROpcode.Scan: IRArgumentLayout.Inline,
+    IROpcode.Print: IRArgumentLayout.Table,
+    IROpcode.Load: IRArgumentLayout.Table,
+}
+
+
+def get_argument_layout(opcode: IROpcode) -> IRArgumentLayout:
+    return ARGUMENT_LAYOUT.get(opcode, IRArgumentLayout.Table)
+
+
+CODE_LAYOUTS = tuple(get_argument_layout(opcode) for opcode in OPCODES)
+
+
+class IRCompactBlock:
+    __slots__ = (
+        "_opcodes",
+        "_arguments",
+        "_pointers",
+        "_ends",
+        "_operands",
+        "_positions",
+    )
+
+    def __init__(self):
+        self._opcodes = array.array("B")
+        self._arguments = array.array("q")
+        self._pointers = array.array("q")
+        self._ends = array.array("q")
+        self._operands = list()
+        self._positions = dict()
+
+    def __len__(self):
+        return len(self._opcodes)
+
+    def append(
+        self, opcode: IROpcode, args: tuple = (), pointer: int = 0, position=None
+    ) -> int:
+        index = len(self._opcodes)
+        layout = get_argument_layout(opcode)
+        argument = 0
+        if layout == IRArgumentLayout.Inline:
+            argument = args[0]
+        elif layout == IRArgumentLayout.Table:
+            argument = len(self._operands)
+            self._operands.append(tuple(args))
+        self._opcodes.append(OPCODE_CODES[opcode])
+        self._arguments.append(argument)
+        self._pointers.append(pointer)
+        self._ends.append(index + 1)
+        if position is not None:
+            self._positions[index] = position
+        return index
+
+    def begin_loop(self, pointer: int = 0, position=None) -> int:
+        return self.append(IROpcode.Loop, pointer=pointer, position=position)
+
+    def end_loop(self, index: int):
+        self._ends[index] = len(self._opcodes)
+
+    def append_instruction(self, instr: IRInstruction) -> int:
+        first = len(self._opcodes)
+        stack = [(instr, None)]
+        while stack:
+            instr, loop_index = stack.pop()
+            if loop_index is not None:
+                self.end_loop(loop_index)
+            elif instr.get_opcode() == IROpcode.Loop:
+                loop_index = self.begin_loop(
+                    instr.get_pointer(), instr.get_position()
+                )
+                stack.append((None, loop_index))
+                for child in reversed(instr.get_arguments()[0].get_body()):
+                    stack.append((child, None))
+            else:
+                self.append(
+                    instr.get_opcode(),
+                    instr.get_arguments(),
+                    instr.get_pointer(),
+                    instr.get_position(),
+                )
+        return first
+
+    def get_opcode(self, index: int) -> IROpcode:
+        return OPCODES[self._opcodes[index]]
+
+    def get_arguments(self, index: int) -> tuple:
+        layout = CODE_LAYOUTS[self._opcodes[index]]
+        if layout is IRArgumentLayout.Inline:
+            return (self._arguments[index],)
+        elif layout is IRArgumentLayout.Table:
+            return self._operands[self._arguments[index]]
+        elif layout is IRArgumentLayout.Range:
+            return (IRCompactView(self, index + 1, self._ends[index]),)
+        return ()
+
+    def get_pointer(self, index: int) -> int:
+        return self._pointers[index]
+
+    def get_position(self, index: int):
+        return self._positions.get(index)
+
+    def get_end(self, index: int) -> int:
+        return self._ends[index]
+
+    def get_root(self):
+        return IRCompactView(self, 0, len(self._opcodes))
+
+    def to_block(self, start: int = 0, end: int = None) -> IRInstructionBlock:
+        end = len(self._opcodes) if end is None else end
+        bodies = [[]]
+        loops = list()
+        index = start
+        while index < end or loops:
+            while loops and loops[-1][1] == index:
+                loop_index, _ = loops.pop()
+                loop = IRInstructionBuilder.loop(IRInstructionBlock(bodies.pop()))
+                loop.set_pointer(self._pointers[loop_index])
+                loop.set_position(self.get_position(loop_index))
+                bodies[-1].append(loop)
+            if index >= end:
+                continue
+            if self._opcodes[index] == OPCODE_CODES[IROpcode.Loop]:
+                loops.append((index, self._ends[index]))
+                bodies.append([])
+            else:
+                instr = IRInstruction(
+                    self.get_opcode(index), *self.get_arguments(index)
+                )
+                instr.set_pointer(self._pointers[index])
+                instr.set_position(self.get_position(index))
+                bodies[-1].append(instr)
+            index += 1
+        return IRInstructionBlock(bodies[0])
+
+    @staticmethod
+    def from_block(block: IRInstructionBlock):
+        compact = IRCompactBlock()
+        for instr in block.get_body():
+            compact.append_instruction(instr)
+        return compact
+
+
+class IRCompactInstruction:
+    __slots__ = ("_block", "_index")
+
+    def __init__(self, block: IRCompactBlock, index: int):
+        self._block = block
+        self._index = index
+
+    def get_opcode(self) -> IROpcode:
+        return self._block.get_opcode(self._index)
+
+    def get_arguments(self):
+        return self._block.get_arguments(self._index)
+
+    def get_pointer(self) -> int:
+        return self._block.get_pointer(self._index)
+
+    def get_position(self):
+        return self._block.get_position(self._index)
+
+    def get_dependencies(self) -> list:
+        return ()
+
+    def __str__(self):
+        end = self._block.get_end(self._index)
+        return str(self._block.to_block(self._index, end).get_body()[0])
+
+
+class IRCompactView:
+    __slots__ = ("_block", "_start", "_end")
+
+    def __init__(self, block: IRCompactBlock, start: int, end: int):
+        self._block = block
+        self._start = start
+        self._end = end
+
+    def __len__(self):
+        return self._end - self._start
+
+    def get_body(self) -> [IRCompactInstruction]:
+        body = list()
+        index = self._start
+        while index < self._end:
+            body.append(IRCompactInstruction(self._block, index))
+            index = self._block.get_end(index)
+        return body
+
+    def get_memory_space(self):
+        shift = OPCODE_CODES[IROpcode.Shift]
+        loop = OPCODE_CODES[IROpcode.Loop]
+        scan = OPCODE_CODES[IROpcode.Scan]
+        offset = 0
+        minimal_offset = 0
+        maximal_offset = 0
+        loops = list()
+        for index in range(self._start, self._end):
+            while loops and loops[-1][0] == index:
+                if loops.pop()[1] != offset:
+                    return None
+            code = self._block._opcodes[index]
+            if code == shift:
+                offset += self._block._arguments[index]
+                if offset > maximal_offset:
+                    maximal_offset = offset
+                elif offset < minimal_offset:
+                    minimal_offset = offset
+            elif code == loop:
+                loops.append((self._block.get_end(index), offset))
+            elif code == scan:
+                return None
+        while loops:
+            if loops.pop()[1] != offset:
+                return None
+        if offset == 0:
+            return minimal_offset, maximal_offset
+        else:
+            return None
+
+    def to_block(self) -> IRInstructionBlock:
+        return self._block.to_block(self._start, self._end)
+
+
+class IRCompactBuilder:
+    def __init__(self, block: IRCompactBlock = None):
+        self._block = IRCompactBlock() if block is None else block
+        self._loops = list()
+
+    def get_block(self) -> IRCompactBlock:
+        return self._block
+
+    def get_depth(self) -> int:
+        return len(self._loops)
+
+    def add(self, value: int):
+        return self._block.append(IROpcode.Add, (value,))
+
+    def set(self, value: int):
+        return self._block.append(IROpcode.Set, (value,))
+
+    def shift(self, value: int):
+        return self._block.append(IROpcode.Shift, (value,))
+
+    def write(self):
+        return self._block.append(IROpcode.Write)
+
+    def read(self):
+        return self._block.append(IROpcode.Read)
+
+    def print(self, data: bytes):
+        return self._block.append(IROpcode.Print, (data,))
+
+    def load(self, values: tuple):
+        return self._block.append(IROpcode.Load, (values,))
+
+    def nop(self):
+        return self._block.append(IROpcode.Nop)
+
+    def copy(self, offsets: [int]):
+        return self._block.append(IROpcode.Copy, tuple(offsets))
+
+    def scan(self, stride: int):
+        return self._block.append(IROpcode.Scan, (stride,))
+
+    def begin_loop(self, position=None):
+        index = self._block.begin_loop(position=position)
+        self._loops.append(index)
+        return index
+
+    def end_loop(self):
+        index = self._loops.pop()
+        self._block.end_loop(index)
+        return index
+
+    def instruction(self, instr: IRInstruction):
+        return self._block.append_instruction(instr)
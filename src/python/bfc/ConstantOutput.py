@@ -0,0 +1,235 @@
+from bfc.IR import *
+from bfc.Options import *
+from bfc.HashCons import *
+
+
+LOOP_EVALUATION_BUDGET = 1 << 16
+WRITTEN_CELLS_LIMIT = 1 << 8
+COALESCED_LOOPS = IRBoundedCache()
+WRITTEN_CELLS = IRBoundedCache()
+
+
+class IRKnownValues:
+    def __init__(self, mask: int, zero_filled: bool = False):
+        self._mask = mask
+        self._zero_filled = zero_filled
+        self._values = dict()
+
+    def get_mask(self) -> int:
+        return self._mask
+
+    def get(self, offset: int):
+        return self._values.get(offset, 0 if self._zero_filled else None)
+
+    def set(self, offset: int, value: int):
+        self._values[offset] = value & self._mask
+
+    def forget(self, offset: int):
+        self._values[offset] = None
+
+    def forget_all(self):
+        self._zero_filled = False
+        self._values = dict()
+
+
+class IRWrittenCellsRewriter(IRLoopRewriter):
+    def lookup(self, block):
+        return WRITTEN_CELLS.get(block)
+
+    def finish(self, block, written):
+        written = (written,)
+        if brainfuck_ir_is_shared(block):
+            WRITTEN_CELLS.put(block, written)
+        return written
+
+    def rewrite(self, body: [IRInstruction]):
+        return brainfuck_ir_written_instructions(body)
+
+
+class IRCoalesceRewriter(IRLoopRewriter):
+    def __init__(self, mask: int):
+        self._mask = mask
+
+    def lookup(self, block):
+        return COALESCED_LOOPS.get((block, self._mask))
+
+    def finish(self, block, body):
+        coalesced = brainfuck_ir_intern(body)
+        if brainfuck_ir_is_shared(block):
+            COALESCED_LOOPS.put((block, self._mask), coalesced)
+        return coalesced
+
+    def rewrite(self, body: [IRInstruction], known: IRKnownValues = None):
+        if known is None:
+            known = IRKnownValues(self._mask)
+        return brainfuck_ir_coalesce_instructions(body, known)
+
+
+def brainfuck_ir_written_cells(block: [IRInstruction]):
+    return IRWrittenCellsRewriter().run(block)
+
+
+def brainfuck_ir_written_instructions(block: [IRInstruction]):
+    written = set()
+    pointer = 0
+    for instr in block:
+        opcode = instr.get_opcode()
+        cell = pointer + instr.get_pointer()
+        if opcode == IROpcode.Shift:
+            pointer += instr.get_arguments()[0]
+        elif opcode in (IROpcode.Add, IROpcode.Set, IROpcode.Read):
+            written.add(cell)
+        elif opcode == IROpcode.Copy:
+            written.add(cell)
+            for offset, _ in instr.get_arguments():
+                written.add(cell + offset)
+        elif opcode == IROpcode.Load:
+            written.update(range(cell, cell + len(instr.get_arguments()[0])))
+        elif opcode == IROpcode.Loop:
+            loop_written = (yield instr.get_arguments()[0])[0]
+            if loop_written is None:
+                return None
+            written.update(cell + offset for offset in loop_written)
+        elif opcode == IROpcode.Scan:
+            return None
+    if pointer != 0 or len(written) > WRITTEN_CELLS_LIMIT:
+        return None
+    return written
+
+
+def brainfuck_ir_loop_written_cells(block: IRInstructionBlock):
+    return IRWrittenCellsRewriter().run_loop(block)[0]
+
+
+def brainfuck_ir_evaluate_loop(
+    body: [IRInstruction], known: IRKnownValues, cell: int
+) -> bool:
+    values = dict()
+    steps = 0
+    while True:
+        condition = values[cell] if cell in values else known.get(cell)
+        if condition is None:
+            return False
+        elif condition == 0:
+            break
+        pointer = cell
+        for instr in body:
+            steps += 1
+            if steps > LOOP_EVALUATION_BUDGET:
+                return False
+            opcode = instr.get_opcode()
+            args = instr.get_arguments()
+            target = pointer + instr.get_pointer()
+            value = values[target] if target in values else known.get(target)
+            if opcode == IROpcode.Shift:
+                pointer += args[0]
+            elif opcode == IROpcode.Set:
+                values[target] = args[0] & known.get_mask()
+            elif opcode == IROpcode.Add and value is not None:
+                values[target] = (value + args[0]) & known.get_mask()
+            elif opcode == IROpcode.Copy and value is not None:
+                for offset, multiply in args:
+                    other = target + offset
+                    previous = values[other] if other in values else known.get(other)
+                    if previous is None:
+                        return False
+                    values[other] = (previous + value * multiply) & known.get_mask()
+                values[target] = 0
+            elif opcode != IROpcode.Nop:
+                return False
+        if pointer != cell:
+            return False
+    for offset, value in values.items():
+        known.set(offset, value)
+    return True
+
+
+def brainfuck_ir_coalesce_block(block: [IRInstruction], known: IRKnownValues):
+    return IRCoalesceRewriter(known.get_mask()).run(block, known)
+
+
+def brainfuck_ir_coalesce_instructions(block: [IRInstruction], known: IRKnownValues):
+    new_block = list()
+    pending = bytearray()
+    pointer = 0
+    for instr in block:
+        opcode = instr.get_opcode()
+        args = instr.get_arguments()
+        cell = pointer + instr.get_pointer()
+        if opcode == IROpcode.Shift:
+            pointer += args[0]
+        elif opcode == IROpcode.Add:
+            value = known.get(cell)
+            if value is not None:
+                known.set(cell, value + args[0])
+        elif opcode == IROpcode.Set:
+            known.set(cell, args[0])
+        elif opcode == IROpcode.Write:
+            value = known.get(cell)
+            if value is not None:
+                pending.append(value & 0xFF)
+                continue
+            brainfuck_ir_flush_output(new_block, pending)
+        elif opcode == IROpcode.Print:
+            pending.extend(args[0])
+            continue
+        elif opcode == IROpcode.Read:
+            brainfuck_ir_flush_output(new_block, pending)
+            known.forget(cell)
+        elif opcode == IROpcode.Copy:
+            value = known.get(cell)
+            for offset, multiply in args:
+                target = known.get(cell + offset)
+                if value is None or target is None:
+                    known.forget(cell + offset)
+                else:
+                    known.set(cell + offset, target + value * multiply)
+            known.set(cell, 0)
+        elif opcode == IROpcode.Load:
+            for offset, value in enumerate(args[0]):
+                known.set(cell + offset, value)
+        elif opcode == IROpcode.Scan:
+            known.forget_all()
+            pointer = 0
+            known.set(0, 0)
+        elif opcode == IROpcode.Loop:
+            if known.get(cell) == 0:
+                continue
+            brainfuck_ir_flush_output(new_block, pending)
+            loop_block = instr.get_arguments()[0]
+            body = loop_block.get_body()
+            loop = IRInstructionBuilder.loop((yield loop_block))
+            loop.set_pointer(instr.get_pointer())
+            loop.set_position(instr.get_position())
+            instr = loop
+            if not brainfuck_ir_evaluate_loop(body, known, cell):
+                written = brainfuck_ir_loop_written_cells(loop_block)
+                if written is None:
+                    known.forget_all()
+                    pointer = 0
+                    cell = 0
+                else:
+                    for offset in written:
+                        known.forget(cell + offset)
+            known.set(cell, 0)
+        new_block.append(instr)
+    brainfuck_ir_flush_output(new_block, pending)
+    return new_block
+
+
+def brainfuck_ir_coalesce_loop(block: IRInstructionBlock, mask: int):
+    return IRCoalesceRewriter(mask).run_loop(block)
+
+
+def brainfuck_ir_flush_output(block: [IRInstruction], pending: bytearray):
+    if pending:
+        block.append(IRInstructionBuilder.print(bytes(pending)))
+        pending.clear()
+
+
+def brainfuck_ir_coalesce_output(
+    module: IRInstructionBlock, options: BrainfuckOptions, zero_filled: bool = True
+):
+    mask = (1 << (8 * options.get_cell_size().get_size())) - 1
+    known = IRKnownValues(mask, zero_filled=zero_filled)
+    return IRInstructionBlock(brainfuck_ir_coalesce_block(module.get_body(), known))
@@ -1,8 +1,60 @@
 from bfc.IR import *
 from bfc.Options import *
+from bfc.HashCons import *
+
+
+FOLDED_LOOPS = IRBoundedCache()
+UNFOLDED_LOOPS = IRBoundedCache()
+
+
+class IRFoldRewriter(IRLoopRewriter):
+    def lookup(self, block):
+        return FOLDED_LOOPS.get(block)
+
+    def finish(self, block, body):
+        folded = IRInstructionBlock(body)
+        if brainfuck_ir_is_shared(block):
+            FOLDED_LOOPS.put(block, folded)
+        return folded
+
+    def rewrite(self, body: [IRInstruction]):
+        return brainfuck_ir_fold_instructions(body)
+
+
+class IRUnfoldRewriter(IRLoopRewriter):
+    def __init__(self, explicit_offsets: bool):
+        self._explicit_offsets = explicit_offsets
+
+    def lookup(self, block):
+        return UNFOLDED_LOOPS.get((block, self._explicit_offsets))
+
+    def finish(self, block, body):
+        key = (block, self._explicit_offsets)
+        return UNFOLDED_LOOPS.put(key, brainfuck_ir_intern(body))
+
+    def rewrite(self, body: [IRInstruction]):
+        return brainfuck_ir_unfold_instructions(body, self._explicit_offsets)
+
+
+def brainfuck_ir_fold_loop(block: IRInstructionBlock) -> IRInstructionBlock:
+    return IRFoldRewriter().run_loop(block)
+
+
+def brainfuck_ir_unfold_loop(
+    block: IRInstructionBlock, explicit_offsets: bool
+) -> IRInstructionBlock:
+    return IRUnfoldRewriter(explicit_offsets).run_loop(block)
 
 
 def brainfuck_ir_fold_block(block: [IRInstruction]):
+    return IRFoldRewriter().run(block)
+
+
+def brainfuck_ir_unfold_block(block: [IRInstruction], explicit_offsets: bool = True):
+    return IRUnfoldRewriter(explicit_offsets).run(block)
+
+
+def brainfuck_ir_fold_instructions(block: [IRInstruction]):
     new_block = list()
     pointer = 0
     flow = dict()
@@ -19,14 +71,15 @@ def brainfuck_ir_fold_block(block: [IRInstruction]):
             set_instr = IRInstructionBuilder.set(instr.get_arguments()[0])
             set_instr.set_pointer(pointer)
             flow[pointer] = set_instr
-        elif instr.get_opcode() == IROpcode.Copy:
-            copy = IRInstructionBuilder.copy(instr.get_arguments())
-            copy.set_pointer(pointer)
+        elif instr.get_opcode() in (IROpcode.Copy, IROpcode.Scan, IROpcode.Load):
+            barrier = IRInstruction(instr.get_opcode(), *instr.get_arguments())
+            barrier.set_pointer(pointer)
+            barrier.set_position(instr.get_position())
             pointer = 0
             for instr_pointer in flow.keys():
-                copy.add_dependency(flow[instr_pointer])
+                barrier.add_dependency(flow[instr_pointer])
             flow = dict()
-            new_block.append(copy)
+            new_block.append(barrier)
         elif instr.get_opcode() == IROpcode.Write:
             write_instr = IRInstructionBuilder.write()
             write_instr.set_pointer(pointer)
@@ -34,17 +87,21 @@ def brainfuck_ir_fold_block(block: [IRInstruction]):
                 write_instr.add_dependency(flow[pointer])
                 del flow[pointer]
             new_block.append(write_instr)
+        elif instr.get_opcode() == IROpcode.Print:
+            print_instr = IRInstructionBuilder.print(instr.get_arguments()[0])
+            print_instr.set_pointer(pointer)
+            new_block.append(print_instr)
         elif instr.get_opcode() == IROpcode.Read:
             read_instr = IRInstructionBuilder.read()
             read_instr.set_pointer(pointer)
+            if pointer in flow:
+                read_instr.add_dependency(flow[pointer])
+                del flow[pointer]
             new_block.append(read_instr)
         elif instr.get_opcode() == IROpcode.Loop:
-            loop = IRInstructionBuilder.loop(
-                IRInstructionBlock(
-                    brainfuck_ir_fold_block(instr.get_arguments()[0].get_body())
-                )
-            )
+            loop = IRInstructionBuilder.loop((yield instr.get_arguments()[0]))
             loop.set_pointer(pointer)
+            loop.set_position(instr.get_position())
             pointer = 0
             for instr_pointer in flow.keys():
                 loop.add_dependency(flow[instr_pointer])
@@ -59,44 +116,35 @@ def brainfuck_ir_fold_block(block: [IRInstruction]):
     return new_block
 
 
-def brainfuck_ir_unfold_block(block: [IRInstruction], explicit_offsets: bool = True):
+def brainfuck_ir_unfold_instructions(block: [IRInstruction], explicit_offsets: bool):
     new_block = list()
     pointer = 0
-
-    def unfold_instruction(instr: IRInstruction):
-        nonlocal pointer
-        new_instr = None
-        for dep in instr.get_dependencies():
-            unfold_instruction(dep)
-        if (
-            instr.get_pointer() != pointer
-            and explicit_offsets
-            or instr.get_opcode().requires_explicit_shift()
-        ):
-            shift_instr = IRInstructionBuilder.shift(instr.get_pointer() - pointer)
-            new_block.append(shift_instr)
-            pointer = instr.get_pointer()
-        if instr.get_opcode() == IROpcode.Loop:
-            new_instr = IRInstructionBuilder.loop(
-                IRInstructionBlock(
-                    brainfuck_ir_unfold_block(
-                        instr.get_arguments()[0].get_body(), explicit_offsets
-                    )
+    for root in block:
+        for instr in brainfuck_ir_schedule(root):
+            new_instr = None
+            if (
+                instr.get_pointer() != pointer
+                and explicit_offsets
+                or instr.get_opcode().requires_explicit_shift()
+            ):
+                shift_instr = IRInstructionBuilder.shift(instr.get_pointer() - pointer)
+                new_block.append(shift_instr)
+                pointer = instr.get_pointer()
+            if instr.get_opcode() == IROpcode.Loop:
+                new_instr = IRInstructionBuilder.loop(
+                    (yield instr.get_arguments()[0])
                 )
-            )
-            pointer = 0
-        elif instr.get_opcode() == IROpcode.Copy:
-            new_instr = IRInstruction(instr.get_opcode(), *instr.get_arguments())
-            pointer = 0
-        elif instr.get_opcode() != IROpcode.Nop:
-            new_instr = IRInstruction(instr.get_opcode(), *instr.get_arguments())
-            if not explicit_offsets:
-                new_instr.set_pointer(instr.get_pointer() - pointer)
-        if new_instr:
-            new_block.append(new_instr)
-
-    for instr in block:
-        unfold_instruction(instr)
+                pointer = 0
+            elif instr.get_opcode() in (IROpcode.Copy, IROpcode.Scan, IROpcode.Load):
+                new_instr = IRInstruction(instr.get_opcode(), *instr.get_arguments())
+                pointer = 0
+            elif instr.get_opcode() != IROpcode.Nop:
+                new_instr = IRInstruction(instr.get_opcode(), *instr.get_arguments())
+                if not explicit_offsets:
+                    new_instr.set_pointer(instr.get_pointer() - pointer)
+            if new_instr:
+                new_instr.set_position(instr.get_position())
+                new_block.append(new_instr)
     return new_block
 
 
@@ -108,4 +156,5 @@ def brainfuck_ir_analyze_block(block: [IRInstruction], options: BrainfuckOptions
 
 
 def brainfuck_ir_analyze_flow(module: IRInstructionBlock, options: BrainfuckOptions):
+    module = brainfuck_ir_share(module)
     return IRInstructionBlock(brainfuck_ir_analyze_block(module.get_body(), options))
@@ -0,0 +1,124 @@
+from bfc.IR import *
+import collections
+
+
+HASH_CONS_SIZE = 1 << 14
+
+
+def brainfuck_ir_key(instr) -> tuple:
+    return (
+        instr.get_opcode(),
+        instr.get_arguments(),
+        instr.get_pointer(),
+        instr.get_position(),
+    )
+
+
+def brainfuck_ir_shape(instr) -> tuple:
+    return instr.get_opcode(), instr.get_arguments(), instr.get_pointer()
+
+
+class IRBoundedCache:
+    def __init__(self, max_size: int = HASH_CONS_SIZE):
+        self._entries = collections.OrderedDict()
+        self._max_size = max_size
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_hits(self) -> int:
+        return self._hits
+
+    def get_misses(self) -> int:
+        return self._misses
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+
+class IRHashConsTable:
+    def __init__(self, max_size: int = HASH_CONS_SIZE, key=brainfuck_ir_key):
+        self._blocks = collections.OrderedDict()
+        self._keys = dict()
+        self._max_size = max_size
+        self._key = key
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def is_canonical(self, block) -> bool:
+        return block in self._keys
+
+    def intern(self, body: list) -> IRInstructionBlock:
+        key = tuple(map(self._key, body))
+        block = self._blocks.get(key)
+        if block is not None:
+            self._blocks.move_to_end(key)
+            return block
+        block = IRInstructionBlock(body)
+        self._blocks[key] = block
+        self._keys[block] = key
+        if len(self._blocks) > self._max_size:
+            _, evicted = self._blocks.popitem(last=False)
+            del self._keys[evicted]
+        return block
+
+    def share(self, module) -> IRInstructionBlock:
+        if self.is_canonical(module):
+            return module
+        frames = [(iter(module.get_body()), list(), None)]
+        while True:
+            instructions, body, loop = frames[-1]
+            instr = next(instructions, None)
+            if instr is None:
+                frames.pop()
+                block = self.intern(body)
+                if not frames:
+                    return block
+                shared = IRInstructionBuilder.loop(block)
+                shared.set_pointer(loop.get_pointer())
+                shared.set_position(loop.get_position())
+                frames[-1][1].append(shared)
+            elif instr.get_opcode() != IROpcode.Loop:
+                body.append(instr)
+            elif self.is_canonical(instr.get_arguments()[0]):
+                body.append(instr)
+            else:
+                loop_body = instr.get_arguments()[0].get_body()
+                frames.append((iter(loop_body), list(), instr))
+
+    def clear(self):
+        self._blocks.clear()
+        self._keys.clear()
+
+
+HASH_CONS_TABLE = IRHashConsTable()
+
+
+def brainfuck_ir_share(module) -> IRInstructionBlock:
+    return HASH_CONS_TABLE.share(module)
+
+
+def brainfuck_ir_intern(body: list) -> IRInstructionBlock:
+    return HASH_CONS_TABLE.intern(body)
+
+
+def brainfuck_ir_is_shared(block) -> bool:
+    return HASH_CONS_TABLE.is_canonical(block)
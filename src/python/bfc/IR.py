@@ -1,3 +1,4 @@
+import abc
 import enum
 
 
@@ -10,11 +11,16 @@ class IROpcode(enum.Enum):
     Set = "Set"
     Nop = "Nop"
     Copy = "Copy"
+    Scan = "Scan"
+    Print = "Print"
+    Load = "Load"
 
     def requires_explicit_shift(self) -> bool:
         return self in [
             IROpcode.Loop,
             IROpcode.Copy,
+            IROpcode.Scan,
+            IROpcode.Load,
             IROpcode.Read,
             IROpcode.Write,
             IROpcode.Nop,
@@ -22,11 +28,14 @@ class IROpcode(enum.Enum):
 
 
 class IRInstruction:
+    __slots__ = ("_opcode", "_args", "_pointer", "_dependencies", "_position")
+
     def __init__(self, opcode: IROpcode, *args):
         self._opcode = opcode
         self._args = args
         self._pointer = 0
-        self._dependencies = list()
+        self._dependencies = ()
+        self._position = None
 
     def get_opcode(self) -> IROpcode:
         return self._opcode
@@ -40,11 +49,20 @@ class IRInstruction:
     def set_pointer(self, pointer: int):
         self._pointer = pointer
 
+    def get_position(self):
+        return self._position
+
+    def set_position(self, position):
+        self._position = position
+
     def get_dependencies(self) -> list:
         return self._dependencies
 
     def add_dependency(self, instr):
-        self._dependencies.append(instr)
+        if self._dependencies:
+            self._dependencies.append(instr)
+        else:
+            self._dependencies = [instr]
 
     def __str__(self):
         if self._opcode != IROpcode.Loop:
@@ -57,35 +75,94 @@ class IRInstruction:
 
 
 class IRInstructionBlock:
+    __slots__ = ("_body",)
+
     def __init__(self, body: [IRInstruction]):
         self._body = body
 
     def get_body(self) -> [IRInstruction]:
         return self._body
 
-    def get_memory_space(self):
+    def get_memory_space(self, spaces: dict = None):
+        return IRMemoryRange(spaces).run_loop(self) or None
+
+    def get_memory_range(self, spaces: dict = None):
+        return IRMemoryRange(spaces).run(self._body)
+
+
+class IRLoopRewriter(abc.ABC):
+    @abc.abstractmethod
+    def rewrite(self, body: list, *args):
+        pass
+
+    def lookup(self, block):
+        return None
+
+    def finish(self, block, result):
+        return result
+
+    def run(self, body: list, *args):
+        frames = [(None, self.rewrite(body, *args))]
+        value = None
+        while True:
+            block, routine = frames[-1]
+            try:
+                loop = routine.send(value)
+            except StopIteration as stop:
+                frames.pop()
+                if not frames:
+                    return stop.value
+                value = self.finish(block, stop.value)
+                continue
+            value = self.lookup(loop)
+            if value is None:
+                frames.append((loop, self.rewrite(loop.get_body())))
+
+    def run_loop(self, block):
+        value = self.lookup(block)
+        if value is None:
+            value = self.finish(block, self.run(block.get_body()))
+        return value
+
+
+class IRMemoryRange(IRLoopRewriter):
+    def __init__(self, spaces: dict = None):
+        self._spaces = dict() if spaces is None else spaces
+
+    def lookup(self, block):
+        return self._spaces.get(block)
+
+    def finish(self, block, memory_range):
+        space = ()
+        if memory_range is not None and memory_range[2] == 0:
+            space = memory_range[:2]
+        self._spaces[block] = space
+        return space
+
+    def rewrite(self, body: list):
         offset = 0
         minimal_offset = 0
         maximal_offset = 0
-        for instr in self._body:
-            if instr.get_opcode() == IROpcode.Shift:
+        for instr in body:
+            opcode = instr.get_opcode()
+            cells = [offset + instr.get_pointer()]
+            if opcode == IROpcode.Shift:
                 offset += instr.get_arguments()[0]
-                if offset > maximal_offset:
-                    maximal_offset = offset
-                elif offset < minimal_offset:
-                    minimal_offset = offset
-            elif instr.get_opcode() == IROpcode.Loop:
-                loop_mem = instr.get_arguments()[0].get_memory_space()
-                if loop_mem is None:
+                cells = [offset]
+            elif opcode == IROpcode.Scan:
+                return None
+            elif opcode == IROpcode.Copy:
+                cells.extend(cells[0] + target for target, _ in instr.get_arguments())
+            elif opcode == IROpcode.Load:
+                cells.append(cells[0] + len(instr.get_arguments()[0]) - 1)
+            elif opcode == IROpcode.Loop:
+                loop_mem = yield instr.get_arguments()[0]
+                if not loop_mem:
                     return None
-                if offset + loop_mem[1] > maximal_offset:
-                    maximal_offset = offset + loop_mem[1]
-                if offset + loop_mem[0] < minimal_offset:
-                    minimal_offset = offset + loop_mem[0]
-        if offset == 0:
-            return minimal_offset, maximal_offset
-        else:
-            return None
+                cells = [offset + loop_mem[0], offset + loop_mem[1]]
+            maximal_offset = max(maximal_offset, *cells)
+            minimal_offset = min(minimal_offset, *cells)
+        return minimal_offset, maximal_offset, offset
 
 
 class IRInstructionBuilder:
@@ -120,3 +197,29 @@ class IRInstructionBuilder:
     @staticmethod
     def copy(offsets: [int]):
         return IRInstruction(IROpcode.Copy, *offsets)
+
+    @staticmethod
+    def scan(stride: int):
+        return IRInstruction(IROpcode.Scan, stride)
+
+    @staticmethod
+    def print(data: bytes):
+        return IRInstruction(IROpcode.Print, data)
+
+    @staticmethod
+    def load(values: tuple):
+        return IRInstruction(IROpcode.Load, values)
+
+
+def brainfuck_ir_schedule(instr) -> list:
+    order = list()
+    stack = [(instr, False)]
+    while stack:
+        instr, ready = stack.pop()
+        if ready:
+            order.append(instr)
+        else:
+            stack.append((instr, True))
+            for dep in reversed(instr.get_dependencies()):
+                stack.append((dep, False))
+    return order
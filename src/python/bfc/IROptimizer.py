@@ -1,81 +1,153 @@
 from bfc.IR import *
+from bfc.HashCons import *
 import abc
+import bisect
 
 
-def match_opcode(opcode: IROpcode):
-    def proc(block: [IRInstruction]):
-        return (
-            [block[-1]] if len(block) > 0 and block[-1].get_opcode() == opcode else None
-        )
+class IRMatcher(abc.ABC):
+    @abc.abstractmethod
+    def match(self, block: [IRInstruction], end: int):
+        pass
 
-    return proc
+    def get_tail_opcodes(self):
+        return None
 
+    def get_width(self):
+        return None
 
-def match_instruction(opcode: IROpcode, *args):
-    def proc(block: [IRInstruction]):
-        if len(block) == 0 or block[-1].get_opcode() != opcode:
+
+class IROpcodeMatcher(IRMatcher):
+    def __init__(self, opcode: IROpcode, args=()):
+        self._opcode = opcode
+        self._args = args
+
+    def match(self, block: [IRInstruction], end: int):
+        if end == 0 or block[end - 1].get_opcode() != self._opcode:
             return None
-        instr = block[-1]
-        if len(instr.get_arguments()) < len(args):
+        arguments = block[end - 1].get_arguments()
+        if len(arguments) < len(self._args):
             return None
-        for index, matcher in enumerate(args):
-            if not matcher(instr.get_arguments()[index]):
+        for index, matcher in enumerate(self._args):
+            if not matcher(arguments[index]):
                 return None
-        return [block[-1]]
+        return 1
 
-    return proc
+    def get_tail_opcodes(self):
+        return {self._opcode}
 
+    def get_width(self):
+        return 1
 
-def match_integer(value: int):
-    def proc(actual_value: int):
-        return actual_value == value
 
-    return proc
+class IRMultipleMatcher(IRMatcher):
+    def __init__(self, matcher: IRMatcher, min: int, max: int):
+        self._matcher = matcher
+        self._min = min
+        self._max = max
 
-
-def match_multiple(matcher, min: int = 1, max: int = None):
-    def proc(block: [IRInstruction]):
+    def match(self, block: [IRInstruction], end: int):
         matched = 0
         offset = 0
-        while offset <= len(block):
-            match = matcher(block[: len(block) - offset])
-            if match is not None:
+        while offset <= end:
+            count = self._matcher.match(block, end - offset)
+            if count is not None:
                 matched += 1
-                offset += len(match)
+                offset += count
             else:
                 break
         return (
-            block[len(block) - offset :]
-            if matched >= min and (max is None or matched <= max)
+            offset
+            if matched >= self._min and (self._max is None or matched <= self._max)
             else None
         )
 
-    return proc
+    def get_tail_opcodes(self):
+        return None if self._min == 0 else self._matcher.get_tail_opcodes()
 
+    def get_width(self):
+        width = self._matcher.get_width()
+        return None if width is None or self._max is None else width * self._max
 
-def match_sequence(*args, whole_sequence: bool = False):
-    def proc(block: [IRInstruction]):
+
+class IRSequenceMatcher(IRMatcher):
+    def __init__(self, matchers: [IRMatcher], whole_sequence: bool):
+        self._matchers = tuple(reversed(matchers))
+        self._whole_sequence = whole_sequence
+
+    def match(self, block: [IRInstruction], end: int):
         offset = 0
-        for matcher in reversed(args):
-            match = matcher(block[: len(block) - offset])
-            if match:
-                offset += len(match)
+        for matcher in self._matchers:
+            count = matcher.match(block, end - offset)
+            if count:
+                offset += count
             else:
                 return None
-        return (
-            block[len(block) - offset :]
-            if not whole_sequence or offset == len(block)
-            else None
-        )
+        return offset if not self._whole_sequence or offset == end else None
+
+    def get_tail_opcodes(self):
+        return self._matchers[0].get_tail_opcodes() if self._matchers else None
+
+    def get_width(self):
+        width = 0
+        for matcher in self._matchers:
+            if matcher.get_width() is None:
+                return None
+            width += matcher.get_width()
+        return width
+
+
+class IRLoopMatcher(IRMatcher):
+    def __init__(self, matcher: IRMatcher, is_determined: bool):
+        self._matcher = matcher
+        self._is_determined = is_determined
+
+    def match(self, block: [IRInstruction], end: int):
+        if end == 0 or block[end - 1].get_opcode() != IROpcode.Loop:
+            return None
+        loop_block = block[end - 1].get_arguments()[0]
+        if self._matcher is not None:
+            body = loop_block.get_body()
+            if self._matcher.match(body, len(body)) is None:
+                return None
+        if self._is_determined and loop_block.get_memory_space() is None:
+            return None
+        return 1
+
+    def get_tail_opcodes(self):
+        return {IROpcode.Loop}
+
+    def get_width(self):
+        return 1
+
+
+def match_opcode(opcode: IROpcode):
+    return IROpcodeMatcher(opcode)
+
+
+def match_instruction(opcode: IROpcode, *args):
+    return IROpcodeMatcher(opcode, args)
+
+
+def match_integer(value: int):
+    def proc(actual_value: int):
+        return actual_value == value
 
     return proc
 
 
+def match_multiple(matcher, min: int = 1, max: int = None):
+    return IRMultipleMatcher(matcher, min, max)
+
+
+def match_sequence(*args, whole_sequence: bool = False):
+    return IRSequenceMatcher(args, whole_sequence)
+
+
 def match_or(*args):
     def proc(value):
         for matcher in args:
             match = matcher(value)
-            if matcher(value):
+            if match:
                 return match
         return None
 
@@ -83,21 +155,67 @@ def match_or(*args):
 
 
 def match_loop(matcher=None, is_determined: bool = False):
-    def proc(block: [IRInstruction]):
-        if len(block) == 0 or block[-1].get_opcode() != IROpcode.Loop:
-            return None
-        else:
-            return (
-                [block[-1]]
-                if (matcher is None or matcher(block[-1].get_arguments()[0].get_body()))
-                and (
-                    not is_determined
-                    or block[-1].get_arguments()[0].get_memory_space() is not None
-                )
-                else None
-            )
+    return IRLoopMatcher(matcher, is_determined)
+
+
+class IRPeepholeEngine:
+    def __init__(self, rules):
+        self._rules = tuple(rules)
+        self._fired = [0] * len(self._rules)
+        self._dispatch = {opcode: list() for opcode in IROpcode}
+        for index, (matcher, _) in enumerate(self._rules):
+            tail = matcher.get_tail_opcodes()
+            for opcode in IROpcode if tail is None else tail:
+                self._dispatch[opcode].append(index)
+
+    def get_window(self):
+        widths = [matcher.get_width() for matcher, _ in self._rules]
+        return None if None in widths else max(widths, default=0)
+
+    def get_rule_counts(self) -> dict:
+        return {
+            transformation.__name__: fired
+            for (_, transformation), fired in zip(self._rules, self._fired)
+        }
+
+    def rewrite(self, block: [IRInstruction]):
+        position = 0
+        while block:
+            candidates = self._dispatch[block[-1].get_opcode()]
+            index = bisect.bisect_left(candidates, position)
+            if index == len(candidates):
+                break
+            matcher, transformation = self._rules[candidates[index]]
+            position = candidates[index] + 1
+            match = matcher.match(block, len(block))
+            if match is not None:
+                self._fired[candidates[index]] += 1
+                transformation(block, match)
 
-    return proc
+
+class IRPeepholeRewriter(IRLoopRewriter):
+    def __init__(self, engine: IRPeepholeEngine):
+        self._engine = engine
+
+    def lookup(self, block):
+        return OPTIMIZED_LOOPS.get(block)
+
+    def finish(self, block, body):
+        optimized = brainfuck_ir_intern(body)
+        if brainfuck_ir_is_shared(block):
+            OPTIMIZED_LOOPS.put(block, optimized)
+        return optimized
+
+    def rewrite(self, body: [IRInstruction]):
+        new_block = list()
+        for instr in body:
+            if instr.get_opcode() == IROpcode.Loop:
+                loop = IRInstructionBuilder.loop((yield instr.get_arguments()[0]))
+                loop.set_position(instr.get_position())
+                instr = loop
+            new_block.append(instr)
+            self._engine.rewrite(new_block)
+        return new_block
 
 
 def optimize_merge_add(block: [IRInstruction], match):
@@ -142,15 +260,6 @@ def optimize_zero_set(block: [IRInstruction], match):
     block.append(IRInstructionBuilder.set(0))
 
 
-def optimize_loop(block: [IRInstruction], match):
-    loop_body = block[-1].get_arguments()[0].get_body()
-    loop = IRInstructionBuilder.loop(
-        IRInstructionBlock(brainfuck_optimize_block(loop_body))
-    )
-    del block[-1]
-    block.append(loop)
-
-
 def optimize_copy(block: [IRInstruction], match):
     copies = list()
     offset = 0
@@ -160,66 +269,81 @@ def optimize_copy(block: [IRInstruction], match):
         multiply = slice[1].get_arguments()[0]
         copies.append((offset, multiply))
         slice = slice[2:]
+    copy = IRInstructionBuilder.copy(copies)
+    copy.set_position(block[-1].get_position())
     del block[-1]
-    block.append(IRInstructionBuilder.copy(copies))
+    block.append(copy)
 
 
-def brainfuck_optimize_block(block: [IRInstruction]):
-    transform = [
-        (
-            match_sequence(match_opcode(IROpcode.Add), match_opcode(IROpcode.Add)),
-            optimize_merge_add,
-        ),
-        (
-            match_sequence(match_opcode(IROpcode.Set), match_opcode(IROpcode.Add)),
-            optimize_merge_add_set,
-        ),
-        (
-            match_sequence(match_opcode(IROpcode.Set), match_opcode(IROpcode.Set)),
-            optimize_merge_set,
-        ),
-        (
-            match_sequence(match_opcode(IROpcode.Shift), match_opcode(IROpcode.Shift)),
-            optimize_merge_shift,
-        ),
-        (
-            match_loop(
-                match_sequence(
-                    match_instruction(
-                        IROpcode.Add, match_or(match_integer(1), match_integer(-1))
-                    ),
-                    whole_sequence=True,
-                )
-            ),
-            optimize_zero_set,
+def optimize_scan(block: [IRInstruction], match):
+    stride = block[-1].get_arguments()[0].get_body()[0].get_arguments()[0]
+    del block[-1]
+    block.append(IRInstructionBuilder.scan(stride))
+
+
+PEEPHOLE_RULES = [
+    (
+        match_sequence(match_opcode(IROpcode.Add), match_opcode(IROpcode.Add)),
+        optimize_merge_add,
+    ),
+    (
+        match_sequence(match_opcode(IROpcode.Set), match_opcode(IROpcode.Add)),
+        optimize_merge_add_set,
+    ),
+    (
+        match_sequence(match_opcode(IROpcode.Set), match_opcode(IROpcode.Set)),
+        optimize_merge_set,
+    ),
+    (
+        match_sequence(match_opcode(IROpcode.Shift), match_opcode(IROpcode.Shift)),
+        optimize_merge_shift,
+    ),
+    (
+        match_loop(
+            match_sequence(
+                match_instruction(
+                    IROpcode.Add, match_or(match_integer(1), match_integer(-1))
+                ),
+                whole_sequence=True,
+            )
         ),
-        (match_loop(), optimize_loop),
-        (
-            match_loop(
-                match_sequence(
-                    match_instruction(IROpcode.Add, match_integer(-1)),
-                    match_multiple(
-                        match_sequence(
-                            match_opcode(IROpcode.Shift), match_opcode(IROpcode.Add)
-                        )
-                    ),
-                    match_opcode(IROpcode.Shift),
-                    whole_sequence=True,
+        optimize_zero_set,
+    ),
+    (
+        match_loop(
+            match_sequence(
+                match_instruction(IROpcode.Add, match_integer(-1)),
+                match_multiple(
+                    match_sequence(
+                        match_opcode(IROpcode.Shift), match_opcode(IROpcode.Add)
+                    )
                 ),
-                is_determined=True,
+                match_opcode(IROpcode.Shift),
+                whole_sequence=True,
             ),
-            optimize_copy,
+            is_determined=True,
         ),
-    ]
-    new_block = list()
-    for instr in block:
-        new_block.append(instr)
-        for matcher, transformation in transform:
-            match = matcher(new_block)
-            if match is not None:
-                transformation(new_block, match)
-    return new_block
+        optimize_copy,
+    ),
+    (
+        match_loop(match_sequence(match_opcode(IROpcode.Shift), whole_sequence=True)),
+        optimize_scan,
+    ),
+]
+
+PEEPHOLE_ENGINE = IRPeepholeEngine(PEEPHOLE_RULES)
+PEEPHOLE_REWRITER = IRPeepholeRewriter(PEEPHOLE_ENGINE)
+OPTIMIZED_LOOPS = IRBoundedCache()
+
+
+def brainfuck_ir_rule_counts() -> dict:
+    return PEEPHOLE_ENGINE.get_rule_counts()
+
+
+def brainfuck_optimize_block(block: [IRInstruction]):
+    return PEEPHOLE_REWRITER.run(block)
 
 
 def brainfuck_ir_optimize(module: IRInstructionBlock):
+    module = brainfuck_ir_share(module)
     return IRInstructionBlock(brainfuck_optimize_block(module.get_body()))
@@ -0,0 +1,210 @@
+from bfc.IR import *
+from bfc.Options import *
+from bfc.Error import BrainfuckError
+import array
+import io
+import sys
+
+
+ADD, SET, SHIFT, LOOP, END, COPY, WRITE, READ = range(8)
+SHIFT_WRAP, SHIFT_CHECK, SCAN, PRINT, LOAD = range(8, 13)
+
+OUTPUT_BUFFER_SIZE = 4096
+
+TAPE_TYPES = {
+    MemoryCellSize.Word: "H",
+    MemoryCellSize.DWord: "I",
+}
+
+
+class BrainfuckInterpreter:
+    def __init__(self, options: BrainfuckOptions):
+        self._options = options
+        self._mask = (1 << (8 * options.get_cell_size().get_size())) - 1
+        self._checked = options.get_memory_overflow() != MemoryOverflow.Undefined
+
+    def get_memory_size(self) -> int:
+        return self._options.get_memory_size()
+
+    def create_tape(self):
+        size = self.get_memory_size()
+        cell_size = self._options.get_cell_size()
+        if cell_size in TAPE_TYPES:
+            return array.array(TAPE_TYPES[cell_size], bytes(size * cell_size.value))
+        return bytearray(size)
+
+    def lower(self, module) -> list:
+        code = list()
+        loops = list()
+        stack = [iter(module.get_body())]
+        while stack:
+            instr = next(stack[-1], None)
+            if instr is None:
+                stack.pop()
+                if loops:
+                    begin = loops.pop()
+                    code.append((END, begin + 1, 0))
+                    code[begin] = (LOOP, len(code), 0)
+                continue
+            for instr in brainfuck_ir_schedule(instr):
+                if instr.get_opcode() == IROpcode.Loop:
+                    loops.append(len(code))
+                    code.append(None)
+                    stack.append(iter(instr.get_arguments()[0].get_body()))
+                else:
+                    self._lower_instruction(code, instr)
+        return code
+
+    def _lower_shift(self, code: list, offset: int):
+        if offset == 0:
+            return
+        elif self._options.get_memory_overflow() == MemoryOverflow.Wrap:
+            code.append((SHIFT_WRAP, offset, 0))
+        elif self._options.get_memory_overflow() == MemoryOverflow.Abort:
+            code.append((SHIFT_CHECK, offset, 0))
+        else:
+            code.append((SHIFT, offset, 0))
+
+    def _lower_instruction(self, code: list, instr: IRInstruction):
+        opcode = instr.get_opcode()
+        args = instr.get_arguments()
+        offset = instr.get_pointer()
+        if opcode == IROpcode.Shift:
+            self._lower_shift(code, args[0])
+        elif opcode == IROpcode.Copy:
+            targets = tuple((target, factor & self._mask) for target, factor in args)
+            code.append((COPY, targets, 0))
+        elif opcode == IROpcode.Scan:
+            code.append((SCAN, args[0], 0))
+        elif opcode == IROpcode.Print:
+            code.append((PRINT, args[0], 0))
+        elif opcode == IROpcode.Load:
+            code.append((LOAD, self._lower_values(args[0]), 0))
+        elif opcode in (IROpcode.Add, IROpcode.Set, IROpcode.Write, IROpcode.Read):
+            if self._checked or opcode in (IROpcode.Write, IROpcode.Read):
+                self._lower_shift(code, offset)
+                self._lower_simple(code, opcode, 0, args)
+                self._lower_shift(code, -offset)
+            else:
+                self._lower_simple(code, opcode, offset, args)
+
+    def _lower_values(self, values: tuple):
+        cell_size = self._options.get_cell_size()
+        if cell_size in TAPE_TYPES:
+            return array.array(TAPE_TYPES[cell_size], values)
+        return bytes(values)
+
+    def _lower_simple(self, code: list, opcode: IROpcode, offset: int, args):
+        if opcode == IROpcode.Add:
+            code.append((ADD, offset, args[0] & self._mask))
+        elif opcode == IROpcode.Set:
+            code.append((SET, offset, args[0] & self._mask))
+        elif opcode == IROpcode.Write:
+            code.append((WRITE, offset, 0))
+        elif opcode == IROpcode.Read:
+            code.append((READ, offset, 0))
+
+    def execute(self, code: list, input=b"", output=None) -> bytes:
+        if isinstance(input, (bytes, bytearray)):
+            input = io.BytesIO(input)
+        tape = self.create_tape()
+        size = len(tape)
+        mask = self._mask
+        wrap = self._options.get_memory_overflow() == MemoryOverflow.Wrap
+        abort = self._options.get_memory_overflow() == MemoryOverflow.Abort
+        result = bytearray()
+        pointer = 0
+        pc = 0
+        end = len(code)
+        while pc < end:
+            op, a, b = code[pc]
+            pc += 1
+            if op == ADD:
+                index = pointer + a
+                tape[index] = (tape[index] + b) & mask
+            elif op == SHIFT_WRAP:
+                pointer = (pointer + a) % size
+            elif op == END:
+                if tape[pointer]:
+                    pc = a
+            elif op == LOOP:
+                if not tape[pointer]:
+                    pc = a
+            elif op == SHIFT:
+                pointer += a
+            elif op == SHIFT_CHECK:
+                pointer += a
+                if pointer < 0 or pointer >= size:
+                    raise BrainfuckError("Memory overflow")
+            elif op == SET:
+                tape[pointer + a] = b
+            elif op == COPY:
+                value = tape[pointer]
+                if value:
+                    tape[pointer] = 0
+                    for offset, factor in a:
+                        index = pointer + offset
+                        if wrap:
+                            index %= size
+                        elif abort and (index < 0 or index >= size):
+                            raise BrainfuckError("Memory overflow")
+                        tape[index] = (tape[index] + value * factor) & mask
+            elif op == SCAN:
+                pointer = self._scan(tape, pointer, a)
+            elif op == WRITE:
+                result.append(tape[pointer + a] & 0xFF)
+                if output is not None and len(result) >= OUTPUT_BUFFER_SIZE:
+                    output.write(result)
+                    result.clear()
+            elif op == PRINT:
+                result.extend(a)
+                if output is not None and len(result) >= OUTPUT_BUFFER_SIZE:
+                    output.write(result)
+                    result.clear()
+            elif op == LOAD:
+                tape[pointer : pointer + len(a)] = a
+            elif op == READ:
+                if output is not None and result:
+                    output.write(result)
+                    output.flush()
+                    result.clear()
+                symbol = input.read(1)
+                if symbol:
+                    tape[pointer + a] = symbol[0]
+        if output is not None:
+            output.write(result)
+            output.flush()
+        return bytes(result)
+
+    def _scan(self, tape, pointer: int, stride: int) -> int:
+        size = len(tape)
+        wrap = self._options.get_memory_overflow() == MemoryOverflow.Wrap
+        if isinstance(tape, bytearray) and stride in (1, -1):
+            if stride == 1:
+                found = tape.find(0, pointer)
+                if found < 0 and wrap:
+                    found = tape.find(0, 0, pointer)
+            else:
+                found = tape.rfind(0, 0, pointer + 1)
+                if found < 0 and wrap:
+                    found = tape.rfind(0, pointer + 1)
+            if found >= 0:
+                return found
+        while tape[pointer]:
+            pointer += stride
+            if wrap:
+                pointer %= size
+            elif self._checked and (pointer < 0 or pointer >= size):
+                raise BrainfuckError("Memory overflow")
+        return pointer
+
+    def run(self, module, input=b"", output=None) -> bytes:
+        return self.execute(self.lower(module), input, output)
+
+
+def brainfuck_interpret(module, options: BrainfuckOptions, input=b"") -> bytes:
+    return BrainfuckInterpreter(options).run(module, input)
+
+
+def brainfuck_run_interpreter(output, module, options: BrainfuckOptions):
+    BrainfuckInterpreter(options).run(module, sys.stdin.buffer, output)
@@ -0,0 +1,214 @@
+from bfc.Interpreter import *
+from bfc.Options import *
+from bfc.Error import BrainfuckError
+import io
+import sys
+
+
+JIT_MAX_LOOPS = 16
+JIT_ARGUMENTS = "tape, p, out, input, output"
+JIT_INDENT = "    "
+
+
+class BrainfuckPythonJit(BrainfuckInterpreter):
+    def __init__(self, options: BrainfuckOptions):
+        super().__init__(options)
+        self._size = options.get_memory_size()
+        self._wrap = options.get_memory_overflow() == MemoryOverflow.Wrap
+        self._lines = list()
+        self._constants = dict()
+        self._functions = dict()
+        self._pending_functions = list()
+
+    def generate(self, module) -> (str, dict):
+        self._lines = list()
+        self._constants = {"BrainfuckError": BrainfuckError, "scan": self._scan}
+        self._functions = dict()
+        self._pending_functions = list()
+        self._emit(0, f"def _bf_main({JIT_ARGUMENTS}):")
+        self._run_tasks(self._compile_block(module.get_body(), 1))
+        self._emit(1, "return p")
+        while self._pending_functions:
+            name, body = self._pending_functions.pop()
+            self._emit(0, f"def {name}({JIT_ARGUMENTS}):")
+            self._run_tasks(self._compile_loop(body, 1))
+            self._emit(1, "return p")
+        return "\n".join(self._lines) + "\n", self._constants
+
+    def compile(self, module):
+        source, constants = self.generate(module)
+        namespace = dict(constants)
+        exec(compile(source, "<brainfuck>", "exec"), namespace)
+        return namespace["_bf_main"]
+
+    def run(self, module, input=b"", output=None) -> bytes:
+        if isinstance(input, (bytes, bytearray)):
+            input = io.BytesIO(input)
+        program = self.compile(module)
+        result = io.BytesIO() if output is None else output
+        out = bytearray()
+        try:
+            program(self.create_tape(), 0, out, input, result)
+        finally:
+            result.write(out)
+            result.flush()
+        return result.getvalue() if output is None else bytes()
+
+    def _run_tasks(self, task):
+        tasks = [task]
+        while tasks:
+            subtask = next(tasks[-1], None)
+            if subtask is None:
+                tasks.pop()
+            else:
+                tasks.append(subtask)
+
+    def _emit(self, depth: int, line: str):
+        self._lines.append(JIT_INDENT * depth + line)
+
+    def _constant(self, value) -> str:
+        name = f"_bf_data{len(self._constants)}"
+        self._constants[name] = value
+        return name
+
+    def _compile_block(self, body: list, depth: int):
+        run = list()
+        for instr in body:
+            for instr in brainfuck_ir_schedule(instr):
+                opcode = instr.get_opcode()
+                if opcode == IROpcode.Loop:
+                    self._compile_run(run, depth)
+                    run = list()
+                    yield self._compile_loop(instr.get_arguments()[0], depth)
+                elif opcode == IROpcode.Scan:
+                    self._compile_run(run, depth)
+                    run = list()
+                    stride = instr.get_arguments()[0]
+                    self._emit(depth, f"p = scan(tape, p, {stride})")
+                elif opcode != IROpcode.Nop:
+                    run.append(instr)
+        self._compile_run(run, depth)
+
+    def _compile_loop(self, body, depth: int):
+        if depth > JIT_MAX_LOOPS:
+            if body not in self._functions:
+                self._functions[body] = f"_bf_loop{len(self._functions)}"
+                self._pending_functions.append((self._functions[body], body))
+            self._emit(depth, f"p = {self._functions[body]}({JIT_ARGUMENTS})")
+            return
+        self._emit(depth, "while tape[p]:")
+        start = len(self._lines)
+        yield self._compile_block(body.get_body(), depth + 1)
+        if len(self._lines) == start:
+            self._emit(depth + 1, "pass")
+
+    def _compile_run(self, run: list, depth: int):
+        if not run:
+            return
+        if self._checked:
+            low, high, _ = IRInstructionBlock(run).get_memory_range()
+            if low < 0 or high > 0:
+                self._emit(depth, f"if {-low} <= p < {self._size - high}:")
+                self._compile_straight(run, depth + 1, True)
+                self._emit(depth, "else:")
+                self._compile_straight(run, depth + 1, False)
+                return
+        self._compile_straight(run, depth, not self._checked)
+
+    def _compile_straight(self, run: list, depth: int, in_range: bool):
+        shift = 0
+        checked = [0, 0]
+        for instr in run:
+            opcode = instr.get_opcode()
+            args = instr.get_arguments()
+            offset = shift + instr.get_pointer()
+            if opcode == IROpcode.Shift:
+                shift += args[0]
+                if not in_range and not self._wrap:
+                    self._check(depth, shift, checked)
+            elif opcode == IROpcode.Add:
+                cell = self._cell(depth, offset, in_range, checked)
+                value = args[0] & self._mask
+                self._emit(depth, f"{cell} = ({cell} + {value}) & {self._mask}")
+            elif opcode == IROpcode.Set:
+                cell = self._cell(depth, offset, in_range, checked)
+                self._emit(depth, f"{cell} = {args[0] & self._mask}")
+            elif opcode == IROpcode.Write:
+                cell = self._cell(depth, offset, in_range, checked)
+                if self._mask != 0xFF:
+                    cell = f"{cell} & 255"
+                self._emit(depth, f"out.append({cell})")
+                self._flush(depth)
+            elif opcode == IROpcode.Print:
+                self._emit(depth, f"out += {args[0]!r}")
+                self._flush(depth)
+            elif opcode == IROpcode.Read:
+                cell = self._cell(depth, offset, in_range, checked)
+                self._emit(depth, "if out:")
+                self._emit(depth + 1, "output.write(out)")
+                self._emit(depth + 1, "output.flush()")
+                self._emit(depth + 1, "out.clear()")
+                self._emit(depth, "c = input.read(1)")
+                self._emit(depth, "if c:")
+                self._emit(depth + 1, f"{cell} = c[0]")
+            elif opcode == IROpcode.Copy:
+                self._copy(depth, offset, args, in_range, checked)
+            elif opcode == IROpcode.Load:
+                start = self._index(depth, offset, in_range)
+                values = self._constant(self._lower_values(args[0]))
+                self._emit(depth, f"tape[{start}:{start} + {len(args[0])}] = {values}")
+        if shift and self._wrap and not in_range:
+            self._emit(depth, f"p = (p + {shift}) % {self._size}")
+        elif shift:
+            self._emit(depth, f"p += {shift}")
+
+    def _copy(self, depth: int, offset: int, targets, in_range: bool, checked):
+        source = self._cell(depth, offset, in_range, checked)
+        self._emit(depth, f"v = {source}")
+        self._emit(depth, "if v:")
+        self._emit(depth + 1, f"{source} = 0")
+        checked = list(checked)
+        for target, factor in targets:
+            index = self._index(depth + 1, offset + target, in_range, "j")
+            if not in_range and not self._wrap:
+                self._check(depth + 1, offset + target, checked)
+            product = "v" if abs(factor) == 1 else f"v * {abs(factor)}"
+            sign = "-" if factor < 0 else "+"
+            self._emit(
+                depth + 1,
+                f"tape[{index}] = (tape[{index}] {sign} {product}) & {self._mask}",
+            )
+
+    def _cell(self, depth: int, offset: int, in_range: bool, checked) -> str:
+        if self._checked and not in_range and not self._wrap:
+            self._check(depth, offset, checked)
+        return f"tape[{self._index(depth, offset, in_range)}]"
+
+    def _index(self, depth: int, offset: int, in_range: bool, name: str = "i") -> str:
+        index = "p" if offset == 0 else f"p {'-' if offset < 0 else '+'} {abs(offset)}"
+        if offset == 0 or in_range or not self._wrap:
+            return index
+        self._emit(depth, f"{name} = ({index}) % {self._size}")
+        return name
+
+    def _check(self, depth: int, offset: int, checked):
+        if checked[0] <= offset <= checked[1]:
+            return
+        index = self._index(depth, offset, True)
+        self._emit(depth, f"if not 0 <= {index} < {self._size}:")
+        self._emit(depth + 1, 'raise BrainfuckError("Memory overflow")')
+        checked[0] = min(checked[0], offset)
+        checked[1] = max(checked[1], offset)
+
+    def _flush(self, depth: int):
+        self._emit(depth, f"if len(out) >= {OUTPUT_BUFFER_SIZE}:")
+        self._emit(depth + 1, "output.write(out)")
+        self._emit(depth + 1, "out.clear()")
+
+
+def brainfuck_jit(module, options: BrainfuckOptions, input=b"") -> bytes:
+    return BrainfuckPythonJit(options).run(module, input)
+
+
+def brainfuck_run_jit(output, module, options: BrainfuckOptions):
+    BrainfuckPythonJit(options).run(module, sys.stdin.buffer, output)
@@ -1,6 +1,10 @@
+import copy
 import enum
 
 
+MEMORY_SIZE = 30000
+
+
 class MemoryOverflow(enum.Enum):
     Undefined = "Undefined"
     Wrap = "Wrap"
@@ -22,16 +26,71 @@ class BrainfuckOptions:
         module_name: str,
         memory_overflow: MemoryOverflow = MemoryOverflow.Undefined,
         cell_size: MemoryCellSize = MemoryCellSize.Byte,
+        optimization_level: int = 2,
+        evaluation_steps: int = 1000000,
+        evaluation_memory: int = 1 << 20,
+        power_of_two_memory: bool = False,
+        memory_size: int = MEMORY_SIZE,
+        growable_memory: bool = False,
+        outline_loops: bool = True,
+        profile_generate: str = None,
+        profile=None,
     ):
         self._module_name = module_name
         self._memory_overflow = memory_overflow
         self._cell_size = cell_size
+        self._optimization_level = optimization_level
+        self._evaluation_steps = evaluation_steps
+        self._evaluation_memory = evaluation_memory
+        self._power_of_two_memory = power_of_two_memory
+        self._memory_size = memory_size
+        self._growable_memory = growable_memory
+        self._outline_loops = outline_loops
+        self._profile_generate = profile_generate
+        self._profile = profile
 
     def get_module_name(self) -> str:
         return self._module_name
 
+    def with_module_name(self, module_name: str):
+        options = copy.copy(self)
+        options._module_name = module_name
+        return options
+
     def get_memory_overflow(self) -> MemoryOverflow:
         return self._memory_overflow
 
     def get_cell_size(self) -> MemoryCellSize:
         return self._cell_size
+
+    def get_optimization_level(self) -> int:
+        return self._optimization_level
+
+    def get_evaluation_steps(self) -> int:
+        return self._evaluation_steps
+
+    def get_evaluation_memory(self) -> int:
+        return self._evaluation_memory
+
+    def get_power_of_two_memory(self) -> bool:
+        return self._power_of_two_memory
+
+    def get_growable_memory(self) -> bool:
+        return self._growable_memory
+
+    def get_outline_loops(self) -> bool:
+        return self._outline_loops
+
+    def get_profile_generate(self) -> str:
+        return self._profile_generate
+
+    def get_profile(self):
+        return self._profile
+
+    def get_source_positions(self) -> bool:
+        return self._profile_generate is not None or self._profile is not None
+
+    def get_memory_size(self) -> int:
+        if self._power_of_two_memory:
+            return 1 << (self._memory_size - 1).bit_length()
+        return self._memory_size
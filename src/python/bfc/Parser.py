@@ -1,9 +1,22 @@
 from bfc.IR import IRInstructionBuilder, IRInstructionBlock
-from bfc.Token import BrainfuckToken
+from bfc.Token import BrainfuckToken, TOKEN_BY_BYTE
+from bfc.CompactIR import IRCompactBuilder, IRCompactView
 from bfc.Error import BrainfuckError
 
 
+PLUS = ord(BrainfuckToken.PLUS.value)
+MINUS = ord(BrainfuckToken.MINUS.value)
+RIGHT = ord(BrainfuckToken.RIGHT.value)
+LEFT = ord(BrainfuckToken.LEFT.value)
+OPEN = ord(BrainfuckToken.OPEN.value)
+CLOSE = ord(BrainfuckToken.CLOSE.value)
+WRITE = ord(BrainfuckToken.WRITE.value)
+READ = ord(BrainfuckToken.READ.value)
+
+
 def brainfuck_parse(tokens):
+    if isinstance(tokens, (bytes, bytearray)):
+        tokens = map(TOKEN_BY_BYTE.__getitem__, tokens)
     code = [[]]
     for token in tokens:
         if token == BrainfuckToken.PLUS:
@@ -29,3 +42,50 @@ def brainfuck_parse(tokens):
     if len(code) > 1:
         raise BrainfuckError("Brackets are not balanced")
     return IRInstructionBlock(code[-1])
+
+
+def brainfuck_parse_segments(chunks, segment_size: int = None):
+    builder = IRCompactBuilder()
+    for tokens, positions in chunks:
+        loops = 0
+        for code in tokens:
+            if code == PLUS:
+                builder.add(1)
+            elif code == MINUS:
+                builder.add(-1)
+            elif code == RIGHT:
+                builder.shift(1)
+            elif code == LEFT:
+                builder.shift(-1)
+            elif code == WRITE:
+                builder.write()
+            elif code == READ:
+                builder.read()
+            elif code == OPEN:
+                builder.begin_loop(None if positions is None else positions[loops])
+                loops += 1
+            elif code == CLOSE:
+                if builder.get_depth() == 0:
+                    raise BrainfuckError("Brackets are not balanced")
+                builder.end_loop()
+                if (
+                    segment_size is not None
+                    and builder.get_depth() == 0
+                    and len(builder.get_block()) >= segment_size
+                ):
+                    yield builder.get_block().get_root()
+                    builder = IRCompactBuilder()
+        if (
+            segment_size is not None
+            and builder.get_depth() == 0
+            and len(builder.get_block()) >= segment_size
+        ):
+            yield builder.get_block().get_root()
+            builder = IRCompactBuilder()
+    if builder.get_depth() > 0:
+        raise BrainfuckError("Brackets are not balanced")
+    yield builder.get_block().get_root()
+
+
+def brainfuck_parse_compact(tokens: bytes, positions: list = None) -> IRCompactView:
+    return next(brainfuck_parse_segments([(tokens, positions)]))
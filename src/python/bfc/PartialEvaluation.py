@@ -0,0 +1,167 @@
+from bfc.IR import *
+from bfc.Options import *
+
+
+CHECKPOINT_INTERVAL = 1 << 12
+
+
+class BrainfuckPartialEvaluator:
+    def __init__(self, options: BrainfuckOptions):
+        self._options = options
+        self._memory_size = options.get_memory_size()
+        self._mask = (1 << (8 * options.get_cell_size().get_size())) - 1
+        self._code = dict()
+        self._budget = options.get_evaluation_steps()
+        self._complete = False
+
+    def get_budget(self) -> int:
+        return self._budget
+
+    def is_complete(self) -> bool:
+        return self._complete
+
+    def evaluate(
+        self, module: IRInstructionBlock, final: bool = True
+    ) -> IRInstructionBlock:
+        size = self._memory_size
+        mask = self._mask
+        budget = self._budget
+        self._code = dict()
+        self._complete = False
+        tape = [0] * size
+        output = bytearray()
+        pointer = 0
+        steps = 0
+        checkpoint = None
+        checkpoint_steps = 0
+        frames = list()
+        body = module.get_body()
+        code = self._lower(body)
+        index = 0
+        loop = None
+        while steps < budget:
+            if index == len(code):
+                if loop is None:
+                    break
+                elif tape[pointer]:
+                    index = 0
+                    steps += 1
+                    if len(frames) == 1 and steps >= checkpoint_steps:
+                        checkpoint_steps = steps + CHECKPOINT_INTERVAL
+                        top = frames[0][1] - 1
+                        checkpoint = (top, tape[:], pointer, len(output))
+                else:
+                    code, index, body, loop = frames.pop()
+                continue
+            opcode, args, offset = code[index]
+            cell = pointer + offset
+            if not 0 <= cell < size:
+                break
+            steps += 1
+            if opcode == IROpcode.Add:
+                tape[cell] = (tape[cell] + args) & mask
+            elif opcode == IROpcode.Shift:
+                if not 0 <= cell + args < size:
+                    break
+                pointer = cell + args
+            elif opcode == IROpcode.Loop:
+                if tape[cell]:
+                    if not frames:
+                        checkpoint = (index, tape[:], pointer, len(output))
+                    frames.append((code, index + 1, body, loop))
+                    loop = body[index]
+                    body = args
+                    code = self._lower(body)
+                    index = 0
+                    continue
+            elif opcode == IROpcode.Set:
+                tape[cell] = args & mask
+            elif opcode == IROpcode.Copy:
+                value = tape[cell]
+                if value:
+                    if any(not 0 <= cell + target < size for target, _ in args):
+                        break
+                    tape[cell] = 0
+                    for target, multiply in args:
+                        target += cell
+                        tape[target] = (tape[target] + value * multiply) & mask
+            elif opcode == IROpcode.Write:
+                output.append(tape[cell] & 0xFF)
+            elif opcode == IROpcode.Print:
+                output.extend(args)
+            elif opcode == IROpcode.Scan:
+                while tape[pointer] and steps < budget:
+                    if not 0 <= pointer + args < size:
+                        break
+                    pointer += args
+                    steps += 1
+                if tape[pointer]:
+                    break
+            elif opcode == IROpcode.Load:
+                if cell + len(args) > size:
+                    break
+                tape[cell : cell + len(args)] = args
+            elif opcode != IROpcode.Nop:
+                break
+            index += 1
+        self._budget = max(budget - steps, 0)
+        if steps == 0:
+            return module
+        if steps >= budget and frames:
+            index, tape, pointer, written = checkpoint
+            del output[written:]
+            body = module.get_body()
+            loop = None
+            frames = list()
+        frames.append((None, index, body, loop))
+        return self._residual(module, tape, pointer, output, frames, final)
+
+    def _lower(self, body: [IRInstruction]) -> list:
+        code = self._code.get(id(body))
+        if code is None:
+            code = list()
+            for instr in body:
+                opcode = instr.get_opcode()
+                args = instr.get_arguments()
+                if instr.get_dependencies():
+                    opcode = None
+                elif opcode == IROpcode.Loop:
+                    args = args[0].get_body()
+                elif opcode != IROpcode.Copy:
+                    args = args[0] if args else None
+                code.append((opcode, args, instr.get_pointer()))
+            self._code[id(body)] = code
+        return code
+
+    def _residual(
+        self, module, tape, pointer, output, frames, final: bool
+    ) -> IRInstructionBlock:
+        _, index, body, loop = frames[-1]
+        finished = loop is None and index == len(body)
+        memory = len(output)
+        residual = list()
+        if output:
+            residual.append(IRInstructionBuilder.print(bytes(output)))
+        if not finished or not final:
+            cells = [cell for cell, value in enumerate(tape) if value]
+            if cells:
+                low = cells[0]
+                high = cells[-1] + 1
+                memory += (high - low) * self._options.get_cell_size().get_size()
+                residual.append(IRInstructionBuilder.shift(low))
+                residual.append(IRInstructionBuilder.load(tuple(tape[low:high])))
+                residual.append(IRInstructionBuilder.shift(pointer - low))
+            elif pointer:
+                residual.append(IRInstructionBuilder.shift(pointer))
+            for _, index, body, loop in reversed(frames):
+                residual.extend(body[index:])
+                if loop is not None:
+                    residual.append(loop)
+        if memory > self._options.get_evaluation_memory():
+            return module
+        self._complete = finished
+        return IRInstructionBlock(residual)
+
+
+def brainfuck_ir_evaluate_prefix(module: IRInstructionBlock, options: BrainfuckOptions):
+    return BrainfuckPartialEvaluator(options).evaluate(module)
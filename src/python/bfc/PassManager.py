@@ -0,0 +1,287 @@
+from bfc.IR import *
+from bfc.Options import *
+from bfc.IROptimizer import brainfuck_ir_optimize
+from bfc.FlowAnalysis import brainfuck_ir_analyze_flow
+from bfc.ConstantOutput import brainfuck_ir_coalesce_output
+from bfc.PartialEvaluation import brainfuck_ir_evaluate_prefix
+from bfc.HashCons import *
+import abc
+import time
+import tracemalloc
+
+
+BLOCK_SIZES = IRBoundedCache()
+
+
+def brainfuck_ir_size(module) -> (int, int):
+    frames = [[module, iter(module.get_body()), 0, 0]]
+    while True:
+        frame = frames[-1]
+        instr = next(frame[1], None)
+        if instr is None:
+            frames.pop()
+            size = frame[2], frame[3]
+            if brainfuck_ir_is_shared(frame[0]):
+                BLOCK_SIZES.put(frame[0], size)
+            if not frames:
+                return size
+            frames[-1][2] += size[0]
+            frames[-1][3] += size[1]
+            continue
+        frame[2] += 1
+        if instr.get_opcode() == IROpcode.Loop:
+            frame[3] += 1
+            body = instr.get_arguments()[0]
+            size = BLOCK_SIZES.get(body)
+            if size is None:
+                frames.append([body, iter(body.get_body()), 0, 0])
+            else:
+                frame[2] += size[0]
+                frame[3] += size[1]
+
+
+def brainfuck_ir_signature(module) -> tuple:
+    signature = list()
+    stack = [iter(module.get_body())]
+    while stack:
+        instr = next(stack[-1], None)
+        if instr is None:
+            stack.pop()
+            signature.append(None)
+        elif instr.get_opcode() == IROpcode.Loop:
+            signature.append((instr.get_opcode(), instr.get_pointer()))
+            stack.append(iter(instr.get_arguments()[0].get_body()))
+        else:
+            signature.append(
+                (instr.get_opcode(), instr.get_arguments(), instr.get_pointer())
+            )
+    return tuple(signature)
+
+
+class IRPass(abc.ABC):
+    @abc.abstractmethod
+    def get_name(self) -> str:
+        pass
+
+    @abc.abstractmethod
+    def run(self, module, options: BrainfuckOptions):
+        pass
+
+
+class IRPeepholePass(IRPass):
+    def get_name(self) -> str:
+        return "peephole"
+
+    def run(self, module, options: BrainfuckOptions):
+        return brainfuck_ir_optimize(module)
+
+
+class IRFlowAnalysisPass(IRPass):
+    def get_name(self) -> str:
+        return "flow"
+
+    def run(self, module, options: BrainfuckOptions):
+        return brainfuck_ir_analyze_flow(module, options)
+
+
+class IRConstantOutputPass(IRPass):
+    def __init__(self, zero_filled: bool = True):
+        self._zero_filled = zero_filled
+
+    def get_name(self) -> str:
+        return "output"
+
+    def run(self, module, options: BrainfuckOptions):
+        return brainfuck_ir_coalesce_output(module, options, self._zero_filled)
+
+
+class IRPartialEvaluationPass(IRPass):
+    def get_name(self) -> str:
+        return "evaluate"
+
+    def run(self, module, options: BrainfuckOptions):
+        return brainfuck_ir_evaluate_prefix(module, options)
+
+
+Passes = {
+    "peephole": IRPeepholePass,
+    "flow": IRFlowAnalysisPass,
+    "output": IRConstantOutputPass,
+    "evaluate": IRPartialEvaluationPass,
+}
+
+PIPELINES = {
+    0: (),
+    1: ((("peephole", "output"), False), (("flow",), False)),
+    2: ((("peephole", "output"), True), (("flow", "evaluate"), False)),
+}
+
+MAX_ITERATIONS = 8
+
+
+def brainfuck_statistics_column(value, width: int) -> str:
+    return f"{'-':>{width}}" if value is None else f"{value:>{width}}"
+
+
+class IRPassStatistics:
+    def __init__(self, name: str, iteration: int = 0):
+        self._name = name
+        self._iteration = iteration
+        self._wall_time = 0.0
+        self._cpu_time = 0.0
+        self._instructions_before = None
+        self._instructions_after = None
+        self._loops_before = None
+        self._loops_after = None
+        self._allocated = None
+        self._peak = None
+
+    def get_name(self) -> str:
+        return self._name
+
+    def get_iteration(self) -> int:
+        return self._iteration
+
+    def get_wall_time(self) -> float:
+        return self._wall_time
+
+    def get_cpu_time(self) -> float:
+        return self._cpu_time
+
+    def get_instructions_before(self) -> int:
+        return self._instructions_before
+
+    def get_instructions_after(self) -> int:
+        return self._instructions_after
+
+    def get_loops_before(self) -> int:
+        return self._loops_before
+
+    def get_loops_after(self) -> int:
+        return self._loops_after
+
+    def get_allocated(self) -> int:
+        return self._allocated
+
+    def get_peak(self) -> int:
+        return self._peak
+
+    def start(self, module=None):
+        if module is not None:
+            self._instructions_before, self._loops_before = brainfuck_ir_size(module)
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self._allocated = tracemalloc.get_traced_memory()[0]
+        self._cpu_time = time.process_time()
+        self._wall_time = time.perf_counter()
+
+    def stop(self, module=None):
+        self._wall_time = time.perf_counter() - self._wall_time
+        self._cpu_time = time.process_time() - self._cpu_time
+        if self._allocated is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            self._peak = peak - self._allocated
+            self._allocated = current - self._allocated
+        if module is not None:
+            self._instructions_after, self._loops_after = brainfuck_ir_size(module)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self._name,
+            "iteration": self._iteration,
+            "wall_time": self._wall_time,
+            "cpu_time": self._cpu_time,
+            "instructions_before": self._instructions_before,
+            "instructions_after": self._instructions_after,
+            "loops_before": self._loops_before,
+            "loops_after": self._loops_after,
+            "allocated": self._allocated,
+            "peak": self._peak,
+        }
+
+    @staticmethod
+    def header(with_memory: bool = False) -> str:
+        memory = f" {'allocated':>12} {'peak':>12}" if with_memory else ""
+        return (
+            f"{'pass':<12} {'iter':>4} {'seconds':>10} {'cpu':>10}"
+            f" {'before':>10} {'after':>10} {'loops in':>9} {'loops out':>9}"
+            f"{memory}"
+        )
+
+    def __str__(self):
+        memory = ""
+        if self._allocated is not None:
+            memory = f" {self._allocated:>12} {self._peak:>12}"
+        return (
+            f"{self._name:<12} {self._iteration:>4} {self._wall_time:>10.4f}"
+            f" {self._cpu_time:>10.4f}"
+            f" {brainfuck_statistics_column(self._instructions_before, 10)}"
+            f" {brainfuck_statistics_column(self._instructions_after, 10)}"
+            f" {brainfuck_statistics_column(self._loops_before, 9)}"
+            f" {brainfuck_statistics_column(self._loops_after, 9)}"
+            f"{memory}"
+        )
+
+
+class IRPassManager:
+    def __init__(
+        self,
+        options: BrainfuckOptions,
+        max_iterations: int = MAX_ITERATIONS,
+        trace_allocations: bool = False,
+    ):
+        self._options = options
+        self._max_iterations = max_iterations
+        self._trace_allocations = trace_allocations
+        self._stages = list()
+        self._statistics = list()
+
+    def add(self, *passes: IRPass, fixed_point: bool = False):
+        self._stages.append((passes, fixed_point))
+
+    def get_statistics(self) -> [IRPassStatistics]:
+        return self._statistics
+
+    def run(self, module):
+        started_tracing = self._trace_allocations and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            for passes, fixed_point in self._stages:
+                if fixed_point:
+                    module = self._run_fixed_point(passes, module)
+                else:
+                    for ir_pass in passes:
+                        module = self._run_pass(ir_pass, module, 0)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+        return module
+
+    def _run_fixed_point(self, passes: [IRPass], module):
+        module = brainfuck_ir_share(module)
+        for iteration in range(self._max_iterations):
+            previous = module
+            for ir_pass in passes:
+                module = self._run_pass(ir_pass, module, iteration)
+            module = brainfuck_ir_share(module)
+            if module is previous:
+                break
+        return module
+
+    def _run_pass(self, ir_pass: IRPass, module, iteration: int):
+        statistics = IRPassStatistics(ir_pass.get_name(), iteration)
+        statistics.start(module)
+        module = ir_pass.run(module, self._options)
+        statistics.stop(module)
+        self._statistics.append(statistics)
+        return module
+
+
+def brainfuck_pass_manager(
+    options: BrainfuckOptions, trace_allocations: bool = False
+) -> IRPassManager:
+    manager = IRPassManager(options, trace_allocations=trace_allocations)
+    for names, fixed_point in PIPELINES[options.get_optimization_level()]:
+        manager.add(*[Passes[name]() for name in names], fixed_point=fixed_point)
+    return manager
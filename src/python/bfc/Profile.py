@@ -0,0 +1,132 @@
+from bfc.Error import BrainfuckError
+import enum
+import struct
+
+
+PROFILE_MAGIC = b"BFPROF1\0"
+PROFILE_HEADER = struct.Struct("<8sQ")
+PROFILE_RECORD = struct.Struct("<IIIIQQ")
+PROFILE_ENTRIES = 16
+PROFILE_ITERATIONS = 24
+
+
+class ProfileSiteKind(enum.Enum):
+    Loop = 0
+    Copy = 1
+
+
+PROFILE_SITE_KINDS = {kind.value: kind for kind in ProfileSiteKind}
+
+
+class BrainfuckProfileSite:
+    def __init__(
+        self,
+        kind: ProfileSiteKind,
+        position: (int, int),
+        entries: int = 0,
+        iterations: int = 0,
+    ):
+        self._kind = kind
+        self._position = position
+        self._entries = entries
+        self._iterations = iterations
+
+    def get_kind(self) -> ProfileSiteKind:
+        return self._kind
+
+    def get_position(self) -> (int, int):
+        return self._position
+
+    def get_entries(self) -> int:
+        return self._entries
+
+    def get_iterations(self) -> int:
+        return self._iterations
+
+    def get_weight(self) -> int:
+        return self._entries + self._iterations
+
+    def get_trip_count(self) -> float:
+        return self._iterations / self._entries if self._entries else 0.0
+
+    def __repr__(self):
+        return repr((self._kind.value, self._position, self._entries, self._iterations))
+
+    @staticmethod
+    def header() -> str:
+        return (
+            f"{'site':<6} {'line':>7} {'column':>7}"
+            f" {'entries':>14} {'iterations':>14} {'trips':>10}"
+        )
+
+    def __str__(self):
+        line, column = self._position
+        return (
+            f"{self._kind.name:<6} {line:>7} {column:>7}"
+            f" {self._entries:>14} {self._iterations:>14}"
+            f" {self.get_trip_count():>10.1f}"
+        )
+
+
+class BrainfuckProfile:
+    def __init__(self, sites: [BrainfuckProfileSite] = ()):
+        self._sites = {site.get_position(): site for site in sites}
+
+    def __len__(self):
+        return len(self._sites)
+
+    def __repr__(self):
+        return repr(sorted(self._sites.values(), key=BrainfuckProfileSite.get_position))
+
+    def get_site(self, position) -> BrainfuckProfileSite:
+        return self._sites.get(position)
+
+    def get_sites(self) -> [BrainfuckProfileSite]:
+        return sorted(
+            self._sites.values(),
+            key=lambda site: (-site.get_weight(), site.get_position()),
+        )
+
+    def pack(self) -> bytes:
+        records = [
+            PROFILE_RECORD.pack(
+                *site.get_position(),
+                site.get_kind().value,
+                0,
+                site.get_entries(),
+                site.get_iterations(),
+            )
+            for site in self._sites.values()
+        ]
+        size = PROFILE_HEADER.size + PROFILE_RECORD.size * len(records)
+        return PROFILE_HEADER.pack(PROFILE_MAGIC, size) + b"".join(records)
+
+    @staticmethod
+    def unpack(data: bytes):
+        if len(data) < PROFILE_HEADER.size:
+            raise BrainfuckError("Invalid profile")
+        magic, size = PROFILE_HEADER.unpack_from(data)
+        records = size - PROFILE_HEADER.size
+        if magic != PROFILE_MAGIC or size != len(data) or records % PROFILE_RECORD.size:
+            raise BrainfuckError("Invalid profile")
+        sites = list()
+        for offset in range(PROFILE_HEADER.size, size, PROFILE_RECORD.size):
+            line, column, kind, _, entries, iterations = PROFILE_RECORD.unpack_from(
+                data, offset
+            )
+            if kind not in PROFILE_SITE_KINDS:
+                raise BrainfuckError("Invalid profile")
+            sites.append(
+                BrainfuckProfileSite(
+                    PROFILE_SITE_KINDS[kind], (line, column), entries, iterations
+                )
+            )
+        return BrainfuckProfile(sites)
+
+    @staticmethod
+    def load(file_name: str):
+        try:
+            with open(file_name, "rb") as profile:
+                return BrainfuckProfile.unpack(profile.read())
+        except OSError as error:
+            raise BrainfuckError(f"Cannot read profile {file_name}: {error.strerror}")
@@ -0,0 +1,83 @@
+from bfc.Build import brainfuck_compile_tokens
+from bfc.Cache import BrainfuckCache
+from bfc.Client import *
+from bfc.Codegen import Codegen, BinaryCodegen, RunningCodegen
+from bfc.Error import BrainfuckError
+from bfc.Options import *
+from bfc.Token import brainfuck_strip_comments, brainfuck_loop_positions
+import concurrent.futures
+import os
+import socketserver
+import stat
+
+
+WARM_UP_SOURCE = b"+[->+>++<<]>[-]>."
+
+
+def brainfuck_compile_request(
+    source: bytes, codegen, options: BrainfuckOptions, cache: BrainfuckCache = None
+) -> bytes:
+    tokens = brainfuck_strip_comments(source)
+    positions = None
+    if options.get_source_positions():
+        positions = brainfuck_loop_positions(source)
+    output = brainfuck_compile_tokens(tokens, positions, codegen, options, cache)
+    return output if isinstance(output, bytes) else output.encode()
+
+
+def brainfuck_warm_up():
+    options = BrainfuckOptions("warm_up")
+    for codegen in Codegen.values():
+        if codegen not in RunningCodegen:
+            brainfuck_compile_request(WARM_UP_SOURCE, codegen, options)
+
+
+class BrainfuckRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        header, source = brainfuck_receive_message(self.request)
+        try:
+            codegen, options, cache = self.server.parse_request(header["args"])
+            if codegen in RunningCodegen:
+                name = next(name for name, value in Codegen.items() if value is codegen)
+                raise BrainfuckError(f"Code generator {name} can not be served")
+            output = self.server.get_pool().submit(
+                brainfuck_compile_request, source, codegen, options, cache
+            )
+            output = output.result()
+        except (BrainfuckError, OSError, RecursionError) as error:
+            brainfuck_send_message(self.request, {"error": str(error)})
+            return
+        brainfuck_send_message(
+            self.request, {"binary": codegen in BinaryCodegen}, output
+        )
+
+
+class BrainfuckCompileServer(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    daemon_threads = True
+
+    def __init__(self, path: str, parse_request, jobs: int = None):
+        self._path = path
+        self._parse_request = parse_request
+        brainfuck_warm_up()
+        self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+        self._pool.submit(brainfuck_warm_up).result()
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+        super().__init__(path, BrainfuckRequestHandler)
+
+    def get_path(self) -> str:
+        return self._path
+
+    def get_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        return self._pool
+
+    def parse_request(self, args: [str]):
+        return self._parse_request(args)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown()
+        if os.path.exists(self._path):
+            os.unlink(self._path)
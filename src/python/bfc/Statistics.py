@@ -0,0 +1,114 @@
+from bfc.Token import brainfuck_strip_comments, brainfuck_loop_positions
+from bfc.Parser import brainfuck_parse_compact
+from bfc.PassManager import IRPassStatistics, brainfuck_pass_manager
+from bfc.IROptimizer import brainfuck_ir_rule_counts
+from bfc.Options import *
+import json
+import tracemalloc
+
+
+class BrainfuckStatistics:
+    def __init__(self, trace_allocations: bool = True):
+        self._trace_allocations = trace_allocations
+        self._started_tracing = False
+        self._phases = list()
+        self._rule_counts = dict()
+        self._initial_rule_counts = dict()
+        self._peak = None
+
+    def start(self):
+        self._initial_rule_counts = brainfuck_ir_rule_counts()
+        if self._trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        self._rule_counts = {
+            name: count - self._initial_rule_counts.get(name, 0)
+            for name, count in brainfuck_ir_rule_counts().items()
+        }
+        peaks = [phase.get_peak() for phase in self._phases]
+        peaks = [peak for peak in peaks if peak is not None]
+        self._peak = max(peaks, default=None)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def phase(self, name: str, module=None) -> IRPassStatistics:
+        statistics = IRPassStatistics(name)
+        self._phases.append(statistics)
+        statistics.start(module)
+        return statistics
+
+    def extend(self, phases: [IRPassStatistics]):
+        self._phases.extend(phases)
+
+    def get_phases(self) -> [IRPassStatistics]:
+        return self._phases
+
+    def get_rule_counts(self) -> dict:
+        return self._rule_counts
+
+    def get_wall_time(self) -> float:
+        return sum(phase.get_wall_time() for phase in self._phases)
+
+    def get_cpu_time(self) -> float:
+        return sum(phase.get_cpu_time() for phase in self._phases)
+
+    def get_peak(self) -> int:
+        return self._peak
+
+    def to_dict(self) -> dict:
+        return {
+            "wall_time": self.get_wall_time(),
+            "cpu_time": self.get_cpu_time(),
+            "peak": self._peak,
+            "phases": [phase.to_dict() for phase in self._phases],
+            "rules": self._rule_counts,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def report(self) -> str:
+        with_memory = self._peak is not None
+        lines = [IRPassStatistics.header(with_memory)]
+        lines.extend(map(str, self._phases))
+        lines.append(
+            f"{'total':<12} {'':>4} {self.get_wall_time():>10.4f}"
+            f" {self.get_cpu_time():>10.4f}"
+        )
+        lines.append(f"{'rule':<24} {'fired':>10}")
+        for name, count in sorted(self._rule_counts.items()):
+            lines.append(f"{name:<24} {count:>10}")
+        return "\n".join(lines)
+
+
+def brainfuck_compile_statistics(
+    source: bytes,
+    codegen,
+    output,
+    options: BrainfuckOptions,
+    trace_allocations: bool = True,
+) -> BrainfuckStatistics:
+    statistics = BrainfuckStatistics(trace_allocations)
+    statistics.start()
+    try:
+        phase = statistics.phase("tokenize")
+        tokens = brainfuck_strip_comments(source)
+        positions = None
+        if options.get_source_positions():
+            positions = brainfuck_loop_positions(source)
+        phase.stop()
+        phase = statistics.phase("parse")
+        module = brainfuck_parse_compact(tokens, positions)
+        phase.stop(module)
+        passes = brainfuck_pass_manager(options)
+        module = passes.run(module)
+        statistics.extend(passes.get_statistics())
+        phase = statistics.phase("codegen", module)
+        codegen(output, module, options)
+        phase.stop()
+    finally:
+        statistics.stop()
+    return statistics
@@ -0,0 +1,57 @@
+from bfc.IR import IRInstructionBlock
+from bfc.Token import brainfuck_source_chunks
+from bfc.Parser import brainfuck_parse_segments
+from bfc.PassManager import *
+from bfc.PartialEvaluation import BrainfuckPartialEvaluator
+from bfc.Options import *
+
+
+STREAM_SEGMENT_SIZE = 1 << 12
+
+
+def brainfuck_segment_pass_manager(
+    options: BrainfuckOptions, zero_filled: bool
+) -> IRPassManager:
+    manager = IRPassManager(options)
+    for names, fixed_point in PIPELINES[options.get_optimization_level()]:
+        passes = list()
+        for name in names:
+            if name == "output":
+                passes.append(IRConstantOutputPass(zero_filled))
+            elif name != "evaluate":
+                passes.append(Passes[name]())
+        if passes:
+            manager.add(*passes, fixed_point=fixed_point)
+    return manager
+
+
+def brainfuck_stream_evaluates(options: BrainfuckOptions) -> bool:
+    return any(
+        "evaluate" in names
+        for names, _ in PIPELINES[options.get_optimization_level()]
+    )
+
+
+def brainfuck_stream_segments(
+    input, options: BrainfuckOptions, segment_size: int = STREAM_SEGMENT_SIZE
+):
+    chunks = brainfuck_source_chunks(input, options.get_source_positions())
+    evaluator = None
+    if brainfuck_stream_evaluates(options):
+        evaluator = BrainfuckPartialEvaluator(options)
+    pending = None
+    zero_filled = True
+    for segment in brainfuck_parse_segments(chunks, segment_size):
+        module = brainfuck_segment_pass_manager(options, zero_filled).run(segment)
+        zero_filled = False
+        if evaluator is not None:
+            if pending is not None:
+                module = IRInstructionBlock(pending.get_body() + module.get_body())
+            module = evaluator.evaluate(module, final=False)
+            if evaluator.is_complete():
+                pending = module
+                continue
+            evaluator = pending = None
+        yield module
+    if pending is not None:
+        yield evaluator.evaluate(pending)
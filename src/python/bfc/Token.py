@@ -14,22 +14,85 @@ class BrainfuckToken(enum.Enum):
 
     @staticmethod
     def is_token(symbol):
-        return any(symbol == token.value for token in BrainfuckToken)
+        return symbol in TOKEN_SYMBOLS
 
 
-def next_brainfuck_token(input) -> str:
-    token = None
-    symbol = input.read(1)
-    while symbol and token is None:
-        if BrainfuckToken.is_token(symbol):
-            token = BrainfuckToken(symbol)
-        else:
-            symbol = input.read(1)
-    return token
+TOKEN_SYMBOLS = frozenset(token.value for token in BrainfuckToken)
+TOKEN_BYTES = bytes(ord(token.value) for token in BrainfuckToken)
+TOKEN_BY_BYTE = {ord(token.value): token for token in BrainfuckToken}
+COMMENT_BYTES = bytes(code for code in range(256) if code not in TOKEN_BYTES)
+CHUNK_SIZE = 1 << 20
+
+
+def brainfuck_strip_comments(data: bytes) -> bytes:
+    return data.translate(None, COMMENT_BYTES)
+
+
+def brainfuck_token_chunks(input, chunk_size: int = CHUNK_SIZE):
+    chunk = input.read(chunk_size)
+    while chunk:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("latin-1", "ignore")
+        yield brainfuck_strip_comments(chunk)
+        chunk = input.read(chunk_size)
+
+
+def brainfuck_read_tokens(input) -> bytes:
+    return b"".join(brainfuck_token_chunks(input))
+
+
+def brainfuck_load_tokens(file_name: str) -> bytes:
+    with open(file_name, "rb") as code:
+        return brainfuck_read_tokens(code)
 
 
 def brainfuck_tokenize(input: io.StringIO) -> str:
-    token = next_brainfuck_token(input)
-    while token:
-        yield token
-        token = next_brainfuck_token(input)
+    for chunk in brainfuck_token_chunks(input):
+        for code in chunk:
+            yield TOKEN_BY_BYTE[code]
+
+
+def brainfuck_loop_positions(
+    data: bytes, line: int = 1, line_start: int = 0
+) -> [(int, int)]:
+    positions = list()
+    scanned = 0
+    offset = data.find(b"[")
+    while offset >= 0:
+        newlines = data.count(b"\n", scanned, offset)
+        if newlines:
+            line += newlines
+            line_start = data.rindex(b"\n", scanned, offset) + 1
+        positions.append((line, offset - line_start + 1))
+        scanned = offset
+        offset = data.find(b"[", offset + 1)
+    return positions
+
+
+def brainfuck_source_chunks(
+    input, positions: bool = False, chunk_size: int = CHUNK_SIZE
+):
+    line = 1
+    line_start = 0
+    chunk = input.read(chunk_size)
+    while chunk:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("latin-1", "ignore")
+        loops = None
+        if positions:
+            loops = brainfuck_loop_positions(chunk, line, line_start)
+            newlines = chunk.count(b"\n")
+            if newlines:
+                line += newlines
+                line_start = chunk.rindex(b"\n") + 1
+            line_start -= len(chunk)
+        yield brainfuck_strip_comments(chunk), loops
+        chunk = input.read(chunk_size)
+
+
+def brainfuck_load_source(file_name: str, positions: bool = False):
+    if not positions:
+        return brainfuck_load_tokens(file_name), None
+    with open(file_name, "rb") as code:
+        data = code.read()
+    return brainfuck_strip_comments(data), brainfuck_loop_positions(data)
@@ -1,4 +1,5 @@
 import enum
+import functools
 
 
 class AsmJumpIf(enum.Enum):
@@ -8,6 +9,7 @@ class AsmJumpIf(enum.Enum):
     GreaterOrEquals = "jge"
     Lesser = "jl"
     LesserOrEquals = "jle"
+    AboveOrEquals = "jae"
 
 
 class AsmRegister(enum.Enum):
@@ -83,87 +85,142 @@ class AsmPointerType(enum.Enum):
         return self.value
 
 
+NUMBERED_REGISTER_SUFFIX = {
+    AsmPointerType.Byte: "b",
+    AsmPointerType.Word: "w",
+    AsmPointerType.DWord: "d",
+    AsmPointerType.QWord: "",
+}
+
+
 class AsmAbstractRegister(enum.Enum):
     RegA = "a"
     RegB = "b"
     RegC = "c"
     RegD = "d"
+    RegSI = "si"
+    RegDI = "di"
+    Reg8 = "8"
+    Reg9 = "9"
+    Reg10 = "10"
+    Reg11 = "11"
 
     def get_reg(self, pointer_type: AsmPointerType):
+        if self.value.isdigit():
+            return f"r{self.value}{NUMBERED_REGISTER_SUFFIX[pointer_type]}"
+        name = self.value if len(self.value) == 2 else f"{self.value}x"
         if pointer_type == AsmPointerType.Byte:
             return f"{self.value}l"
         elif pointer_type == AsmPointerType.Word:
-            return f"{self.value}x"
+            return name
         elif pointer_type == AsmPointerType.DWord:
-            return f"e{self.value}x"
+            return f"e{name}"
         elif pointer_type == AsmPointerType.QWord:
-            return f"r{self.value}x"
+            return f"r{name}"
 
 
 class AsmLabel:
-    def __init__(self, output, label: str):
-        self._output = output
+    def __init__(self, gen, label: str):
+        self._gen = gen
         self._label = label
 
     def get_label(self) -> str:
         return self._label
 
     def jump(self):
-        self._output.write(f"\tjmp {self._label}\n")
+        self._gen.instruction("jmp", self._label)
 
     def jump_if(self, condition: AsmJumpIf):
-        self._output.write(f"\t{condition.value} {self._label}\n")
+        self._gen.instruction(condition.value, self._label)
 
     def put(self):
-        self._output.write(f"{self._label}:\n")
+        self._gen.put_label(self._label)
 
     def __str__(self):
         return self._label
 
 
+DB_LINE_SIZE = 16
+
+
+@functools.lru_cache(maxsize=None)
+def brainfuck_read_runtime(path: str) -> str:
+    with open(path) as runtime:
+        return runtime.read()
+
+
 class AsmGenerator:
     def __init__(self, output):
         self._output = output
 
+    def section(self, name: str):
+        self._output.write(f"SECTION {name}\n")
+
+    def db(self, data: bytes):
+        for start in range(0, len(data), DB_LINE_SIZE):
+            values = ", ".join(map(str, data[start : start + DB_LINE_SIZE]))
+            self._output.write(f"\tdb {values}\n")
+
     def define(self, name: str, value):
         self._output.write(f"%define {name} {value}\n")
 
     def label(self, label: str) -> AsmLabel:
-        return AsmLabel(self._output, label)
+        return AsmLabel(self, label)
+
+    def put_label(self, label: str):
+        self._output.write(f"{label}:\n")
 
     def pointer(self, pointer_type: AsmPointerType, to):
         return f"{str(pointer_type)} [{to}]"
 
+    def instruction(self, mnemonic: str, *operands):
+        if operands:
+            self._output.write(f"\t{mnemonic} {', '.join(map(str, operands))}\n")
+        else:
+            self._output.write(f"\t{mnemonic}\n")
+
     def mov(self, dest, src):
-        self._output.write(f"\tmov {str(dest)}, {str(src)}\n")
+        self.instruction("mov", dest, src)
+
+    def lea(self, dest, src):
+        self.instruction("lea", dest, f"[{str(src)}]")
 
     def add(self, dest, src):
-        self._output.write(f"\tadd {str(dest)}, {str(src)}\n")
+        self.instruction("add", dest, src)
 
     def sub(self, dest, src):
-        self._output.write(f"\tsub {str(dest)}, {str(src)}\n")
+        self.instruction("sub", dest, src)
 
     def xor(self, dest, src):
-        self._output.write(f"\txor {str(dest)}, {str(src)}\n")
+        self.instruction("xor", dest, src)
+
+    def and_(self, dest, src):
+        self.instruction("and", dest, src)
+
+    def test(self, dest, src):
+        self.instruction("test", dest, src)
 
     def cmp(self, dest, src):
-        self._output.write(f"\tcmp {str(dest)}, {str(src)}\n")
+        self.instruction("cmp", dest, src)
 
     def push(self, src):
-        self._output.write(f"\tpush {str(src)}\n")
+        self.instruction("push", src)
 
     def pop(self, dst):
-        self._output.write(f"\tpop {str(dst)}\n")
+        self.instruction("pop", dst)
 
-    def imul(self, multiply):
-        self._output.write(f"\timul {str(multiply)}\n")
+    def imul(self, *operands):
+        self.instruction("imul", *operands)
 
     def call(self, proc: str):
-        self._output.write(f"\tcall {proc}\n")
+        self.instruction("call", proc)
 
     def ret(self):
-        self._output.write("\tret\n")
+        self.instruction("ret")
 
-    def dump(self, file):
-        self._output.write(file.read())
+    def dump(self, path: str):
+        self._output.write(brainfuck_read_runtime(path))
         self._output.write("\n")
+
+    def finish(self):
+        pass
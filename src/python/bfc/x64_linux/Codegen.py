@@ -1,7 +1,133 @@
+import heapq
 import os
 from bfc.IR import *
 from bfc.Options import *
+from bfc.Profile import *
+from bfc.HashCons import IRHashConsTable, brainfuck_ir_shape, brainfuck_ir_share
+from bfc.PassManager import brainfuck_ir_size
 from bfc.x64_linux.AsmGenerator import *
+from bfc.x64_linux.Elf import ElfExecutableGenerator, ElfObjectGenerator
+
+
+SCAN_UNROLL = 4
+
+REGISTER_POOL = (
+    AsmAbstractRegister.RegC,
+    AsmAbstractRegister.RegD,
+    AsmAbstractRegister.RegSI,
+    AsmAbstractRegister.RegDI,
+    AsmAbstractRegister.Reg8,
+    AsmAbstractRegister.Reg9,
+    AsmAbstractRegister.Reg10,
+    AsmAbstractRegister.Reg11,
+)
+
+PRODUCT_REGISTERS = REGISTER_POOL[1:]
+
+LEA_MULTIPLIERS = {2: 1, 3: 2, 5: 4, 9: 8}
+
+OUTLINE_MIN_SIZE = 32
+OUTLINE_MIN_COUNT = 2
+
+REGISTER_MIN_TRIPS = 2
+UNROLL_MIN_TRIPS = 16
+UNROLL_FACTOR = 2
+
+
+class LoopRegisterAllocation:
+    def __init__(self, registers: dict, live_in: set, written: set, schedule: list):
+        self._registers = registers
+        self._live_in = live_in
+        self._written = written
+        self._schedule = schedule
+
+    def get_register(self, offset: int) -> AsmAbstractRegister:
+        return self._registers[offset]
+
+    def get_loads(self) -> [int]:
+        return sorted(self._live_in)
+
+    def get_stores(self) -> [int]:
+        return sorted(self._written)
+
+    def get_schedule(self) -> [(IRInstruction, int)]:
+        return self._schedule
+
+    def get_span(self) -> (int, int):
+        offsets = [offset for _, offset in self._schedule]
+        return min(offsets, default=0), max(offsets, default=0)
+
+    @staticmethod
+    def allocate(body: IRInstructionBlock, check_targets: bool):
+        uses = {0: 1}
+        live_in = {0}
+        written = set()
+        schedule = list()
+        targets = list()
+        offset = 0
+        low = 0
+        high = 0
+        for instr in body.get_body():
+            for instr in brainfuck_ir_schedule(instr):
+                opcode = instr.get_opcode()
+                if opcode == IROpcode.Shift:
+                    offset += instr.get_arguments()[0]
+                    low = min(low, offset)
+                    high = max(high, offset)
+                    schedule.append((instr, offset))
+                    continue
+                elif opcode == IROpcode.Nop:
+                    continue
+                cell = offset + instr.get_pointer()
+                if opcode == IROpcode.Add:
+                    accessed = [(cell, True)]
+                elif opcode == IROpcode.Set:
+                    accessed = [(cell, False)]
+                elif opcode == IROpcode.Copy:
+                    accessed = [(cell, True)]
+                    for target, _ in instr.get_arguments():
+                        accessed.append((cell + target, True))
+                        targets.append(cell + target)
+                else:
+                    return None
+                for accessed_cell, read in accessed:
+                    if accessed_cell not in uses:
+                        uses[accessed_cell] = 0
+                        if read:
+                            live_in.add(accessed_cell)
+                    uses[accessed_cell] += 1
+                    written.add(accessed_cell)
+                schedule.append((instr, cell))
+        if offset != 0 or len(uses) > len(REGISTER_POOL):
+            return None
+        if check_targets and any(not low <= target <= high for target in targets):
+            return None
+        hot = sorted(uses, key=lambda cell: -uses[cell])
+        return LoopRegisterAllocation(
+            dict(zip(hot, REGISTER_POOL)), live_in, written, schedule
+        )
+
+
+class LoopOutlining:
+    @staticmethod
+    def select(
+        module: IRInstructionBlock,
+        min_size: int = OUTLINE_MIN_SIZE,
+        min_count: int = OUTLINE_MIN_COUNT,
+    ) -> set:
+        counts = dict()
+        blocks = [module]
+        while blocks:
+            for instr in blocks.pop().get_body():
+                if instr.get_opcode() == IROpcode.Loop:
+                    body = instr.get_arguments()[0]
+                    counts[body] = counts.get(body, 0) + 1
+                    blocks.append(body)
+        return {
+            body
+            for body, count in counts.items()
+            if count >= min_count and brainfuck_ir_size(body)[0] >= min_size
+        }
 
 
 class BrainfuckLinuxX64:
@@ -11,23 +137,74 @@ class BrainfuckLinuxX64:
         MemoryCellSize.DWord: AsmPointerType.DWord,
     }
 
-    def __init__(self, options: BrainfuckOptions, runtime: str):
+    def __init__(
+        self,
+        options: BrainfuckOptions,
+        runtime: str,
+        generator=AsmGenerator,
+        entry: str = None,
+    ):
         self._next_loop_id = 0
+        self._next_routine_id = 0
+        self._next_string_id = 0
+        self._next_segment_id = 0
+        self._strings = dict()
+        self._in_range = False
+        self._versioning = True
+        self._outlined = set()
+        self._routines = dict()
+        self._pending_routines = list()
+        self._memory_spaces = dict()
+        self._profile_sites = dict()
+        self._profile_table = list()
+        self._generate_profile = False
+        self._gen = None
         self._options = options
         self._runtime = runtime
+        self._generator = generator
+        self._entry = entry
         self.opcodes = {
             IROpcode.Add: self._opcode_add,
             IROpcode.Set: self._opcode_set,
             IROpcode.Shift: self._opcode_shift,
             IROpcode.Write: self._opcode_write,
             IROpcode.Read: self._opcode_read,
-            IROpcode.Loop: self._opcode_loop,
             IROpcode.Copy: self._opcode_copy,
+            IROpcode.Scan: self._opcode_scan,
+            IROpcode.Print: self._opcode_print,
+            IROpcode.Load: self._opcode_load,
         }
 
     def compile(self, output, module: IRInstructionBlock):
-        gen = AsmGenerator(output)
+        self.begin(output)
+        self.compile_segment(module, flush=False)
+        self.end()
+
+    def compile_stream(self, output, segments):
+        self.begin(output)
+        for module in segments:
+            self.compile_segment(module)
+        self.end()
+
+    def begin(self, output):
+        gen = self._generator(output)
+        self._gen = gen
+        if self._entry is not None:
+            gen.define("MODULE_ENTRY", self._entry)
         self._next_loop_id = 0
+        self._next_routine_id = 0
+        self._next_string_id = 0
+        self._next_segment_id = 0
+        self._strings = dict()
+        self._in_range = False
+        self._versioning = True
+        self._outlined = set()
+        self._routines = dict()
+        self._pending_routines = list()
+        self._memory_spaces = dict()
+        self._profile_sites = dict()
+        self._profile_table = list()
+        self._generate_profile = self._options.get_profile_generate() is not None
         cell_byte_size = self._options.get_cell_size().get_size()
         gen.define("BF_CELL_SIZE", cell_byte_size)
         gen.define(
@@ -38,23 +215,96 @@ class BrainfuckLinuxX64:
             "BF_WRAP_ON_OVERFLOW",
             1 if self._options.get_memory_overflow() == MemoryOverflow.Wrap else 0,
         )
+        gen.define(
+            "BF_CHECKED_POINTER",
+            0 if self._options.get_memory_overflow() == MemoryOverflow.Undefined else 1,
+        )
+        gen.define("BF_MEMORY_CELLS", self._options.get_memory_size())
+        gen.define(
+            "BF_GROWABLE_MEMORY", 1 if self._options.get_growable_memory() else 0
+        )
+        gen.define("BF_PROFILE", 1 if self._generate_profile else 0)
         self._dump_runtime(gen)
         gen.label("_bf_entry").put()
         gen.xor(AsmRegister64.R12, AsmRegister64.R12)
-        for instr in module.get_body():
-            self._compile_instruction(gen, instr)
+
+    def compile_segment(self, module: IRInstructionBlock, flush: bool = True):
+        gen = self._gen
+        self._outlined = set()
+        self._memory_spaces = dict()
+        if self._options.get_outline_loops() and not self._generate_profile:
+            if self._options.get_profile() is not None:
+                module = IRHashConsTable(key=brainfuck_ir_shape).share(module)
+            else:
+                module = brainfuck_ir_share(module)
+            self._outlined = LoopOutlining.select(module)
+        self._run_tasks(self._compile_block(gen, module.get_body()))
+        if not flush:
+            return
+        if self._pending_routines:
+            end_label = gen.label(f"_bf_segment{self._next_segment_id}_end")
+            self._next_segment_id += 1
+            end_label.jump()
+            self._dump_routines(gen)
+            end_label.put()
+        if self._strings:
+            self._dump_strings(gen)
+            gen.section(".text")
+        self._routines = dict()
+        self._strings = dict()
+
+    def end(self):
+        gen = self._gen
         gen.mov(AsmRegister64.RAX, 0)
         gen.ret()
+        self._dump_routines(gen)
+        self._dump_strings(gen)
+        self._dump_profile(gen)
+        gen.finish()
+
+    def _dump_strings(self, gen: AsmGenerator):
+        if not self._strings:
+            return
+        gen.section(".rodata")
+        for data, string_id in self._strings.items():
+            gen.label(f"_bf_string{string_id}").put()
+            gen.db(data)
+
+    def _dump_profile(self, gen: AsmGenerator):
+        if not self._generate_profile:
+            return
+        gen.section(".data")
+        gen.label("_bf_profile").put()
+        gen.db(BrainfuckProfile(self._profile_table).pack())
+        gen.label("_bf_profile_path").put()
+        gen.db(self._options.get_profile_generate().encode() + b"\0")
+
+    def _dump_routines(self, gen: AsmGenerator):
+        while self._pending_routines:
+            _, _, key = heapq.heappop(self._pending_routines)
+            body, self._in_range, self._versioning = key
+            gen.label(self._routines[key]).put()
+            self._run_tasks(self._inline_loop(gen, body))
+            gen.ret()
+        self._in_range = False
+        self._versioning = True
 
     def _dump_runtime(self, gen):
-        with open(os.path.join(os.path.dirname(__file__), self._runtime)) as runtime:
-            gen.dump(runtime)
+        gen.dump(os.path.join(os.path.dirname(__file__), self._runtime))
+
+    def _run_tasks(self, task):
+        tasks = [task]
+        while tasks:
+            subtask = next(tasks[-1], None)
+            if subtask is None:
+                tasks.pop()
+            else:
+                tasks.append(subtask)
 
     def _compile_instruction(self, gen, instr: IRInstruction):
-        for dep in instr.get_dependencies():
-            self._compile_instruction(gen, dep)
-        if instr.get_opcode() in self.opcodes:
-            self.opcodes[instr.get_opcode()](gen, instr)
+        for instr in brainfuck_ir_schedule(instr):
+            if instr.get_opcode() in self.opcodes:
+                self.opcodes[instr.get_opcode()](gen, instr)
 
     def _cell_pointer(self):
         if self._options.get_memory_overflow() != MemoryOverflow.Undefined:
@@ -84,8 +334,13 @@ class BrainfuckLinuxX64:
                 command(AsmRegister64.RBX, byte_offset)
 
     def _normalize_pointer(self, gen):
-        if self._options.get_memory_overflow() == MemoryOverflow.Wrap:
-            gen.call("_bf_normalize_pointer")
+        if self._in_range:
+            return
+        elif self._options.get_memory_overflow() == MemoryOverflow.Wrap:
+            if self._options.get_power_of_two_memory():
+                gen.and_(AsmRegister64.R12, "BF_MEMORY_MASK")
+            else:
+                gen.call("_bf_normalize_pointer")
         elif self._options.get_memory_overflow() == MemoryOverflow.Abort:
             gen.call("_bf_check_pointer")
 
@@ -125,42 +380,273 @@ class BrainfuckLinuxX64:
         gen.call("_bf_read")
         self._shift_pointer(gen, -offset)
 
+    def _opcode_print(self, gen: AsmGenerator, instr: IRInstruction):
+        self._load_string(gen, instr.get_arguments()[0])
+        gen.call("_bf_write_string")
+
+    def _opcode_load(self, gen: AsmGenerator, instr: IRInstruction):
+        cell_size = self._options.get_cell_size().get_size()
+        values = instr.get_arguments()[0]
+        self._load_string(
+            gen, b"".join(value.to_bytes(cell_size, "little") for value in values)
+        )
+        gen.call("_bf_load")
+
+    def _load_string(self, gen: AsmGenerator, data: bytes):
+        string_id = self._strings.get(data)
+        if string_id is None:
+            string_id = self._strings[data] = self._next_string_id
+            self._next_string_id += 1
+        gen.lea(AsmRegister64.RSI, f"rel _bf_string{string_id}")
+        gen.mov(AsmRegister64.RDX, len(data))
+
     def _opcode_copy(self, gen: AsmGenerator, instr: IRInstruction):
+        self._count(gen, instr, ProfileSiteKind.Copy, PROFILE_ENTRIES)
         cell_size = BrainfuckLinuxX64.CELL_SIZE_ALIAS[self._options.get_cell_size()]
-        offsets = instr.get_arguments()
+        targets = instr.get_arguments()
         loop_id = self._next_loop_id
         self._next_loop_id += 1
+        slow_label = gen.label(f"_bf_copy{loop_id}_slow")
         end_label = gen.label(f"_bf_copy{loop_id}_end")
-        reg = AsmAbstractRegister.RegC.get_reg(cell_size)
-        mulreg = AsmAbstractRegister.RegA.get_reg(cell_size)
+        source = AsmAbstractRegister.RegC
+        reg = source.get_reg(cell_size)
         gen.mov(reg, self._cell(gen))
-        gen.cmp(reg, 0)
+        gen.test(reg, reg)
         end_label.jump_if(AsmJumpIf.Equals)
         gen.mov(self._cell(gen), 0)
+        products = dict()
+        for _, multiply in targets:
+            if abs(multiply) != 1 and abs(multiply) not in products:
+                if len(products) == len(PRODUCT_REGISTERS):
+                    break
+                products[abs(multiply)] = PRODUCT_REGISTERS[len(products)]
+                self._multiply(gen, products[abs(multiply)], source, abs(multiply))
+        if not self._checks_pointer():
+            self._copy_targets(gen, source, targets, products, True)
+            end_label.put()
+            return
+        offsets = [offset for offset, _ in targets]
+        self._check_range(gen, min(offsets), max(offsets), slow_label)
+        self._copy_targets(gen, source, targets, products, True)
+        end_label.jump()
+        slow_label.put()
+        self._copy_targets(gen, source, targets, products, False)
+        end_label.put()
+
+    def _checks_pointer(self) -> bool:
+        checked = self._options.get_memory_overflow() != MemoryOverflow.Undefined
+        return checked and not self._in_range
+
+    def _check_range(self, gen: AsmGenerator, low: int, high: int, fail: AsmLabel):
+        cell_byte_size = self._options.get_cell_size().get_size()
+        if low < 0:
+            gen.cmp(AsmRegister64.R12, -low * cell_byte_size)
+            fail.jump_if(AsmJumpIf.Lesser)
+        if high > 0:
+            gen.lea(AsmRegister64.RAX, AsmRegister64.R12 + high * cell_byte_size)
+            gen.cmp(AsmRegister64.RAX, "BF_MEMORY_BYTES")
+            fail.jump_if(AsmJumpIf.AboveOrEquals)
+
+    def _copy_targets(
+        self,
+        gen: AsmGenerator,
+        source: AsmAbstractRegister,
+        targets: tuple,
+        products: dict,
+        direct: bool,
+    ):
+        cell_size = BrainfuckLinuxX64.CELL_SIZE_ALIAS[self._options.get_cell_size()]
         pointer = 0
-        direct_pointing = (
-            self._options.get_memory_overflow() == MemoryOverflow.Undefined
-        )
-        for offset, multiply in offsets:
-            if multiply == 1:
-                srcreg = reg
-            else:
-                gen.push(multiply)
-                gen.mov(mulreg, reg)
-                gen.imul(gen.pointer(cell_size, AsmRegister64.RSP))
-                gen.pop(AsmRegister64.RDI)
-                srcreg = mulreg
-            if direct_pointing:
-                gen.add(self._cell(gen, offset), srcreg)
+        for offset, multiply in targets:
+            if direct:
+                target = self._cell(gen, offset)
             else:
                 self._shift_pointer(gen, offset - pointer)
                 pointer = offset
-                gen.add(self._cell(gen), srcreg)
-        if pointer != 0:
-            self._shift_pointer(gen, -pointer)
+                target = self._cell(gen)
+            if abs(multiply) == 1:
+                product = source
+            elif abs(multiply) in products:
+                product = products[abs(multiply)]
+            else:
+                product = AsmAbstractRegister.RegA
+                self._multiply(gen, product, source, abs(multiply))
+            command = gen.add if multiply > 0 else gen.sub
+            command(target, product.get_reg(cell_size))
+        self._shift_pointer(gen, -pointer)
+
+    def _multiply(
+        self,
+        gen: AsmGenerator,
+        product: AsmAbstractRegister,
+        source: AsmAbstractRegister,
+        multiply: int,
+    ):
+        dest = product.get_reg(AsmPointerType.DWord)
+        if multiply in LEA_MULTIPLIERS:
+            base = source.get_reg(AsmPointerType.QWord)
+            gen.lea(dest, f"{base} + {base} * {LEA_MULTIPLIERS[multiply]}")
+        else:
+            gen.imul(dest, source.get_reg(AsmPointerType.DWord), multiply)
+
+    def _opcode_scan(self, gen: AsmGenerator, instr: IRInstruction):
+        stride = instr.get_arguments()[0]
+        if self._options.get_cell_size() == MemoryCellSize.Byte and abs(stride) == 1:
+            gen.call("_bf_scan_right" if stride > 0 else "_bf_scan_left")
+            return
+        loop_id = self._next_loop_id
+        self._next_loop_id += 1
+        start_label = gen.label(f"_bf_scan{loop_id}_start")
+        slow_label = gen.label(f"_bf_scan{loop_id}_slow")
+        end_label = gen.label(f"_bf_scan{loop_id}_end")
+        checked = self._options.get_memory_overflow() != MemoryOverflow.Undefined
+        byte_stride = stride * self._options.get_cell_size().get_size()
+        gen.cmp(self._cell(gen), 0)
+        end_label.jump_if(AsmJumpIf.Equals)
+        start_label.put()
+        if checked:
+            gen.lea(AsmRegister64.RAX, AsmRegister64.R12 + SCAN_UNROLL * byte_stride)
+            if byte_stride > 0:
+                gen.cmp(AsmRegister64.RAX, "BF_MEMORY_BYTES")
+                slow_label.jump_if(AsmJumpIf.AboveOrEquals)
+            else:
+                gen.cmp(AsmRegister64.RAX, 0)
+                slow_label.jump_if(AsmJumpIf.Lesser)
+        pointer = AsmRegister64.R12 if checked else AsmRegister64.RBX
+        for step in range(SCAN_UNROLL):
+            gen.add(pointer, byte_stride)
+            gen.cmp(self._cell(gen), 0)
+            if step < SCAN_UNROLL - 1:
+                end_label.jump_if(AsmJumpIf.Equals)
+        start_label.jump_if(AsmJumpIf.NotEquals)
+        if checked:
+            end_label.jump()
+            slow_label.put()
+            self._shift_pointer(gen, stride)
+            gen.cmp(self._cell(gen), 0)
+            start_label.jump_if(AsmJumpIf.NotEquals)
         end_label.put()
 
     def _opcode_loop(self, gen: AsmGenerator, ir: IRInstruction):
+        body = ir.get_arguments()[0]
+        self._count(gen, ir, ProfileSiteKind.Loop, PROFILE_ENTRIES)
+        site = self._profile_site(ir, ProfileSiteKind.Loop)
+        cold = site is not None and site.get_entries() == 0
+        if body in self._outlined or cold and not self._generate_profile:
+            gen.call(self._routine(body, site))
+        else:
+            yield self._inline_loop(gen, body, ir)
+
+    def _routine(self, body: IRInstructionBlock, site: BrainfuckProfileSite) -> str:
+        key = (body, self._in_range, self._versioning)
+        if key not in self._routines:
+            routine_id = self._next_routine_id
+            self._next_routine_id += 1
+            self._routines[key] = f"_bf_routine{routine_id}"
+            weight = 0 if site is None else site.get_weight()
+            heapq.heappush(self._pending_routines, (-weight, -routine_id, key))
+        return self._routines[key]
+
+    def _profile_site(
+        self, instr: IRInstruction, kind: ProfileSiteKind
+    ) -> BrainfuckProfileSite:
+        profile = self._options.get_profile()
+        if profile is None or instr is None:
+            return None
+        site = profile.get_site(instr.get_position())
+        return site if site is not None and site.get_kind() == kind else None
+
+    def _count(
+        self, gen: AsmGenerator, instr: IRInstruction, kind: ProfileSiteKind, field
+    ):
+        if not self._generate_profile or instr is None:
+            return
+        position = instr.get_position()
+        if position is None:
+            return
+        if position not in self._profile_sites:
+            self._profile_sites[position] = len(self._profile_table)
+            self._profile_table.append(BrainfuckProfileSite(kind, position))
+        offset = PROFILE_HEADER.size + field
+        offset += self._profile_sites[position] * PROFILE_RECORD.size
+        gen.add(gen.pointer(AsmPointerType.QWord, f"rel _bf_profile + {offset}"), 1)
+
+    def _inline_loop(
+        self, gen: AsmGenerator, body: IRInstructionBlock, ir: IRInstruction = None
+    ):
+        space = None
+        if self._checks_pointer() and self._versioning:
+            space = body.get_memory_space(self._memory_spaces)
+        if space not in (None, (0, 0)):
+            yield self._versioned(
+                gen, *space, lambda: self._compile_loop(gen, body, ir)
+            )
+        else:
+            yield self._compile_loop(gen, body, ir)
+
+    def _compile_loop(
+        self, gen: AsmGenerator, body: IRInstructionBlock, ir: IRInstruction
+    ):
+        allocation = LoopRegisterAllocation.allocate(
+            body,
+            self._options.get_memory_overflow() == MemoryOverflow.Abort
+            and not self._in_range,
+        )
+        site = self._profile_site(ir, ProfileSiteKind.Loop)
+        trips = None if site is None else site.get_trip_count()
+        if trips is not None and trips < REGISTER_MIN_TRIPS:
+            allocation = None
+        if allocation is not None:
+            unroll = UNROLL_FACTOR if trips and trips >= UNROLL_MIN_TRIPS else 1
+            self._register_loop(gen, allocation, ir, unroll)
+        else:
+            yield self._plain_loop(gen, body, ir)
+
+    def _versioned(self, gen: AsmGenerator, low: int, high: int, compile_region):
+        region_id = self._next_loop_id
+        self._next_loop_id += 1
+        checked_label = gen.label(f"_bf_region{region_id}_checked")
+        end_label = gen.label(f"_bf_region{region_id}_end")
+        self._check_range(gen, low, high, checked_label)
+        self._versioning = False
+        self._in_range = True
+        yield compile_region()
+        self._in_range = False
+        end_label.jump()
+        checked_label.put()
+        yield compile_region()
+        self._versioning = True
+        end_label.put()
+
+    def _compile_block(self, gen: AsmGenerator, body: [IRInstruction]):
+        run = list()
+        for instr in body:
+            if instr.get_opcode() == IROpcode.Loop:
+                yield self._compile_run(gen, run)
+                run = list()
+                for dep in instr.get_dependencies():
+                    self._compile_instruction(gen, dep)
+                yield self._opcode_loop(gen, instr)
+            elif instr.get_opcode() == IROpcode.Scan:
+                yield self._compile_run(gen, run)
+                run = list()
+                self._compile_instruction(gen, instr)
+            else:
+                run.append(instr)
+        yield self._compile_run(gen, run)
+
+    def _compile_run(self, gen: AsmGenerator, run: [IRInstruction]):
+        shifts = [instr for instr in run if instr.get_opcode() == IROpcode.Shift]
+        if self._checks_pointer() and self._versioning and len(shifts) > 1:
+            low, high, _ = IRInstructionBlock(run).get_memory_range()
+            yield self._versioned(gen, low, high, lambda: self._compile_run(gen, run))
+            return
+        for instr in run:
+            self._compile_instruction(gen, instr)
+
+    def _plain_loop(
+        self, gen: AsmGenerator, body: IRInstructionBlock, ir: IRInstruction
+    ):
         loop_id = self._next_loop_id
         self._next_loop_id += 1
         start_label = gen.label(f"_bf_loop{loop_id}_start")
@@ -168,12 +654,112 @@ class BrainfuckLinuxX64:
         gen.cmp(self._cell(gen), 0)
         end_label.jump_if(AsmJumpIf.Equals)
         start_label.put()
-        for instr in ir.get_arguments()[0].get_body():
-            self._compile_instruction(gen, instr)
+        self._count(gen, ir, ProfileSiteKind.Loop, PROFILE_ITERATIONS)
+        yield self._compile_block(gen, body.get_body())
+        gen.cmp(self._cell(gen), 0)
+        start_label.jump_if(AsmJumpIf.NotEquals)
+        end_label.put()
+
+    def _register_loop(
+        self,
+        gen: AsmGenerator,
+        allocation: LoopRegisterAllocation,
+        ir: IRInstruction,
+        unroll: int = 1,
+    ):
+        cell_size = BrainfuckLinuxX64.CELL_SIZE_ALIAS[self._options.get_cell_size()]
+        loop_id = self._next_loop_id
+        self._next_loop_id += 1
+        start_label = gen.label(f"_bf_loop{loop_id}_start")
+        exit_label = gen.label(f"_bf_loop{loop_id}_exit")
+        end_label = gen.label(f"_bf_loop{loop_id}_end")
+        condition = allocation.get_register(0).get_reg(cell_size)
         gen.cmp(self._cell(gen), 0)
+        end_label.jump_if(AsmJumpIf.Equals)
+        self._transfer_registers(gen, allocation, allocation.get_loads(), True)
+        start_label.put()
+        for copy in range(unroll):
+            if copy:
+                gen.test(condition, condition)
+                exit_label.jump_if(AsmJumpIf.Equals)
+            self._count(gen, ir, ProfileSiteKind.Loop, PROFILE_ITERATIONS)
+            for instr, offset in allocation.get_schedule():
+                opcode = instr.get_opcode()
+                if opcode == IROpcode.Shift:
+                    continue
+                reg = allocation.get_register(offset).get_reg(cell_size)
+                if opcode == IROpcode.Add:
+                    value = instr.get_arguments()[0]
+                    command = gen.add if value > 0 else gen.sub
+                    command(reg, abs(value))
+                elif opcode == IROpcode.Set:
+                    gen.mov(reg, instr.get_arguments()[0])
+                elif opcode == IROpcode.Copy:
+                    self._register_copy(gen, allocation, instr, offset)
+        gen.test(condition, condition)
         start_label.jump_if(AsmJumpIf.NotEquals)
+        if unroll > 1:
+            exit_label.put()
+        self._transfer_registers(gen, allocation, allocation.get_stores(), False)
         end_label.put()
 
+    def _register_copy(
+        self,
+        gen: AsmGenerator,
+        allocation: LoopRegisterAllocation,
+        instr: IRInstruction,
+        offset: int,
+    ):
+        self._count(gen, instr, ProfileSiteKind.Copy, PROFILE_ENTRIES)
+        cell_size = BrainfuckLinuxX64.CELL_SIZE_ALIAS[self._options.get_cell_size()]
+        loop_id = self._next_loop_id
+        self._next_loop_id += 1
+        end_label = gen.label(f"_bf_copy{loop_id}_end")
+        source = allocation.get_register(offset)
+        reg = source.get_reg(cell_size)
+        product = AsmAbstractRegister.RegA.get_reg(cell_size)
+        gen.test(reg, reg)
+        end_label.jump_if(AsmJumpIf.Equals)
+        for target, multiply in instr.get_arguments():
+            target_reg = allocation.get_register(offset + target).get_reg(cell_size)
+            command = gen.add if multiply > 0 else gen.sub
+            if abs(multiply) == 1:
+                command(target_reg, reg)
+            else:
+                self._multiply(gen, AsmAbstractRegister.RegA, source, abs(multiply))
+                command(target_reg, product)
+        gen.mov(reg, 0)
+        end_label.put()
+
+    def _transfer_registers(
+        self,
+        gen: AsmGenerator,
+        allocation: LoopRegisterAllocation,
+        offsets: [int],
+        load: bool,
+    ):
+        cell_size = BrainfuckLinuxX64.CELL_SIZE_ALIAS[self._options.get_cell_size()]
+        if not self._checks_pointer():
+            for offset in offsets:
+                reg = allocation.get_register(offset).get_reg(cell_size)
+                if load:
+                    gen.mov(reg, self._cell(gen, offset))
+                else:
+                    gen.mov(self._cell(gen, offset), reg)
+            return
+        pointer = 0
+        for offset in sorted(set(offsets).union(allocation.get_span())):
+            self._shift_pointer(gen, offset - pointer)
+            pointer = offset
+            if offset not in offsets:
+                continue
+            reg = allocation.get_register(offset).get_reg(cell_size)
+            if load:
+                gen.mov(reg, self._cell(gen))
+            else:
+                gen.mov(self._cell(gen), reg)
+        self._shift_pointer(gen, -pointer)
+
 
 def brainfuck_compile_x64_linux(
     output, module: IRInstructionBlock, options: BrainfuckOptions
@@ -185,6 +771,33 @@ def brainfuck_compile_x64_linux(
 def brainfuck_compile_x64_linux_lib(
     output, module: IRInstructionBlock, options: BrainfuckOptions
 ):
-    output.write("%define MODULE_ENTRY _bf_{}\n".format(options.get_module_name()))
-    cmp = BrainfuckLinuxX64(options, "runtime_lib.asm")
+    entry = "_bf_{}".format(options.get_module_name())
+    cmp = BrainfuckLinuxX64(options, "runtime_lib.asm", entry=entry)
     cmp.compile(output, module)
+
+
+def brainfuck_stream_x64_linux(output, segments, options: BrainfuckOptions):
+    cmp = BrainfuckLinuxX64(options, "runtime.asm")
+    cmp.compile_stream(output, segments)
+
+
+def brainfuck_stream_x64_linux_lib(output, segments, options: BrainfuckOptions):
+    entry = "_bf_{}".format(options.get_module_name())
+    cmp = BrainfuckLinuxX64(options, "runtime_lib.asm", entry=entry)
+    cmp.compile_stream(output, segments)
+
+
+def brainfuck_compile_x64_linux_elf(
+    output, module: IRInstructionBlock, options: BrainfuckOptions
+):
+    cmp = BrainfuckLinuxX64(options, "runtime.asm", ElfExecutableGenerator)
+    cmp.compile(output, module)
+
+
+def brainfuck_compile_x64_linux_lib_elf(
+    output, module: IRInstructionBlock, options: BrainfuckOptions
+):
+    entry = "_bf_{}".format(options.get_module_name())
+    cmp = BrainfuckLinuxX64(options, "runtime_lib.asm", ElfObjectGenerator, entry)
+    cmp.compile(output, module)
+
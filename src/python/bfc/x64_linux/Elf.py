@@ -0,0 +1,241 @@
+import struct
+from bfc.Error import BrainfuckError
+from bfc.x64_linux.MachineCode import MachineCodeGenerator
+
+
+ELF_BASE_ADDRESS = 0x400000
+PAGE_SIZE = 0x1000
+SECTION_ALIGNMENT = 16
+
+EXECUTABLE_SECTIONS = (".text", ".rodata")
+WRITABLE_SECTIONS = (".data", ".bss")
+
+SECTION_FLAGS = {".text": 0x6, ".rodata": 0x2, ".data": 0x3, ".bss": 0x3}
+RELOCATION_TYPES = {"abs64": 1, "pc32": 2, "abs32": 11}
+
+ELF_HEADER = struct.Struct("<4sBBBBB7xHHIQQQIHHHHHH")
+PROGRAM_HEADER = struct.Struct("<IIQQQQQQ")
+SECTION_HEADER = struct.Struct("<IIQQQQIIQQ")
+SYMBOL = struct.Struct("<IBBHQQ")
+RELOCATION = struct.Struct("<QQq")
+
+ET_REL = 1
+ET_EXEC = 2
+EM_X86_64 = 62
+PT_LOAD = 1
+PT_GNU_STACK = 0x6474E551
+SHT_PROGBITS = 1
+SHT_SYMTAB = 2
+SHT_STRTAB = 3
+SHT_RELA = 4
+SHT_NOBITS = 8
+SHF_INFO_LINK = 0x40
+STT_SECTION = 3
+STB_GLOBAL = 1
+
+
+def brainfuck_align(value: int, alignment: int) -> int:
+    return (value + alignment - 1) // alignment * alignment
+
+
+def brainfuck_elf_header(
+    file_type: int, entry: int, phnum: int, shoff: int, shnum: int
+):
+    return ELF_HEADER.pack(
+        b"\x7fELF",
+        2,
+        1,
+        1,
+        0,
+        0,
+        file_type,
+        EM_X86_64,
+        1,
+        entry,
+        ELF_HEADER.size if phnum else 0,
+        shoff,
+        0,
+        ELF_HEADER.size,
+        PROGRAM_HEADER.size if phnum else 0,
+        phnum,
+        SECTION_HEADER.size if shnum else 0,
+        shnum,
+        shnum - 1 if shnum else 0,
+    )
+
+
+def brainfuck_write_elf_executable(output, gen: MachineCodeGenerator, entry: str):
+    sizes = gen.layout()
+    unknown = set(sizes) - set(EXECUTABLE_SECTIONS + WRITABLE_SECTIONS)
+    if unknown:
+        raise BrainfuckError(f"Unsupported sections {', '.join(sorted(unknown))}")
+    addresses = dict()
+    offset = PAGE_SIZE
+    for name in EXECUTABLE_SECTIONS:
+        offset = brainfuck_align(offset, SECTION_ALIGNMENT)
+        addresses[name] = ELF_BASE_ADDRESS + offset
+        offset += sizes.get(name, 0)
+    code_end = offset
+    data_start = brainfuck_align(offset, PAGE_SIZE)
+    addresses[".data"] = ELF_BASE_ADDRESS + data_start
+    file_end = data_start + sizes.get(".data", 0)
+    bss_start = brainfuck_align(file_end, SECTION_ALIGNMENT)
+    addresses[".bss"] = ELF_BASE_ADDRESS + bss_start
+    memory_end = bss_start + sizes.get(".bss", 0)
+    sections = gen.link(addresses)
+    image = bytearray(file_end)
+    for name in EXECUTABLE_SECTIONS + WRITABLE_SECTIONS[:1]:
+        start = addresses[name] - ELF_BASE_ADDRESS
+        image[start : start + len(sections.get(name, b""))] = sections.get(name, b"")
+    section, offset = gen.get_label(entry)
+    header = brainfuck_elf_header(ET_EXEC, addresses[section] + offset, 3, 0, 0)
+    header += PROGRAM_HEADER.pack(
+        PT_LOAD,
+        0x5,
+        0,
+        ELF_BASE_ADDRESS,
+        ELF_BASE_ADDRESS,
+        code_end,
+        code_end,
+        PAGE_SIZE,
+    )
+    header += PROGRAM_HEADER.pack(
+        PT_LOAD,
+        0x6,
+        data_start,
+        addresses[".data"],
+        addresses[".data"],
+        file_end - data_start,
+        memory_end - data_start,
+        PAGE_SIZE,
+    )
+    header += PROGRAM_HEADER.pack(PT_GNU_STACK, 0x6, 0, 0, 0, 0, 0, SECTION_ALIGNMENT)
+    image[: len(header)] = header
+    output.write(bytes(image))
+
+
+class ElfStringTable:
+    def __init__(self):
+        self._data = bytearray(1)
+
+    def get_data(self) -> bytes:
+        return bytes(self._data)
+
+    def add(self, name: str) -> int:
+        index = len(self._data)
+        self._data += name.encode() + b"\0"
+        return index
+
+
+def brainfuck_write_elf_relocatable(output, gen: MachineCodeGenerator):
+    sizes = gen.layout()
+    names = [name for name in gen.get_sections() if sizes[name] or name == ".text"]
+    relocations = list()
+    sections = gen.link({name: 0 for name in names}, relocations)
+    symbol_index = {name: index + 1 for index, name in enumerate(names)}
+    strings = ElfStringTable()
+    symbols = SYMBOL.pack(0, 0, 0, 0, 0, 0)
+    for name in names:
+        symbols += SYMBOL.pack(0, STT_SECTION, 0, symbol_index[name], 0, 0)
+    local_symbols = len(names) + 1
+    for label in sorted(gen.get_globals()):
+        section, offset = gen.get_label(label)
+        symbols += SYMBOL.pack(
+            strings.add(label), STB_GLOBAL << 4, 0, symbol_index[section], offset, 0
+        )
+    rela = dict()
+    for section, place, fixup, target, addend in relocations:
+        info = symbol_index[target] << 32 | RELOCATION_TYPES[fixup]
+        rela.setdefault(section, bytearray())
+        rela[section] += RELOCATION.pack(place, info, addend)
+    section_names = ElfStringTable()
+    headers = [SECTION_HEADER.pack(0, 0, 0, 0, 0, 0, 0, 0, 0, 0)]
+    contents = bytearray()
+    offset = ELF_HEADER.size
+
+    def add_section(name, kind, flags, data, size, link=0, info=0, align=1, entry=0):
+        nonlocal offset
+        offset = brainfuck_align(offset, align)
+        contents.extend(bytes(offset - ELF_HEADER.size - len(contents)))
+        contents.extend(data)
+        headers.append(
+            SECTION_HEADER.pack(
+                section_names.add(name),
+                kind,
+                flags,
+                0,
+                offset,
+                size,
+                link,
+                info,
+                align,
+                entry,
+            )
+        )
+        offset += len(data)
+
+    for name in names:
+        if name == ".bss":
+            add_section(name, SHT_NOBITS, 0x3, b"", sizes[name], align=16)
+        else:
+            flags = SECTION_FLAGS.get(name, 0x2)
+            add_section(
+                name, SHT_PROGBITS, flags, sections[name], sizes[name], align=16
+            )
+    symtab = len(headers) + len(rela)
+    for name, data in rela.items():
+        add_section(
+            f".rela{name}",
+            SHT_RELA,
+            SHF_INFO_LINK,
+            data,
+            len(data),
+            symtab,
+            symbol_index[name],
+            8,
+            RELOCATION.size,
+        )
+    add_section(
+        ".symtab",
+        SHT_SYMTAB,
+        0,
+        symbols,
+        len(symbols),
+        symtab + 1,
+        local_symbols,
+        8,
+        SYMBOL.size,
+    )
+    add_section(".strtab", SHT_STRTAB, 0, strings.get_data(), len(strings.get_data()))
+    add_section(".note.GNU-stack", SHT_PROGBITS, 0, b"", 0)
+    shstrtab_name = section_names.add(".shstrtab")
+    shstrtab = section_names.get_data()
+    headers.append(
+        SECTION_HEADER.pack(
+            shstrtab_name,
+            SHT_STRTAB,
+            0,
+            0,
+            offset,
+            len(shstrtab),
+            0,
+            0,
+            1,
+            0,
+        )
+    )
+    contents.extend(shstrtab)
+    offset = brainfuck_align(offset + len(shstrtab), 8)
+    contents.extend(bytes(offset - ELF_HEADER.size - len(contents)))
+    header = brainfuck_elf_header(ET_REL, 0, 0, offset, len(headers))
+    output.write(header + bytes(contents) + b"".join(headers))
+
+
+class ElfExecutableGenerator(MachineCodeGenerator):
+    def finish(self):
+        brainfuck_write_elf_executable(self._output, self, "_start")
+
+
+class ElfObjectGenerator(MachineCodeGenerator):
+    def finish(self):
+        brainfuck_write_elf_relocatable(self._output, self)
@@ -0,0 +1,711 @@
+import ast
+import functools
+import os
+import re
+import struct
+from bfc.Error import BrainfuckError
+from bfc.x64_linux.AsmGenerator import *
+
+
+GENERAL_REGISTERS = (
+    ("rax", "eax", "ax", "al"),
+    ("rcx", "ecx", "cx", "cl"),
+    ("rdx", "edx", "dx", "dl"),
+    ("rbx", "ebx", "bx", "bl"),
+    ("rsp", "esp", "sp", "spl"),
+    ("rbp", "ebp", "bp", "bpl"),
+    ("rsi", "esi", "si", "sil"),
+    ("rdi", "edi", "di", "dil"),
+) + tuple((f"r{n}", f"r{n}d", f"r{n}w", f"r{n}b") for n in range(8, 16))
+
+REGISTERS = {
+    name: (number, size)
+    for number, names in enumerate(GENERAL_REGISTERS)
+    for name, size in zip(names, (8, 4, 2, 1))
+}
+REGISTERS.update({f"xmm{n}": (n, 16) for n in range(16)})
+
+POINTER_SIZES = {"byte": 1, "word": 2, "dword": 4, "qword": 8, "oword": 16}
+
+CONDITION_CODES = {
+    "o": 0x0,
+    "no": 0x1,
+    "b": 0x2,
+    "c": 0x2,
+    "nae": 0x2,
+    "ae": 0x3,
+    "nb": 0x3,
+    "nc": 0x3,
+    "e": 0x4,
+    "z": 0x4,
+    "ne": 0x5,
+    "nz": 0x5,
+    "be": 0x6,
+    "na": 0x6,
+    "a": 0x7,
+    "nbe": 0x7,
+    "s": 0x8,
+    "ns": 0x9,
+    "p": 0xA,
+    "np": 0xB,
+    "l": 0xC,
+    "nge": 0xC,
+    "ge": 0xD,
+    "nl": 0xD,
+    "le": 0xE,
+    "ng": 0xE,
+    "g": 0xF,
+    "nle": 0xF,
+}
+
+ALU_OPERATIONS = {"add": 0, "or": 1, "and": 4, "sub": 5, "xor": 6, "cmp": 7}
+SHIFT_OPERATIONS = {"shl": 4, "shr": 5, "sar": 7}
+UNARY_OPERATIONS = {"inc": 0, "dec": 1, "not": 2, "neg": 3}
+BIT_SCAN_OPCODES = {"bsf": b"\x0f\xbc", "bsr": b"\x0f\xbd"}
+SSE_OPCODES = {"pxor": b"\x0f\xef", "pcmpeqb": b"\x0f\x74", "movdqa": b"\x0f\x6f"}
+
+PLAIN_INSTRUCTIONS = {
+    "ret": b"\xc3",
+    "syscall": b"\x0f\x05",
+    "rep movsb": b"\xf3\xa4",
+    "rep stosb": b"\xf3\xaa",
+}
+
+DATA_UNITS = {"db": 1, "dw": 2, "dd": 4, "dq": 8}
+SPACE_UNITS = {"resb": 1, "resw": 2, "resd": 4, "resq": 8}
+LABELED_DIRECTIVES = ("equ", *DATA_UNITS, *SPACE_UNITS)
+PACK_FORMATS = {1: "<B", 2: "<H", 4: "<I", 8: "<Q"}
+FIXUP_FORMATS = {"pc32": "<i", "abs32": "<i", "abs64": "<q"}
+
+IDENTIFIER = re.compile(r"\b[A-Za-z_][\w]*\b")
+DATA_ITEM = re.compile(r"\"[^\"]*\"|'[^']*'|[^,]+")
+DECIMAL = re.compile(r"\s*-?\d+\s*")
+MACRO_DEPTH = 8
+
+EXPRESSION_OPERATORS = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a // b,
+    ast.FloorDiv: lambda a, b: a // b,
+    ast.Mod: lambda a, b: a % b,
+    ast.LShift: lambda a, b: a << b,
+    ast.RShift: lambda a, b: a >> b,
+    ast.BitAnd: lambda a, b: a & b,
+    ast.BitOr: lambda a, b: a | b,
+    ast.BitXor: lambda a, b: a ^ b,
+    ast.USub: lambda a: -a,
+    ast.UAdd: lambda a: a,
+    ast.Invert: lambda a: ~a,
+    ast.Eq: lambda a, b: int(a == b),
+    ast.NotEq: lambda a, b: int(a != b),
+    ast.Lt: lambda a, b: int(a < b),
+    ast.LtE: lambda a, b: int(a <= b),
+    ast.Gt: lambda a, b: int(a > b),
+    ast.GtE: lambda a, b: int(a >= b),
+}
+
+
+def brainfuck_split_statement(line: str) -> (str, str):
+    parts = line.split(None, 1)
+    if len(parts) < 2:
+        return (parts[0] if parts else ""), ""
+    return parts[0], parts[1].strip()
+
+
+def brainfuck_evaluate_expression(expression: str) -> int:
+    def evaluate(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, int):
+            return node.value
+        elif isinstance(node, ast.BinOp) and type(node.op) in EXPRESSION_OPERATORS:
+            operator = EXPRESSION_OPERATORS[type(node.op)]
+            return operator(evaluate(node.left), evaluate(node.right))
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in EXPRESSION_OPERATORS:
+            return EXPRESSION_OPERATORS[type(node.op)](evaluate(node.operand))
+        elif isinstance(node, ast.Compare) and len(node.ops) == 1:
+            operator = EXPRESSION_OPERATORS[type(node.ops[0])]
+            return operator(evaluate(node.left), evaluate(node.comparators[0]))
+        raise BrainfuckError(f"Invalid expression {expression}")
+
+    try:
+        return evaluate(ast.parse(expression.strip(), mode="eval").body)
+    except (SyntaxError, KeyError):
+        raise BrainfuckError(f"Invalid expression {expression}")
+
+
+class MachineCodeGenerator(AsmGenerator):
+    def __init__(self, output):
+        super().__init__(output)
+        self._defines = dict()
+        self._constants = dict()
+        self._globals = set()
+        self._sections = {".text": list()}
+        self._section = ".text"
+        self._labels = dict()
+        self._long_jumps = set()
+        self._operands = dict()
+        self._encoders = {
+            "mov": self._mov,
+            "lea": self._lea,
+            "test": self._test,
+            "push": self._push,
+            "pop": self._pop,
+            "imul": self._imul,
+            "call": self._call,
+            "pmovmskb": self._pmovmskb,
+        }
+        for mnemonic, operation in ALU_OPERATIONS.items():
+            self._encoders[mnemonic] = functools.partial(self._alu, operation)
+        for mnemonic, operation in SHIFT_OPERATIONS.items():
+            self._encoders[mnemonic] = functools.partial(self._shift, operation)
+        for mnemonic, operation in UNARY_OPERATIONS.items():
+            self._encoders[mnemonic] = functools.partial(self._unary, operation)
+        for mnemonic, opcode in BIT_SCAN_OPCODES.items():
+            self._encoders[mnemonic] = functools.partial(self._load_register, opcode)
+        for mnemonic, opcode in SSE_OPCODES.items():
+            self._encoders[mnemonic] = functools.partial(self._sse, opcode)
+        for condition, code in CONDITION_CODES.items():
+            opcode = bytes([0x0F, 0x40 + code])
+            self._encoders[f"cmov{condition}"] = functools.partial(
+                self._load_register, opcode
+            )
+
+    def get_sections(self) -> [str]:
+        return list(self._sections)
+
+    def get_globals(self) -> set:
+        return self._globals
+
+    def get_label(self, label: str) -> (str, int):
+        if label not in self._labels:
+            raise BrainfuckError(f"Undefined label {label}")
+        return self._labels[label]
+
+    def section(self, name: str):
+        self._section = name.strip()
+        self._sections.setdefault(self._section, list())
+
+    def db(self, data: bytes):
+        self._emit(bytes(data))
+
+    def define(self, name: str, value):
+        self._defines[name] = str(value)
+        self._operands.clear()
+
+    def put_label(self, label: str):
+        self._sections[self._section].append(("label", label))
+
+    def dump(self, path: str):
+        defines = tuple(sorted(self._defines.items()))
+        runtime = brainfuck_encode_runtime(os.path.abspath(path), defines)
+        self._defines.update(runtime._defines)
+        self._constants.update(runtime._constants)
+        self._globals.update(runtime._globals)
+        for name, items in runtime._sections.items():
+            self._sections.setdefault(name, list()).extend(items)
+        self._section = runtime._section
+        self._operands.clear()
+
+    def instruction(self, mnemonic: str, *operands):
+        mnemonic = mnemonic.lower()
+        operands = [self._operand(operand) for operand in operands]
+        if mnemonic in PLAIN_INSTRUCTIONS and not operands:
+            self._emit(PLAIN_INSTRUCTIONS[mnemonic])
+        elif mnemonic == "jmp":
+            self._jump(b"\xeb", b"\xe9", *operands)
+        elif mnemonic[0] == "j" and mnemonic[1:] in CONDITION_CODES:
+            code = CONDITION_CODES[mnemonic[1:]]
+            self._jump(bytes([0x70 + code]), bytes([0x0F, 0x80 + code]), *operands)
+        elif mnemonic in self._encoders:
+            self._encoders[mnemonic](*operands)
+        else:
+            raise BrainfuckError(f"Unsupported instruction {mnemonic}")
+
+    def assemble(self, text: str):
+        conditions = list()
+        for line in text.splitlines():
+            line = re.sub(r";[^\"']*$", "", line).strip()
+            if not line:
+                continue
+            directive, rest = brainfuck_split_statement(line)
+            directive = directive.lower()
+            if directive == "%if":
+                active = all(conditions)
+                condition = re.sub(r"(?<![<>!=])=(?!=)", "==", self._expand(rest))
+                conditions.append(active and bool(self._evaluate(condition)))
+            elif directive == "%else":
+                conditions[-1] = not conditions[-1]
+            elif directive == "%endif":
+                conditions.pop()
+            elif not all(conditions):
+                continue
+            elif directive == "%define":
+                name, value = brainfuck_split_statement(rest)
+                self.define(name, value)
+            elif directive == "%strlen":
+                name, value = brainfuck_split_statement(rest)
+                self._set_constant(name, len(self._expand(value).strip()[1:-1]))
+            elif directive == "section":
+                self.section(rest)
+            elif directive == "global":
+                self._globals.add(self._expand(rest))
+            else:
+                self._statement(line)
+
+    def layout(self) -> dict:
+        long_jumps = set()
+        while True:
+            sizes, jumps = self._place(long_jumps)
+            grown = False
+            for key, (end, label) in jumps.items():
+                section, target = self.get_label(label)
+                if key not in long_jumps and not -128 <= target - end <= 127:
+                    long_jumps.add(key)
+                    grown = True
+            if not grown:
+                break
+        self._long_jumps = long_jumps
+        return sizes
+
+    def link(self, addresses: dict, relocations: list = None) -> dict:
+        sections = dict()
+        for name, items in self._sections.items():
+            data = bytearray()
+            for index, item in enumerate(items):
+                if item[0] == "code":
+                    start = len(data)
+                    data += item[1]
+                    for position, label, addend, fixup in item[2]:
+                        section, offset = self.get_label(label)
+                        place = start + position
+                        if relocations is not None and (
+                            section != name or fixup != "pc32"
+                        ):
+                            relocations.append(
+                                (name, place, fixup, section, offset + addend)
+                            )
+                            continue
+                        value = addresses[section] + offset + addend
+                        if fixup == "pc32":
+                            value -= addresses[name] + place
+                        struct.pack_into(FIXUP_FORMATS[fixup], data, place, value)
+                elif item[0] == "jump":
+                    _, target = self.get_label(item[3])
+                    if (name, index) in self._long_jumps:
+                        data += item[2]
+                        data += struct.pack("<i", target - len(data) - 4)
+                    else:
+                        data += item[1]
+                        data += struct.pack("<b", target - len(data) - 1)
+                elif item[0] == "space":
+                    data += bytes(item[1])
+            sections[name] = data
+        return sections
+
+    def _place(self, long_jumps: set) -> (dict, dict):
+        self._labels = dict()
+        sizes = dict()
+        jumps = dict()
+        for name, items in self._sections.items():
+            offset = 0
+            for index, item in enumerate(items):
+                if item[0] == "code":
+                    offset += len(item[1])
+                elif item[0] == "jump":
+                    if (name, index) in long_jumps:
+                        offset += len(item[2]) + 4
+                    else:
+                        offset += len(item[1]) + 1
+                    jumps[(name, index)] = (offset, item[3])
+                elif item[0] == "space":
+                    offset += item[1]
+                elif item[1] in self._labels:
+                    raise BrainfuckError(f"Label {item[1]} defined twice")
+                else:
+                    self._labels[item[1]] = (name, offset)
+            sizes[name] = offset
+        return sizes, jumps
+
+    def _statement(self, line: str):
+        first, rest = brainfuck_split_statement(line)
+        following, value = brainfuck_split_statement(rest)
+        if first.endswith(":") or following.lower() in LABELED_DIRECTIVES:
+            label = self._expand(first.rstrip(":"))
+            if following.lower() == "equ":
+                self._set_constant(label, self._constant(value))
+                return
+            self.put_label(label)
+            line = rest
+        if not line:
+            return
+        mnemonic, arguments = brainfuck_split_statement(line)
+        mnemonic = mnemonic.lower()
+        if mnemonic in DATA_UNITS:
+            self._data(DATA_UNITS[mnemonic], self._expand(arguments))
+        elif mnemonic in SPACE_UNITS:
+            size = SPACE_UNITS[mnemonic] * self._constant(arguments)
+            self._sections[self._section].append(("space", size))
+        elif mnemonic == "rep":
+            self.instruction(f"rep {arguments}")
+        elif arguments:
+            self.instruction(mnemonic, *[part.strip() for part in arguments.split(",")])
+        else:
+            self.instruction(mnemonic)
+
+    def _data(self, unit: int, arguments: str):
+        data = bytearray()
+        for item in DATA_ITEM.findall(arguments):
+            item = item.strip()
+            if item[0] in "\"'" and unit == 1:
+                data += item[1:-1].encode()
+            elif item:
+                value = self._constant(item) & ((1 << (8 * unit)) - 1)
+                data += struct.pack(PACK_FORMATS[unit], value)
+        self._emit(bytes(data))
+
+    def _set_constant(self, name: str, value: int):
+        self._constants[name] = value
+        self._operands.clear()
+
+    def _expand(self, text: str) -> str:
+        for _ in range(MACRO_DEPTH):
+            expanded = IDENTIFIER.sub(
+                lambda match: self._defines.get(match.group(0), match.group(0)), text
+            )
+            if expanded == text:
+                break
+            text = expanded
+        return text
+
+    def _evaluate(self, text: str):
+        if DECIMAL.fullmatch(text):
+            return int(text)
+        elif any(name not in self._constants for name in IDENTIFIER.findall(text)):
+            return None
+        return brainfuck_evaluate_expression(
+            IDENTIFIER.sub(lambda match: str(self._constants[match.group(0)]), text)
+        )
+
+    def _constant(self, text: str) -> int:
+        value = self._evaluate(self._expand(text))
+        if value is None:
+            raise BrainfuckError(f"Expression {text} is not a constant")
+        return value
+
+    def _operand(self, operand):
+        if isinstance(operand, int):
+            return ("imm", operand)
+        operand = str(operand)
+        parsed = self._operands.get(operand)
+        if parsed is None:
+            parsed = self._parse_operand(operand)
+            self._operands[operand] = parsed
+        return parsed
+
+    def _parse_operand(self, operand: str):
+        text = self._expand(operand).strip()
+        if text in REGISTERS:
+            return ("reg", *REGISTERS[text])
+        match = re.fullmatch(r"(?:(\w+)\s+)?\[\s*(.*)\]", text)
+        if match:
+            return self._memory(POINTER_SIZES.get(match.group(1)), match.group(2))
+        value = self._evaluate(text)
+        if value is None:
+            return ("label", text)
+        return ("imm", value)
+
+    def _memory(self, size, text: str):
+        base = None
+        index = None
+        scale = 1
+        displacement = 0
+        label = None
+        rip = text.startswith("rel ")
+        if rip:
+            text = text[4:]
+        for sign, term in re.findall(r"([+-]?)\s*([^+-]+)", text):
+            term = term.strip()
+            if not term:
+                continue
+            elif "*" in term:
+                register, factor = [part.strip() for part in term.split("*")]
+                if register not in REGISTERS:
+                    register, factor = factor, register
+                index = REGISTERS[register][0]
+                scale = self._constant(factor)
+            elif term in REGISTERS:
+                if base is None:
+                    base = REGISTERS[term][0]
+                else:
+                    index = REGISTERS[term][0]
+            else:
+                value = self._evaluate(term)
+                if value is None and sign != "-":
+                    label = term
+                elif value is None:
+                    raise BrainfuckError(f"Invalid address {text}")
+                else:
+                    displacement += -value if sign == "-" else value
+        if label is not None and base is None and index is None:
+            rip = True
+        return ("mem", size, base, index, scale, displacement, label, rip)
+
+    def _emit(self, code: bytes, fixups: tuple = ()):
+        self._sections[self._section].append(("code", code, fixups))
+
+    def _jump(self, short: bytes, near: bytes, target):
+        if target[0] != "label":
+            raise BrainfuckError("Only jumps to labels are supported")
+        self._sections[self._section].append(("jump", short, near, target[1]))
+
+    def _modrm(self, reg: int, operand) -> (int, bytes, tuple):
+        rex = (reg >> 3) << 2
+        reg = (reg & 7) << 3
+        if operand[0] == "reg":
+            number = operand[1]
+            return rex | (number >> 3), bytes([0xC0 | reg | number & 7]), None
+        _, _, base, index, scale, displacement, label, rip = operand
+        if rip:
+            return rex, bytes([reg | 5, 0, 0, 0, 0]), (1, label, displacement, "pc32")
+        fixup = None
+        if label is not None:
+            fixup = (0, label, displacement, "abs32")
+            displacement = 0
+        if base is None:
+            mode = 0
+            base = 5
+            width = 4
+        elif label is not None or not -128 <= displacement <= 127:
+            mode = 2
+            width = 4
+        elif displacement != 0 or base & 7 == 5:
+            mode = 1
+            width = 1
+        else:
+            mode = 0
+            width = 0
+        rex |= base >> 3
+        if index is not None:
+            if index == 4:
+                raise BrainfuckError("rsp can not be used as an index")
+            rex |= (index >> 3) << 1
+            scale = {1: 0, 2: 1, 4: 2, 8: 3}[scale]
+            sib = scale << 6 | (index & 7) << 3 | base & 7
+            body = bytes([mode << 6 | reg | 4, sib])
+        elif base & 7 == 4 or mode == 0 and base == 5:
+            body = bytes([mode << 6 | reg | 4, 0x20 | base & 7])
+        else:
+            body = bytes([mode << 6 | reg | base & 7])
+        if fixup is not None:
+            fixup = (len(body), *fixup[1:])
+        if width == 1:
+            body += struct.pack("<b", displacement)
+        elif width == 4:
+            body += struct.pack("<i", displacement)
+        return rex, body, fixup
+
+    def _encode(
+        self,
+        opcode: bytes,
+        reg: int,
+        rm,
+        size: int = 4,
+        immediate: bytes = b"",
+        prefix: bytes = b"",
+        force_rex: bool = False,
+    ):
+        rex, body, fixup = self._modrm(reg, rm)
+        if size == 8:
+            rex |= 8
+        if size == 2:
+            prefix = b"\x66" + prefix
+        if rex or force_rex:
+            prefix += bytes([0x40 | rex])
+        code = prefix + opcode + body + immediate
+        if fixup is None:
+            self._emit(code)
+            return
+        position, label, addend, kind = fixup
+        position += len(prefix) + len(opcode)
+        if kind == "pc32":
+            addend -= len(code) - position
+        self._emit(code, ((position, label, addend, kind),))
+
+    def _size(self, *operands) -> int:
+        sizes = {
+            operand[1] if operand[0] == "mem" else operand[2]
+            for operand in operands
+            if operand[0] in ("reg", "mem")
+        }
+        sizes.discard(None)
+        if len(sizes) != 1:
+            raise BrainfuckError("Invalid or unspecified operand size")
+        return sizes.pop()
+
+    def _byte_rex(self, size: int, *operands) -> bool:
+        return size == 1 and any(
+            operand[0] == "reg" and 4 <= operand[1] < 8 for operand in operands
+        )
+
+    def _immediate(self, value: int, size: int) -> int:
+        bits = 8 * min(size, 4)
+        if size == 8 and not -(1 << 31) <= value < 1 << 31:
+            raise BrainfuckError(f"Immediate {value} does not fit 32 bits")
+        if not -(1 << (bits - 1)) <= value < 1 << bits:
+            raise BrainfuckError(f"Immediate {value} does not fit {bits} bits")
+        value &= (1 << bits) - 1
+        return value - (1 << bits) if value >> (bits - 1) else value
+
+    def _immediate_bytes(self, value: int, size: int) -> bytes:
+        return struct.pack({1: "<b", 2: "<h"}.get(size, "<i"), value)
+
+    def _alu(self, operation: int, dest, src):
+        if src[0] == "imm":
+            size = self._size(dest)
+            value = self._immediate(src[1], size)
+            force_rex = self._byte_rex(size, dest)
+            if size == 1 and dest[0] == "reg" and dest[1] == 0:
+                self._accumulator(operation * 8 + 4, 1, self._immediate_bytes(value, 1))
+            elif size == 1:
+                immediate = self._immediate_bytes(value, 1)
+                self._encode(b"\x80", operation, dest, size, immediate, b"", force_rex)
+            elif -128 <= value <= 127:
+                immediate = self._immediate_bytes(value, 1)
+                self._encode(b"\x83", operation, dest, size, immediate)
+            elif dest[0] == "reg" and dest[1] == 0:
+                immediate = self._immediate_bytes(value, size)
+                self._accumulator(operation * 8 + 5, size, immediate)
+            else:
+                immediate = self._immediate_bytes(value, size)
+                self._encode(b"\x81", operation, dest, size, immediate)
+            return
+        size = self._size(dest, src)
+        force_rex = self._byte_rex(size, dest, src)
+        opcode = operation * 8 + (0 if size == 1 else 1)
+        if src[0] == "reg":
+            self._encode(bytes([opcode]), src[1], dest, size, b"", b"", force_rex)
+        else:
+            self._encode(bytes([opcode + 2]), dest[1], src, size, b"", b"", force_rex)
+
+    def _accumulator(self, opcode: int, size: int, immediate: bytes):
+        prefix = {2: b"\x66", 8: b"\x48"}.get(size, b"")
+        self._emit(prefix + bytes([opcode]) + immediate)
+
+    def _mov(self, dest, src):
+        if src[0] == "imm" and dest[0] == "reg":
+            number, size = dest[1:]
+            value = src[1]
+            if size == 8 and 0 <= value < 1 << 32:
+                size = 4
+            elif size == 8 and -(1 << 31) <= value < 1 << 31:
+                self._encode(b"\xc7", 0, dest, 8, struct.pack("<i", value))
+                return
+            rex = (8 if size == 8 else 0) | number >> 3
+            prefix = b"\x66" if size == 2 else b""
+            if rex or self._byte_rex(size, dest):
+                prefix += bytes([0x40 | rex])
+            opcode = (0xB0 if size == 1 else 0xB8) + (number & 7)
+            if size < 8:
+                self._immediate(value, size)
+            value &= (1 << (8 * size)) - 1
+            immediate = struct.pack(PACK_FORMATS[size], value)
+            self._emit(prefix + bytes([opcode]) + immediate)
+        elif src[0] == "imm":
+            size = self._size(dest)
+            immediate = self._immediate_bytes(self._immediate(src[1], size), size)
+            self._encode(b"\xc6" if size == 1 else b"\xc7", 0, dest, size, immediate)
+        else:
+            size = self._size(dest, src)
+            force_rex = self._byte_rex(size, dest, src)
+            opcode = 0x88 if size == 1 else 0x89
+            if src[0] == "reg":
+                self._encode(bytes([opcode]), src[1], dest, size, b"", b"", force_rex)
+            else:
+                opcode += 2
+                self._encode(bytes([opcode]), dest[1], src, size, b"", b"", force_rex)
+
+    def _lea(self, dest, src):
+        self._encode(b"\x8d", dest[1], src, dest[2])
+
+    def _test(self, dest, src):
+        size = self._size(dest)
+        force_rex = self._byte_rex(size, dest, src)
+        if src[0] == "imm":
+            immediate = self._immediate_bytes(self._immediate(src[1], size), size)
+            opcode = b"\xf6" if size == 1 else b"\xf7"
+            self._encode(opcode, 0, dest, size, immediate, b"", force_rex)
+        else:
+            opcode = b"\x84" if size == 1 else b"\x85"
+            self._encode(opcode, src[1], dest, size, b"", b"", force_rex)
+
+    def _push(self, src):
+        if src[0] == "reg":
+            prefix = b"\x41" if src[1] >= 8 else b""
+            self._emit(prefix + bytes([0x50 + (src[1] & 7)]))
+        elif -128 <= self._immediate(src[1], 8) <= 127:
+            self._emit(b"\x6a" + struct.pack("<b", src[1]))
+        else:
+            self._emit(b"\x68" + struct.pack("<i", self._immediate(src[1], 8)))
+
+    def _pop(self, dest):
+        prefix = b"\x41" if dest[1] >= 8 else b""
+        self._emit(prefix + bytes([0x58 + (dest[1] & 7)]))
+
+    def _unary(self, operation: int, dest):
+        size = self._size(dest)
+        opcode = (0xFE if operation < 2 else 0xF6) + (0 if size == 1 else 1)
+        force_rex = self._byte_rex(size, dest)
+        self._encode(bytes([opcode]), operation, dest, size, b"", b"", force_rex)
+
+    def _shift(self, operation: int, dest, count):
+        size = self._size(dest)
+        force_rex = self._byte_rex(size, dest)
+        if count[0] == "reg":
+            opcode = b"\xd2" if size == 1 else b"\xd3"
+            self._encode(opcode, operation, dest, size, b"", b"", force_rex)
+        elif count[1] == 1:
+            opcode = b"\xd0" if size == 1 else b"\xd1"
+            self._encode(opcode, operation, dest, size, b"", b"", force_rex)
+        else:
+            opcode = b"\xc0" if size == 1 else b"\xc1"
+            immediate = bytes([count[1] & 0xFF])
+            self._encode(opcode, operation, dest, size, immediate, b"", force_rex)
+
+    def _imul(self, dest, src, factor=None):
+        if factor is None and src[0] == "imm":
+            src, factor = dest, src
+        size = self._size(dest, src)
+        if factor is None:
+            self._encode(b"\x0f\xaf", dest[1], src, size)
+            return
+        value = self._immediate(factor[1], size)
+        if -128 <= value <= 127:
+            self._encode(b"\x6b", dest[1], src, size, self._immediate_bytes(value, 1))
+        else:
+            immediate = self._immediate_bytes(value, size)
+            self._encode(b"\x69", dest[1], src, size, immediate)
+
+    def _load_register(self, opcode: bytes, dest, src):
+        self._encode(opcode, dest[1], src, self._size(dest, src))
+
+    def _sse(self, opcode: bytes, dest, src):
+        if dest[0] == "mem":
+            self._encode(b"\x0f\x7f", src[1], dest, 16, b"", b"\x66")
+        else:
+            self._encode(opcode, dest[1], src, 16, b"", b"\x66")
+
+    def _pmovmskb(self, dest, src):
+        self._encode(b"\x0f\xd7", dest[1], src, 4, b"", b"\x66")
+
+    def _call(self, target):
+        if target[0] != "label":
+            raise BrainfuckError("Only calls to labels are supported")
+        self._emit(b"\xe8\x00\x00\x00\x00", ((1, target[1], -4, "pc32"),))
+
+
+@functools.lru_cache(maxsize=None)
+def brainfuck_encode_runtime(path: str, defines: tuple) -> MachineCodeGenerator:
+    gen = MachineCodeGenerator(None)
+    gen._defines.update(defines)
+    gen.assemble(brainfuck_read_runtime(path))
+    return gen
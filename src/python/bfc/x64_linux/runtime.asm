@@ -3,21 +3,30 @@
 
 SECTION .data
 
-BUF_SIZE:       Equ 24
-WRITE_BUF:      times BUF_SIZE db 0
+BUF_SIZE:       Equ 4096
 WRITE_POINTER:  dq 0
 ERROR_MESSAGE_DB:  db 10, ERROR_MESSAGE, 10, 0
 
+SECTION .bss
+
+WRITE_BUF:      resb BUF_SIZE
+TAPE_BASE:      resq 1
+TAPE_COMMITTED: resq 1
+ENTRY_STACK:    resq 1
+
 SECTION .text
 
-MEMORY_SIZE:	Equ	30000 * BF_CELL_SIZE
+MEMORY_SIZE:	Equ	BF_MEMORY_CELLS * BF_CELL_SIZE
+%define BF_MEMORY_BYTES MEMORY_SIZE
+%define BF_MEMORY_MASK (MEMORY_SIZE - 1)
+MEMORY_RESERVE: Equ 1 << 40
 
 global _start
 
 
 _bf_on_error:
     mov rax, 1
-    mov rdi, 0
+    mov rdi, 2
     lea rsi, [ERROR_MESSAGE_DB]
     mov rdx, ERROR_MESSAGE_LEN
     add rdx, 2
@@ -28,12 +37,15 @@ _bf_terminate:
 	syscall
 
 _bf_flush:
+    mov rdx, [WRITE_POINTER]
+    test rdx, rdx
+    jz _bf_flush_done
     mov rax, 1
-    mov rdi, 0
+    mov rdi, 1
     lea rsi, [WRITE_BUF]
-    mov rdx, [WRITE_POINTER]
     syscall
     mov qword [WRITE_POINTER], 0
+_bf_flush_done:
     ret
 
 _bf_write:
@@ -49,16 +61,57 @@ _bf_write_to_buf:
 	ret
 
 _bf_read:
-	call _bf_flush
-	mov rax, 0
-	mov rdi, 1
-	push rdi
-	lea rsi, [rsp]
-	mov rdx, 1
-	syscall
-	pop rax
-	mov [rbx+r12], al
-	ret
+    call _bf_flush
+    xor eax, eax
+    xor edi, edi
+    push rax
+    mov rsi, rsp
+    mov rdx, 1
+    syscall
+    cmp rax, 1
+    pop rax
+    jne _bf_read_end
+%if BF_CELL_SIZE=1
+    mov [rbx + r12], al
+%endif
+%if BF_CELL_SIZE=2
+    mov [rbx + r12], ax
+%endif
+%if BF_CELL_SIZE=4
+    mov [rbx + r12], eax
+%endif
+_bf_read_end:
+    ret
+
+_bf_write_string:
+    mov rax, [WRITE_POINTER]
+    add rax, rdx
+    cmp rax, BUF_SIZE
+    jbe _bf_write_string_copy
+    push rsi
+    push rdx
+    call _bf_flush
+    pop rdx
+    pop rsi
+    cmp rdx, BUF_SIZE
+    jbe _bf_write_string_copy
+    mov rax, 1
+    mov rdi, 1
+    syscall
+    ret
+_bf_write_string_copy:
+    lea rdi, [WRITE_BUF]
+    add rdi, [WRITE_POINTER]
+    mov rcx, rdx
+    rep movsb
+    add [WRITE_POINTER], rdx
+    ret
+
+_bf_load:
+    lea rdi, [rbx + r12]
+    mov rcx, rdx
+    rep movsb
+    ret
 
 %if BF_WRAP_ON_OVERFLOW=1
 _bf_normalize_pointer:
@@ -76,9 +129,9 @@ _bf_normalize_pointer_normal:
 
 %if BF_ABORT_ON_OVERFLOW=1
 _bf_abort:
-    add rsp, 8
+    mov rsp, [ENTRY_STACK]
     mov rax, 1
-    ret
+    jmp _bf_entry_return
 
 _bf_check_pointer:
     cmp r12, 0
@@ -88,29 +141,226 @@ _bf_check_pointer:
     ret
 %endif
 
+%if BF_CELL_SIZE=1
+_bf_scan_right:
+    lea rsi, [rbx + r12]
+    lea r8, [rbx + MEMORY_SIZE]
+_bf_scan_right_from:
+    pxor xmm0, xmm0
+    mov rdi, rsi
+    and rdi, -16
+    mov rcx, rsi
+    and rcx, 15
+    movdqa xmm1, [rdi]
+    pcmpeqb xmm1, xmm0
+    pmovmskb edx, xmm1
+    shr edx, cl
+    shl edx, cl
+    test edx, edx
+    jnz _bf_scan_right_found
+_bf_scan_right_loop:
+    add rdi, 16
+%if BF_CHECKED_POINTER=1
+    cmp rdi, r8
+    jae _bf_scan_right_overflow
+%endif
+    movdqa xmm1, [rdi]
+    pcmpeqb xmm1, xmm0
+    pmovmskb edx, xmm1
+    test edx, edx
+    jz _bf_scan_right_loop
+_bf_scan_right_found:
+    bsf edx, edx
+    add rdi, rdx
+%if BF_CHECKED_POINTER=1
+    cmp rdi, r8
+    jae _bf_scan_right_overflow
+    sub rdi, rbx
+    mov r12, rdi
+%else
+    mov rbx, rdi
+%endif
+    ret
+
+_bf_scan_left:
+    lea rsi, [rbx + r12]
+    lea r8, [rbx - 15]
+_bf_scan_left_from:
+    pxor xmm0, xmm0
+    mov rdi, rsi
+    and rdi, -16
+    mov rcx, rsi
+    and rcx, 15
+    movdqa xmm1, [rdi]
+    pcmpeqb xmm1, xmm0
+    pmovmskb edx, xmm1
+    mov eax, 2
+    shl eax, cl
+    dec eax
+    and edx, eax
+    jnz _bf_scan_left_found
+_bf_scan_left_loop:
+    sub rdi, 16
+%if BF_CHECKED_POINTER=1
+    cmp rdi, r8
+    jb _bf_scan_left_overflow
+%endif
+    movdqa xmm1, [rdi]
+    pcmpeqb xmm1, xmm0
+    pmovmskb edx, xmm1
+    test edx, edx
+    jz _bf_scan_left_loop
+_bf_scan_left_found:
+    bsr edx, edx
+    add rdi, rdx
+%if BF_CHECKED_POINTER=1
+    cmp rdi, rbx
+    jb _bf_scan_left_overflow
+    sub rdi, rbx
+    mov r12, rdi
+%else
+    mov rbx, rdi
+%endif
+    ret
+
+%if BF_WRAP_ON_OVERFLOW=1
+_bf_scan_right_overflow:
+    mov rsi, rbx
+    jmp _bf_scan_right_from
+
+_bf_scan_left_overflow:
+    lea rsi, [rbx + MEMORY_SIZE - 1]
+    jmp _bf_scan_left_from
+%endif
+
+%if BF_ABORT_ON_OVERFLOW=1
+_bf_scan_right_overflow:
+_bf_scan_left_overflow:
+    jmp _bf_abort
+%endif
+%endif
+
+%if BF_GROWABLE_MEMORY=1
+_bf_commit_memory:
+    add rdi, 4095
+    and rdi, -4096
+    mov [TAPE_COMMITTED], rdi
+    mov rsi, rdi
+    mov rdi, [TAPE_BASE]
+    mov edx, 3
+    mov eax, 10
+    syscall
+    ret
+
+_bf_grow_memory:
+    mov rax, [rsi + 16]
+    sub rax, [TAPE_BASE]
+    mov rcx, MEMORY_RESERVE
+    cmp rax, rcx
+    jae _bf_grow_memory_fault
+    cmp rax, [TAPE_COMMITTED]
+    jb _bf_grow_memory_fault
+    mov rdi, [TAPE_COMMITTED]
+    add rdi, rdi
+    lea rdx, [rax + 1]
+    cmp rdi, rdx
+    cmovb rdi, rdx
+    cmp rdi, rcx
+    cmova rdi, rcx
+    call _bf_commit_memory
+    test rax, rax
+    jnz _bf_grow_memory_fault
+    ret
+_bf_grow_memory_fault:
+    xor eax, eax
+    push rax
+    push rax
+    push rax
+    push rax
+    mov eax, 13
+    mov edi, 11
+    mov rsi, rsp
+    xor edx, edx
+    mov r10d, 8
+    syscall
+    add rsp, 32
+    ret
+
+_bf_signal_return:
+    mov eax, 15
+    syscall
+%endif
+
 _bf_alloc:
-	mov rax, 12
-	mov rdi, 0
-	syscall
-	push rax
-	mov rdi, rax
-	add rdi, MEMORY_SIZE
-	mov rax, 12
-	syscall
-	pop rax
-	mov rdi, rax
-	mov rbx, rax
-	mov rcx, MEMORY_SIZE
-_bf_alloc_loop:
-	mov byte [rdi], 0
-	inc rdi
-	dec rcx
-	jnz _bf_alloc_loop
-	ret
+    mov eax, 9
+    xor edi, edi
+%if BF_GROWABLE_MEMORY=1
+    mov rsi, MEMORY_RESERVE
+    xor edx, edx
+    mov r10d, 0x4022
+%else
+    mov rsi, MEMORY_SIZE
+    mov edx, 3
+    mov r10d, 0x22
+%endif
+    mov r8, -1
+    xor r9d, r9d
+    syscall
+    cmp rax, -4096
+    ja _bf_on_error
+    mov rbx, rax
+%if BF_GROWABLE_MEMORY=1
+    mov [TAPE_BASE], rax
+    mov rdi, MEMORY_SIZE
+    call _bf_commit_memory
+    test rax, rax
+    jnz _bf_on_error
+    push rax
+    lea rax, [_bf_signal_return]
+    push rax
+    push 0x04000004
+    lea rax, [_bf_grow_memory]
+    push rax
+    mov eax, 13
+    mov edi, 11
+    mov rsi, rsp
+    xor edx, edx
+    mov r10d, 8
+    syscall
+    add rsp, 32
+%endif
+    ret
+
+%if BF_PROFILE=1
+_bf_profile_dump:
+    push rax
+    mov eax, 2
+    lea rdi, [_bf_profile_path]
+    mov esi, 577
+    mov edx, 420
+    syscall
+    test rax, rax
+    js _bf_profile_dump_end
+    mov rdi, rax
+    mov eax, 1
+    lea rsi, [_bf_profile]
+    mov rdx, [_bf_profile + 8]
+    syscall
+    mov eax, 3
+    syscall
+_bf_profile_dump_end:
+    pop rax
+    ret
+%endif
 
 _start:
 	call _bf_alloc
+	mov [ENTRY_STACK], rsp
 	call _bf_entry
+_bf_entry_return:
+%if BF_PROFILE=1
+	call _bf_profile_dump
+%endif
 	cmp rax, 0
 	jne _bf_on_error
 	call _bf_flush
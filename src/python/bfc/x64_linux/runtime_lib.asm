@@ -1,21 +1,33 @@
 SECTION .data
 
-BUF_SIZE:   Equ 24
-WRITE_BUF:  times BUF_SIZE db 0
+BUF_SIZE:   Equ 4096
 WRITE_POINTER: dq 0
-MEMORY_SIZE dq  30000
+MEMORY_SIZE dq  BF_MEMORY_CELLS
+MEMORY_BYTES dq  BF_MEMORY_CELLS * BF_CELL_SIZE
+MEMORY_MASK dq  BF_MEMORY_CELLS * BF_CELL_SIZE - 1
+
+SECTION .bss
+
+WRITE_BUF:      resb BUF_SIZE
+ENTRY_STACK:    resq 1
 
 SECTION .text
 
+%define BF_MEMORY_BYTES qword [rel MEMORY_BYTES]
+%define BF_MEMORY_MASK qword [rel MEMORY_MASK]
+
 global MODULE_ENTRY
 
 _bf_flush:
+    mov rdx, [rel WRITE_POINTER]
+    test rdx, rdx
+    jz _bf_flush_done
     mov rax, 1
-    mov rdi, 0
+    mov rdi, 1
     lea rsi, [rel WRITE_BUF]
-    mov rdx, [rel WRITE_POINTER]
     syscall
     mov qword [rel WRITE_POINTER], 0
+_bf_flush_done:
     ret
 
 _bf_write:
@@ -31,16 +43,57 @@ _bf_write_to_buf:
 	ret
 
 _bf_read:
-	call _bf_flush
-	mov rax, 0
-	mov rdi, 1
-	push rdi
-	lea rsi, [rsp]
-	mov rdx, 1
-	syscall
-	pop rax
-	mov [rbx+r12], al
-	ret
+    call _bf_flush
+    xor eax, eax
+    xor edi, edi
+    push rax
+    mov rsi, rsp
+    mov rdx, 1
+    syscall
+    cmp rax, 1
+    pop rax
+    jne _bf_read_end
+%if BF_CELL_SIZE=1
+    mov [rbx + r12], al
+%endif
+%if BF_CELL_SIZE=2
+    mov [rbx + r12], ax
+%endif
+%if BF_CELL_SIZE=4
+    mov [rbx + r12], eax
+%endif
+_bf_read_end:
+    ret
+
+_bf_write_string:
+    mov rax, [rel WRITE_POINTER]
+    add rax, rdx
+    cmp rax, BUF_SIZE
+    jbe _bf_write_string_copy
+    push rsi
+    push rdx
+    call _bf_flush
+    pop rdx
+    pop rsi
+    cmp rdx, BUF_SIZE
+    jbe _bf_write_string_copy
+    mov rax, 1
+    mov rdi, 1
+    syscall
+    ret
+_bf_write_string_copy:
+    lea rdi, [rel WRITE_BUF]
+    add rdi, [rel WRITE_POINTER]
+    mov rcx, rdx
+    rep movsb
+    add [rel WRITE_POINTER], rdx
+    ret
+
+_bf_load:
+    lea rdi, [rbx + r12]
+    mov rcx, rdx
+    rep movsb
+    ret
 
 %if BF_WRAP_ON_OVERFLOW=1
 _bf_normalize_pointer:
@@ -59,38 +112,168 @@ _bf_normalize_pointer_normal:
 
 %if BF_ABORT_ON_OVERFLOW=1
 _bf_abort:
-    add rsp, 8
+    mov rsp, [rel ENTRY_STACK]
     mov rax, 1
-    ret
+    jmp _bf_entry_return
 
 _bf_check_pointer:
     cmp r12, 0
     jl _bf_abort
-    cmp r12, [rel MEMORY_SIZE]
+    cmp r12, [rel MEMORY_BYTES]
     jge _bf_abort
     ret
 %endif
 
+%if BF_CELL_SIZE=1
+_bf_scan_right:
+    lea rsi, [rbx + r12]
+    mov r8, [rel MEMORY_BYTES]
+    add r8, rbx
+_bf_scan_right_from:
+    pxor xmm0, xmm0
+    mov rdi, rsi
+    and rdi, -16
+    mov rcx, rsi
+    and rcx, 15
+    movdqa xmm1, [rdi]
+    pcmpeqb xmm1, xmm0
+    pmovmskb edx, xmm1
+    shr edx, cl
+    shl edx, cl
+    test edx, edx
+    jnz _bf_scan_right_found
+_bf_scan_right_loop:
+    add rdi, 16
+%if BF_CHECKED_POINTER=1
+    cmp rdi, r8
+    jae _bf_scan_right_overflow
+%endif
+    movdqa xmm1, [rdi]
+    pcmpeqb xmm1, xmm0
+    pmovmskb edx, xmm1
+    test edx, edx
+    jz _bf_scan_right_loop
+_bf_scan_right_found:
+    bsf edx, edx
+    add rdi, rdx
+%if BF_CHECKED_POINTER=1
+    cmp rdi, r8
+    jae _bf_scan_right_overflow
+    sub rdi, rbx
+    mov r12, rdi
+%else
+    mov rbx, rdi
+%endif
+    ret
+
+_bf_scan_left:
+    lea rsi, [rbx + r12]
+    lea r8, [rbx - 15]
+_bf_scan_left_from:
+    pxor xmm0, xmm0
+    mov rdi, rsi
+    and rdi, -16
+    mov rcx, rsi
+    and rcx, 15
+    movdqa xmm1, [rdi]
+    pcmpeqb xmm1, xmm0
+    pmovmskb edx, xmm1
+    mov eax, 2
+    shl eax, cl
+    dec eax
+    and edx, eax
+    jnz _bf_scan_left_found
+_bf_scan_left_loop:
+    sub rdi, 16
+%if BF_CHECKED_POINTER=1
+    cmp rdi, r8
+    jb _bf_scan_left_overflow
+%endif
+    movdqa xmm1, [rdi]
+    pcmpeqb xmm1, xmm0
+    pmovmskb edx, xmm1
+    test edx, edx
+    jz _bf_scan_left_loop
+_bf_scan_left_found:
+    bsr edx, edx
+    add rdi, rdx
+%if BF_CHECKED_POINTER=1
+    cmp rdi, rbx
+    jb _bf_scan_left_overflow
+    sub rdi, rbx
+    mov r12, rdi
+%else
+    mov rbx, rdi
+%endif
+    ret
+
+%if BF_WRAP_ON_OVERFLOW=1
+_bf_scan_right_overflow:
+    mov rsi, rbx
+    jmp _bf_scan_right_from
+
+_bf_scan_left_overflow:
+    mov rsi, [rel MEMORY_BYTES]
+    lea rsi, [rbx + rsi - 1]
+    jmp _bf_scan_left_from
+%endif
+
+%if BF_ABORT_ON_OVERFLOW=1
+_bf_scan_right_overflow:
+_bf_scan_left_overflow:
+    jmp _bf_abort
+%endif
+%endif
+
 _bf_clear_memory:
-    mov rcx, 0
-    mov rax, rdi
-    imul rax, BF_CELL_SIZE
-_bf_clear_memory_loop:
-    mov byte [rsi + rcx], 0
-    inc rcx
-    cmp rcx, rax
-    jne _bf_clear_memory_loop
+    push rdi
+    imul rcx, rdi, BF_CELL_SIZE
+    mov rdi, rsi
+    xor eax, eax
+    rep stosb
+    pop rdi
 	ret
 
+%if BF_PROFILE=1
+_bf_profile_dump:
+    push rax
+    mov eax, 2
+    lea rdi, [rel _bf_profile_path]
+    mov esi, 577
+    mov edx, 420
+    syscall
+    test rax, rax
+    js _bf_profile_dump_end
+    mov rdi, rax
+    mov eax, 1
+    lea rsi, [rel _bf_profile]
+    mov rdx, [rel _bf_profile + 8]
+    syscall
+    mov eax, 3
+    syscall
+_bf_profile_dump_end:
+    pop rax
+    ret
+%endif
+
 MODULE_ENTRY:
     call _bf_clear_memory
     mov [rel MEMORY_SIZE], rdi
+    imul rax, rdi, BF_CELL_SIZE
+    mov [rel MEMORY_BYTES], rax
+    dec rax
+    mov [rel MEMORY_MASK], rax
     push rbx
     push r12
     mov rbx, rsi
+    mov [rel ENTRY_STACK], rsp
     call _bf_entry
+_bf_entry_return:
     pop r12
     pop rbx
+%if BF_PROFILE=1
+    call _bf_profile_dump
+%endif
     cmp rax, 0
     jne _bf_on_error
     call _bf_flush
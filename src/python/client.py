@@ -0,0 +1,31 @@
+from bfc.Client import brainfuck_request_compile, SERVER_SOCKET
+import sys
+
+
+def main(args):
+    path = SERVER_SOCKET
+    request = list()
+    for arg in args[1:]:
+        if arg.startswith("socket="):
+            path = arg.split("=", 1)[1]
+        else:
+            request.append(arg)
+    file_names = [arg for arg in request if "=" not in arg and arg[0] != "-"]
+    if not file_names:
+        print("Provide file name")
+        return
+    with open(file_names[0], "rb") as source:
+        header, output = brainfuck_request_compile(request, source.read(), path)
+    if header.get("error") is not None:
+        print(header["error"], file=sys.stderr)
+        sys.exit(1)
+    output_files = [arg.split("=", 1)[1] for arg in request if arg[:7] == "output="]
+    if output_files:
+        with open(output_files[-1], "wb") as file:
+            file.write(output)
+    else:
+        sys.stdout.buffer.write(output if header["binary"] else output + b"\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
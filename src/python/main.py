@@ -1,13 +1,19 @@
-from bfc.Token import brainfuck_tokenize
-from bfc.Parser import brainfuck_parse
-from bfc.IROptimizer import brainfuck_ir_optimize
-from bfc.FlowAnalysis import brainfuck_ir_analyze_flow
-from bfc.Codegen import Codegen
+from bfc.Token import brainfuck_load_source
+from bfc.Parser import brainfuck_parse_compact
+from bfc.PassManager import brainfuck_pass_manager, IRPassStatistics
+from bfc.Codegen import Codegen, BinaryCodegen, RunningCodegen, StreamCodegen
+from bfc.Cache import BrainfuckCache, brainfuck_cache_key, CACHE_SIZE
+from bfc.Build import brainfuck_build, brainfuck_build_sources, BrainfuckBuildResult
+from bfc.Profile import BrainfuckProfile, BrainfuckProfileSite
+from bfc.Statistics import BrainfuckStatistics
+from bfc.Stream import brainfuck_stream_segments
+from bfc.Server import BrainfuckCompileServer, SERVER_SOCKET
 from bfc.Error import BrainfuckError
 from bfc.Options import *
 import io
 import sys
 import os
+import time
 
 
 CELL_SIZE = {
@@ -22,22 +28,44 @@ MEMORY_MODEL = {
     "undefined": MemoryOverflow.Undefined,
 }
 
+NUMERIC_OPTIONS = {
+    "eval-steps": "evaluation_steps",
+    "eval-memory": "evaluation_memory",
+    "tape": "memory_size",
+}
+
+CACHE_SIZE_UNIT = 1 << 20
+
+OPTIMIZATION_LEVEL = {
+    "-O0": 0,
+    "-O1": 1,
+    "-O2": 2,
+}
+
 
 def parse_args(args):
-    file_name = None
+    file_names = list()
     codegen = Codegen["x64-linux"]
     params = dict()
+    flags = set()
+    optimization_level = 2
     for arg in args[1:]:
-        if "=" in arg:
+        if arg in OPTIMIZATION_LEVEL:
+            optimization_level = OPTIMIZATION_LEVEL[arg]
+        elif arg.startswith("--"):
+            flags.add(arg)
+        elif "=" in arg:
             key = arg.split("=")[0]
             value = arg.split("=")[1]
             params[key] = value
-        elif file_name is None:
-            file_name = arg
+        elif not file_names:
+            file_names.append(arg)
         elif arg in Codegen:
             codegen = Codegen[arg]
         else:
-            raise BrainfuckError(f"Code generator {arg} not found")
+            file_names.append(arg)
+    if len(file_names) > 1 and "--build" not in flags:
+        raise BrainfuckError(f"Code generator {file_names[1]} not found")
 
     cell_size = MemoryCellSize.Byte
     memory_model = MemoryOverflow.Wrap
@@ -45,26 +73,172 @@ def parse_args(args):
         cell_size = CELL_SIZE[params["cell"]]
     if "memory" in params and params["memory"] in MEMORY_MODEL:
         memory_model = MEMORY_MODEL[params["memory"]]
-    return file_name, codegen, memory_model, cell_size
+    numeric = {
+        name: int(params[param])
+        for param, name in NUMERIC_OPTIONS.items()
+        if param in params
+    }
+    if numeric.get("memory_size", 1) <= 0:
+        raise BrainfuckError("Tape size must be positive")
+    growable_memory = "--grow-tape" in flags
+    if growable_memory and memory_model != MemoryOverflow.Undefined:
+        raise BrainfuckError("Growable tape requires the undefined memory model")
+    if growable_memory and codegen != Codegen["x64-linux"]:
+        raise BrainfuckError("Growable tape is only supported by x64-linux")
+    if "profile-generate" in params and codegen in RunningCodegen:
+        raise BrainfuckError("Profiling builds require an x64-linux target")
+    if "--stream" in flags and codegen not in StreamCodegen:
+        raise BrainfuckError("Streaming requires the x64-linux or x64-linux-lib target")
+    if "--stream" in flags and ("--build" in flags or "cache" in params):
+        raise BrainfuckError("Streaming cannot be combined with --build or cache")
+    profile = None
+    if "profile" in params:
+        profile = BrainfuckProfile.load(params["profile"])
+    options = BrainfuckOptions(
+        os.path.basename(file_names[0]).split(".")[0] if file_names else "",
+        memory_overflow=memory_model,
+        cell_size=cell_size,
+        optimization_level=optimization_level,
+        power_of_two_memory="--pow2-tape" in flags,
+        growable_memory=growable_memory,
+        outline_loops="--no-outline" not in flags,
+        profile_generate=params.get("profile-generate"),
+        profile=profile,
+        **numeric,
+    )
+    cache = None
+    if "cache" in params:
+        max_size = CACHE_SIZE
+        if "cache-size" in params:
+            max_size = int(params["cache-size"]) * CACHE_SIZE_UNIT
+        cache = BrainfuckCache(params["cache"], max_size)
+    jobs = int(params["jobs"]) if "jobs" in params else None
+    return file_names, codegen, options, flags, cache, jobs, params
+
+
+def build(file_names, codegen, options, cache, jobs):
+    sources = brainfuck_build_sources(file_names)
+    start = time.perf_counter()
+    results = brainfuck_build(sources, codegen, options, jobs, cache)
+    print(BrainfuckBuildResult.header())
+    for result in results:
+        print(result)
+    failed = sum(result.get_error() is not None for result in results)
+    print(
+        f"Built {len(results) - failed} of {len(results)} files"
+        f" in {time.perf_counter() - start:.2f} seconds"
+    )
+    if failed:
+        sys.exit(1)
+
+
+def parse_request(args):
+    _, codegen, options, flags, cache, _, _ = parse_args(["main.py", *args])
+    if flags & {"--build", "--stream", "--serve"}:
+        raise BrainfuckError("The compile server only compiles single files")
+    return codegen, options, cache
+
+
+def serve(path, jobs):
+    with BrainfuckCompileServer(path, parse_request, jobs) as server:
+        print(f"Serving on {path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def stream(file_name, codegen, options, output_file):
+    with open(file_name, "rb") as source:
+        segments = brainfuck_stream_segments(source, options)
+        if output_file is None:
+            StreamCodegen[codegen](sys.stdout, segments, options)
+        else:
+            with open(output_file, "w") as output:
+                StreamCodegen[codegen](output, segments, options)
 
 
 def main(args):
     if len(args) < 2:
         print("Provide file name")
     else:
-        file_name, codegen, memory_model, cell_size = parse_args(args)
-        with open(file_name) as code:
-            module_name = os.path.basename(code.name).split(".")[0]
-            options = BrainfuckOptions(
-                module_name, memory_overflow=memory_model, cell_size=cell_size
+        file_names, codegen, options, flags, cache, jobs, params = parse_args(args)
+        stats_file = params.get("stats-json")
+        output_file = params.get("output")
+        if "--serve" in flags:
+            serve(params.get("socket", SERVER_SOCKET), jobs)
+            return
+        if "--build" in flags:
+            build(file_names, codegen, options, cache, jobs)
+            return
+        if "--stream" in flags:
+            stream(file_names[0], codegen, options, output_file)
+            return
+        file_name = file_names[0]
+        binary = codegen in BinaryCodegen
+        if codegen in RunningCodegen:
+            asm = sys.stdout.buffer
+        else:
+            asm = io.BytesIO() if binary else io.StringIO()
+        compile_statistics = BrainfuckStatistics(
+            "--stats" in flags or stats_file is not None
+        )
+        compile_statistics.start()
+        phase = compile_statistics.phase("tokenize")
+        tokens, positions = brainfuck_load_source(
+            file_name, options.get_source_positions()
+        )
+        phase.stop()
+        ir = output = entry = None
+        if cache is not None:
+            key = brainfuck_cache_key(tokens, options, codegen.__name__, positions)
+            entry = cache.load(key)
+        if entry is not None:
+            ir, output = entry
+        else:
+            phase = compile_statistics.phase("parse")
+            ir = brainfuck_parse_compact(tokens, positions)
+            phase.stop(ir)
+            passes = brainfuck_pass_manager(
+                options, trace_allocations="--pass-stats" in flags
             )
-            asm = io.StringIO()
-            ir = brainfuck_parse(brainfuck_tokenize(code))
-            ir = brainfuck_ir_optimize(ir)
-            ir = brainfuck_ir_analyze_flow(ir, options)
+            ir = passes.run(ir)
+            compile_statistics.extend(passes.get_statistics())
+            if "--pass-stats" in flags:
+                print(IRPassStatistics.header(True), file=sys.stderr)
+                for statistics in passes.get_statistics():
+                    print(statistics, file=sys.stderr)
+        if output is None:
+            phase = compile_statistics.phase("codegen", ir)
             codegen(asm, ir, options)
-            # print('\n'.join([str(instr) for instr in ir.get_body()]))
-            print(asm.getvalue())
+            phase.stop()
+            if codegen not in RunningCodegen:
+                output = asm.getvalue()
+            if cache is not None and entry is None:
+                cache.store(key, ir, output)
+        compile_statistics.stop()
+        if "--stats" in flags:
+            print(compile_statistics.report(), file=sys.stderr)
+        if stats_file is not None:
+            with open(stats_file, "w") as stats:
+                stats.write(compile_statistics.to_json())
+        if "--profile-report" in flags and options.get_profile() is not None:
+            print(BrainfuckProfileSite.header(), file=sys.stderr)
+            for site in options.get_profile().get_sites():
+                print(site, file=sys.stderr)
+        if "--cache-stats" in flags and cache is not None:
+            print(
+                f"Cache: {cache.get_hits()} hits, {cache.get_misses()} misses",
+                file=sys.stderr,
+            )
+        # print('\n'.join([str(instr) for instr in ir.get_body()]))
+        if output_file is not None and output is not None:
+            with open(output_file, "wb" if binary else "w") as file:
+                file.write(output)
+        elif binary and output is not None:
+            sys.stdout.buffer.write(output)
+        elif output is not None:
+            print(output)
 
 
 if __name__ == "__main__":